@@ -84,6 +84,7 @@ def startup(datasette):
         from sqlite_utils import Database as SqliteUtilsDatabase
         from .internal_migrations import internal_migrations
         from .internal_db import InternalDB
+        from .rss_handler import scheduled_interval
 
         # Apply internal database migrations
         def migrate(connection):
@@ -92,15 +93,86 @@ def startup(datasette):
 
         await datasette.get_internal_database().execute_write_fn(migrate)
 
+        # Apply plugin settings
+        from .state import export_queue, libfec_client, search_cache, search_pools
+
+        plugin_config = datasette.plugin_config("datasette-libfec") or {}
+        export_queue.max_workers = int(
+            plugin_config.get("export_workers", export_queue.max_workers)
+        )
+        export_pool = libfec_client.export_pool
+        export_pool.max_jobs_per_process = int(
+            plugin_config.get(
+                "export_process_max_jobs", export_pool.max_jobs_per_process
+            )
+        )
+        export_pool.idle_seconds = float(
+            plugin_config.get("export_process_idle_seconds", export_pool.idle_seconds)
+        )
+        rss_process = libfec_client.rss_process
+        rss_process.max_age_seconds = float(
+            plugin_config.get(
+                "rss_process_max_age_seconds", rss_process.max_age_seconds
+            )
+        )
+        rss_process.idle_seconds = float(
+            plugin_config.get("rss_process_idle_seconds", rss_process.idle_seconds)
+        )
+        libfec_client.stall_seconds = float(
+            plugin_config.get("progress_stall_seconds", libfec_client.stall_seconds)
+        )
+        libfec_client.rss_feed_url = plugin_config.get(
+            "rss_feed_url", libfec_client.rss_feed_url
+        )
+        for setting in ("export_deadline_seconds", "sync_deadline_seconds"):
+            if plugin_config.get(setting) is not None:
+                setattr(libfec_client, setting, float(plugin_config[setting]))
+        search_pools.size = int(
+            plugin_config.get("search_processes_per_cycle", search_pools.size)
+        )
+        search_pools.max_in_flight = int(
+            plugin_config.get("search_max_in_flight", search_pools.max_in_flight)
+        )
+        search_pools.idle_seconds = float(
+            plugin_config.get("search_process_idle_seconds", search_pools.idle_seconds)
+        )
+        search_pools.max_cycles = int(
+            plugin_config.get("search_max_cycles", search_pools.max_cycles)
+        )
+        search_cache.ttl_seconds = float(
+            plugin_config.get("search_cache_ttl_seconds", search_cache.ttl_seconds)
+        )
+        search_cache.max_entries = int(
+            plugin_config.get("search_cache_max_entries", search_cache.max_entries)
+        )
+        search_cache.max_bytes = int(
+            plugin_config.get("search_cache_max_bytes", search_cache.max_bytes)
+        )
+
+        # Start search processes for these cycles without holding up startup
+        prewarm_cycles = [
+            int(cycle) for cycle in plugin_config.get("search_prewarm_cycles", [])
+        ]
+        if prewarm_cycles:
+            search_pools.prewarm(prewarm_cycles)
+
+        # Resume any export jobs left queued or orphaned by a previous process
+        export_queue.start(datasette)
+
         # Register RSS sync cron task from saved config
         try:
             internal_db = InternalDB(datasette.get_internal_database())
             rss_config = await internal_db.get_rss_config()
+            rss_progress = await internal_db.get_rss_progress()
             scheduler = datasette._cron_scheduler
             await scheduler.add_task(
                 name="libfec:rss-sync",
                 handler="libfec:rss-sync",
-                schedule={"interval": rss_config.interval_seconds},
+                schedule={
+                    "interval": scheduled_interval(
+                        rss_config, rss_progress.get("current_interval_seconds")
+                    )
+                },
                 config={},
                 overlap="skip",
             )
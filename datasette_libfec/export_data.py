@@ -0,0 +1,80 @@
+"""
+Queries over the libfec export metadata tables (libfec_exports and friends).
+
+Shared by the export detail page and the exports JSON API.
+"""
+
+import json
+from typing import Optional
+
+
+async def fetch_export(db, export_id: int) -> Optional[dict]:
+    """The libfec_exports row for export_id, or None if there isn't one."""
+    result = await db.execute(
+        """
+        SELECT
+            export_id,
+            export_uuid,
+            created_at,
+            filings_count,
+            cover_only,
+            status,
+            error_message
+        FROM libfec_exports
+        WHERE export_id = ?
+        """,
+        [export_id],
+    )
+    row = result.first()
+    if not row:
+        return None
+    return {
+        "export_id": row[0],
+        "export_uuid": row[1],
+        "created_at": row[2],
+        "filings_count": row[3],
+        "cover_only": bool(row[4]),
+        "status": row[5],
+        "error_message": row[6],
+    }
+
+
+async def fetch_export_inputs(db, export_id: int) -> list[dict]:
+    """
+    The inputs of an export, each with the filing IDs it resolved to.
+
+    Filing IDs are aggregated per input in the same query, so this is one
+    round trip no matter how many inputs the export had.
+    """
+    result = await db.execute(
+        """
+        SELECT
+            i.id,
+            i.input_type,
+            i.input_value,
+            i.cycle,
+            i.office,
+            i.state,
+            i.district,
+            json_group_array(f.filing_id) FILTER (WHERE f.filing_id IS NOT NULL)
+        FROM libfec_export_inputs i
+        LEFT JOIN libfec_export_input_filings f ON f.input_id = i.id
+        WHERE i.export_id = ?
+        GROUP BY i.id
+        ORDER BY i.id
+        """,
+        [export_id],
+    )
+    return [
+        {
+            "id": row[0],
+            "input_type": row[1],
+            "input_value": row[2],
+            "cycle": row[3],
+            "office": row[4],
+            "state": row[5],
+            "district": row[6],
+            "filing_ids": json.loads(row[7]) if row[7] else [],
+        }
+        for row in result.rows
+    ]
@@ -0,0 +1,177 @@
+"""
+Pool of warm `libfec export --rpc` processes.
+
+Spawning libfec and waiting for its ready notification is most of the wall
+time of a small export, so processes are kept running between jobs instead of
+being shut down after each one. A process is started with the output database
+(`-o`) it writes to, so idle processes are kept per output database.
+
+Before an idle process is handed out it must answer export/status. Processes
+are recycled after max_jobs_per_process exports, and shut down once they have
+been idle for idle_seconds.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from .libfec_export_rpc_client import LibfecExportRpcClient
+
+logger = logging.getLogger(__name__)
+
+# Phases in which a process has no export in flight and can take a new one
+IDLE_PHASES = ("idle", "complete", "canceled")
+
+
+class ExportProcessPool:
+    def __init__(
+        self,
+        libfec_path: str,
+        max_jobs_per_process: int = 50,
+        idle_seconds: float = 300.0,
+        max_idle: int = 4,
+    ):
+        self.libfec_path = libfec_path
+        self.max_jobs_per_process = max_jobs_per_process
+        self.idle_seconds = idle_seconds
+        self.max_idle = max_idle
+        # output_db -> [(client, idle since)], oldest first
+        self.idle: dict[str, list[tuple[LibfecExportRpcClient, float]]] = {}
+        self.spawned = 0
+        self.reused = 0
+        self._reaper: Optional[asyncio.Task] = None
+        # Background warm-ups, held until they finish
+        self._warming: set[asyncio.Task] = set()
+
+    def idle_count(self) -> int:
+        return sum(len(clients) for clients in self.idle.values())
+
+    async def acquire(self, output_db: str) -> LibfecExportRpcClient:
+        """A ready export process writing to output_db, warm if one is idle."""
+        clients = self.idle.get(output_db, [])
+        while clients:
+            client, _ = clients.pop()
+            if await self._healthy(client):
+                self.reused += 1
+                return client
+            await self._stop(client)
+        return await self._spawn(output_db)
+
+    async def release(self, client: LibfecExportRpcClient, reusable: bool) -> None:
+        """
+        Return a process after an export. It is kept warm if the export ended
+        cleanly and it hasn't reached max_jobs_per_process; otherwise it is
+        shut down.
+        """
+        client.jobs_run += 1
+        client.progress_callback = None
+        client.completion_future = None
+        client.stderr_lines.clear()
+        if not reusable or not client.is_alive():
+            await self._stop(client)
+            return
+        if client.jobs_run >= self.max_jobs_per_process:
+            logger.info(
+                f"Recycling libfec export process after {client.jobs_run} exports"
+            )
+            await self._stop(client)
+            # Start its replacement now rather than when the next export comes in
+            task = asyncio.create_task(self.warm(client.output_db))
+            self._warming.add(task)
+            task.add_done_callback(self._warm_done)
+            return
+        clients = self.idle.setdefault(client.output_db, [])
+        clients.append((client, time.monotonic()))
+        # Keep the newest processes if there are too many idle ones
+        while self.idle_count() > self.max_idle:
+            oldest_db = min(
+                (db for db, entries in self.idle.items() if entries),
+                key=lambda db: self.idle[db][0][1],
+            )
+            old, _ = self.idle[oldest_db].pop(0)
+            await self._stop(old)
+        self._ensure_reaper()
+
+    async def warm(self, output_db: str) -> None:
+        """Start an idle process for output_db unless one is already waiting."""
+        if self.idle.get(output_db):
+            return
+        try:
+            client = await self._spawn(output_db)
+        except Exception as e:
+            logger.warning(f"Could not pre-start libfec export process: {e}")
+            return
+        self.idle.setdefault(output_db, []).append((client, time.monotonic()))
+        self._ensure_reaper()
+
+    def _warm_done(self, task: asyncio.Task) -> None:
+        self._warming.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Pre-starting a libfec export process failed",
+                exc_info=task.exception(),
+            )
+
+    async def close(self) -> None:
+        """Shut down every idle process."""
+        if self._reaper is not None and not self._reaper.done():
+            self._reaper.cancel()
+        idle, self.idle = self.idle, {}
+        for clients in idle.values():
+            for client, _ in clients:
+                await self._stop(client)
+
+    async def _spawn(self, output_db: str) -> LibfecExportRpcClient:
+        client = LibfecExportRpcClient(self.libfec_path, output_db)
+        await client.start_process()
+        self.spawned += 1
+        return client
+
+    async def _healthy(self, client: LibfecExportRpcClient) -> bool:
+        if not client.is_alive():
+            return False
+        if client.listen_task.get_loop() is not asyncio.get_running_loop():
+            # Started under an event loop that has since gone away
+            return False
+        try:
+            status = await client.send_request("export/status", timeout=2.0)
+        except Exception as e:
+            logger.warning(f"Idle libfec export process failed health check: {e}")
+            return False
+        return status.get("phase", "idle") in IDLE_PHASES
+
+    async def _stop(self, client: LibfecExportRpcClient) -> None:
+        try:
+            await client.shutdown()
+        except Exception as e:
+            logger.warning(f"Error shutting down libfec export process: {e}")
+            try:
+                await client.terminate()
+            except Exception:
+                pass
+
+    def _ensure_reaper(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._reaper is None
+            or self._reaper.done()
+            or self._reaper.get_loop() is not loop
+        ):
+            self._reaper = loop.create_task(self._reap())
+
+    async def _reap(self) -> None:
+        """Shut down processes that have been idle too long, until none are left."""
+        while self.idle_count():
+            await asyncio.sleep(min(self.idle_seconds, 30.0))
+            cutoff = time.monotonic() - self.idle_seconds
+            for output_db, clients in list(self.idle.items()):
+                expired = [c for c, since in clients if since <= cutoff]
+                self.idle[output_db] = [(c, s) for c, s in clients if s > cutoff]
+                if not self.idle[output_db]:
+                    del self.idle[output_db]
+                for client in expired:
+                    logger.info(f"Reaping idle libfec export process for {output_db}")
+                    await self._stop(client)
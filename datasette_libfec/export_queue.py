@@ -0,0 +1,334 @@
+"""
+Queue of libfec export jobs, persisted in the internal database.
+
+Each call to /-/api/libfec/export/start becomes a row in
+datasette_libfec_export_jobs with its own ID, progress and outcome, so status
+survives restarts and is the same from every Datasette process.
+
+Workers claim queued jobs under a lease and renew it with a heartbeat while
+the export runs. If a process dies, its leases expire and another worker picks
+the job up again. Each worker runs up to max_workers jobs at once, and at most
+one job runs against a given database at a time since SQLite has a single
+writer.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Optional, List
+
+from .internal_db import InternalDB, ExportJobRow
+from .libfec_client import LibfecClient, ExportState
+from .progress_events import ProgressBroadcaster
+from .search_index import ensure_search_index
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_PHASES = ("complete", "canceled", "error")
+
+# How long a claimed job stays ours without a heartbeat
+LEASE_SECONDS = 30.0
+# How often running jobs heartbeat (and flush progress) and queued jobs are claimed
+POLL_SECONDS = 1.0
+# Give up on a job after it has been claimed this many times
+MAX_ATTEMPTS = 3
+
+
+def export_topic(export_id: str) -> str:
+    """Progress topic that export_id's status is published on."""
+    return f"export:{export_id}"
+
+
+def export_status_payload(job) -> dict:
+    """
+    The export status API response for a job, from an ExportJobRow or a
+    running ExportJob. Only the fields that mean something in the job's
+    current phase are included.
+    """
+    payload: dict[str, object] = {
+        "status": "success",
+        "message": "Export status",
+        "export_id": job.export_id,
+        "phase": job.phase,
+    }
+
+    # Add additional fields based on phase
+    if job.phase == "queued":
+        payload["queue_position"] = getattr(job, "queue_position", None)
+
+    elif job.phase in ("sourcing", "downloading_bulk", "exporting"):
+        payload["completed"] = job.completed
+        payload["total"] = job.total
+
+        if job.phase == "downloading_bulk" and job.current:
+            payload["current"] = job.current
+        elif job.phase == "exporting" and job.current_filing_id:
+            payload["current_filing_id"] = job.current_filing_id
+
+    elif job.phase == "complete":
+        payload["total_exported"] = job.total_exported
+        payload["warnings"] = job.warnings
+        # The database export_id, for redirecting to the export page
+        if getattr(job, "db_export_id", None) is not None:
+            payload["db_export_id"] = job.db_export_id
+
+    elif job.phase == "error":
+        payload["error_message"] = job.error_message
+
+    return payload
+
+
+class ExportJob(ExportState):
+    """A claimed export running in this process (see ExportState)."""
+
+    def __init__(self, row: ExportJobRow, progress: ProgressBroadcaster):
+        super().__init__()
+        self.export_id = row.export_id
+        self.database = row.database_name
+        self.output_db = row.output_db
+        self.filings: Optional[List[str]] = row.params.get("filings")
+        self.cycle: Optional[int] = row.params.get("cycle")
+        self.cover_only: bool = row.params.get("cover_only", False)
+        self.clobber: bool = row.params.get("clobber", False)
+        self.deadline_seconds: Optional[float] = row.params.get("deadline_seconds")
+        self.phase = "starting"
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_sent = False
+        self.db_export_id: Optional[int] = None
+        self._progress = progress
+        self._last_snapshot: Optional[tuple] = None
+
+    def progress_changed(self) -> None:
+        self._progress.publish(
+            export_topic(self.export_id), export_status_payload(self), replace=True
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "phase": self.phase,
+            "completed": self.completed,
+            "total": self.total,
+            "current_filing_id": self.current_filing_id,
+            "current": self.current,
+            "total_exported": self.total_exported,
+            "warnings": list(self.warnings),
+        }
+
+    def changed_snapshot(self) -> dict:
+        """Progress columns to write, or {} if nothing changed since last time."""
+        # Warnings are only ever appended to, so comparing counts is enough
+        key = (
+            self.phase,
+            self.completed,
+            self.total,
+            self.current_filing_id,
+            self.current,
+            self.total_exported,
+            len(self.warnings),
+        )
+        if key == self._last_snapshot:
+            return {}
+        snapshot = self.snapshot()
+        if self._last_snapshot is not None and self._last_snapshot[-1] == key[-1]:
+            # No new warnings: don't rewrite the whole list
+            del snapshot["warnings"]
+        self._last_snapshot = key
+        return snapshot
+
+
+class ExportQueue:
+    def __init__(
+        self,
+        client: LibfecClient,
+        progress: Optional[ProgressBroadcaster] = None,
+        max_workers: int = 2,
+    ):
+        self.client = client
+        self.progress = progress or ProgressBroadcaster()
+        self.max_workers = max_workers
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.running: dict[str, ExportJob] = {}
+        self.datasette = None
+        self._internal: Optional[InternalDB] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+    def start(self, datasette) -> None:
+        """Attach to a Datasette instance and make sure the worker loop runs."""
+        if datasette is not self.datasette:
+            self.datasette = datasette
+            self._internal = InternalDB(datasette.get_internal_database())
+            self.running = {}
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._loop())
+        self._wake.set()
+
+    async def submit(
+        self,
+        datasette,
+        database: str,
+        output_db: str,
+        filings: Optional[List[str]],
+        cycle: Optional[int],
+        cover_only: bool,
+        clobber: bool,
+        deadline_seconds: Optional[float] = None,
+    ) -> ExportJobRow:
+        """Queue an export; a worker picks it up as soon as one is free."""
+        internal = InternalDB(datasette.get_internal_database())
+        export_id = f"export-{uuid.uuid4()}"
+        await internal.create_export_job(
+            export_id,
+            database,
+            output_db,
+            {
+                "filings": filings,
+                "cycle": cycle,
+                "cover_only": cover_only,
+                "clobber": clobber,
+                "deadline_seconds": deadline_seconds,
+            },
+        )
+        self.start(datasette)
+        job = await internal.get_export_job(export_id)
+        assert job is not None
+        return job
+
+    async def cancel(self, datasette, export_id: str) -> Optional[str]:
+        """
+        Cancel a job by ID. Returns its status afterwards, or None if unknown.
+
+        A running job is canceled by whichever worker owns it, on its next
+        heartbeat; if that's us we don't wait for the heartbeat.
+        """
+        internal = InternalDB(datasette.get_internal_database())
+        status = await internal.request_export_cancel(export_id)
+        job = self.running.get(export_id)
+        if job is not None:
+            await self._send_cancel(job)
+        elif status == "canceled":
+            row = await internal.get_export_job(export_id)
+            if row is not None:
+                self._publish_finished(row)
+        return status
+
+    async def _loop(self) -> None:
+        """Heartbeat running jobs and claim new ones until there is no work left."""
+        while True:
+            try:
+                await self._heartbeat()
+                await self._claim()
+                if (
+                    not self.running
+                    and not await self._internal.count_unfinished_export_jobs()
+                ):
+                    return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Export queue error: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _heartbeat(self) -> None:
+        if not self.running:
+            return
+        snapshots = {
+            export_id: job.changed_snapshot() for export_id, job in self.running.items()
+        }
+        owned = await self._internal.heartbeat_export_jobs(
+            self.owner, LEASE_SECONDS, snapshots
+        )
+        for export_id, job in list(self.running.items()):
+            if export_id not in owned:
+                # Our lease lapsed and someone else took the job over
+                logger.warning(f"Lost lease on export {export_id}, stopping it")
+                await self._send_cancel(job)
+            elif owned[export_id]:
+                await self._send_cancel(job)
+
+    async def _claim(self) -> None:
+        while len(self.running) < self.max_workers:
+            row = await self._internal.claim_export_job(
+                self.owner, LEASE_SECONDS, MAX_ATTEMPTS
+            )
+            if row is None:
+                return
+            job = ExportJob(row, self.progress)
+            self.running[job.export_id] = job
+            job.progress_changed()
+            job.task = asyncio.create_task(self._run(job))
+
+    async def _send_cancel(self, job: ExportJob) -> None:
+        if job.cancel_sent or job.rpc_client is None:
+            return
+        job.cancel_sent = True
+        try:
+            await job.rpc_client.export_cancel()
+        except Exception as e:
+            logger.warning(f"Error canceling RPC export {job.export_id}: {e}")
+
+    async def _run(self, job: ExportJob) -> None:
+        internal = self._internal
+        try:
+            await self.client.export_with_progress(
+                output_db=job.output_db,
+                filings=job.filings,
+                cycle=job.cycle,
+                cover_only=job.cover_only,
+                clobber=job.clobber,
+                export_state=job,
+                deadline_seconds=job.deadline_seconds,
+            )
+        except Exception as e:
+            logger.error(f"Export {job.export_id} failed: {e}")
+            job.phase = "error"
+            job.error_message = str(e)
+
+        db_export_id = None
+        if job.phase == "complete":
+            # Jobs against the same database run one at a time, so the newest
+            # libfec_exports row belongs to this job.
+            try:
+                db = self.datasette.databases[job.database]
+                result = await db.execute(
+                    "SELECT export_id FROM libfec_exports ORDER BY export_id DESC LIMIT 1"
+                )
+                row = result.first()
+                if row:
+                    db_export_id = row[0]
+            except Exception:
+                pass
+            try:
+                await ensure_search_index(self.datasette.databases[job.database])
+            except Exception as e:
+                logger.warning(f"Could not update search index: {e}")
+        job.db_export_id = db_export_id
+
+        try:
+            await internal.finish_export_job(
+                job.export_id,
+                self.owner,
+                **job.snapshot(),
+                error_message=job.error_message,
+                db_export_id=db_export_id,
+            )
+        finally:
+            self.running.pop(job.export_id, None)
+            self._publish_finished(job)
+            self._wake.set()
+
+    def _publish_finished(self, job) -> None:
+        """Send a job's final status to its streams, then drop the topic."""
+        topic = export_topic(job.export_id)
+        self.progress.publish(topic, export_status_payload(job), replace=True)
+        self.progress.discard(topic)
@@ -0,0 +1,94 @@
+"""
+Flow control for long-running libfec RPC jobs (exports and RSS syncs).
+
+The libfec RPC server works through a job in batches: after a batch (up to
+10 filings) it blocks until it reads another line on stdin. Any request will
+do, so the client answers each batch with a status request. That request is
+the credit for the next batch, and its response is the ack.
+
+Credit is granted as soon as a progress notification shows the server is
+working, with at most one status request in flight; notifications that
+arrive while one is outstanding are covered by it. If the server goes quiet
+for idle_interval (say a slow download with no notifications), credit is
+granted anyway, so the job can never stall waiting for stdin.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_PHASES = ("complete", "canceled", "error")
+
+
+class StatusPump:
+    def __init__(
+        self,
+        send_request: Callable[..., Awaitable[Any]],
+        status_method: str,
+        completion_future: asyncio.Future,
+        idle_interval: float = 0.5,
+        job_id_key: Optional[str] = None,
+        job_id: Optional[str] = None,
+    ):
+        self._send_request = send_request
+        self._status_method = status_method
+        self._completion = completion_future
+        self._idle_interval = idle_interval
+        # A reused server reports its previous job until the new one starts
+        self._job_id_key = job_id_key
+        self._job_id = job_id
+        self._wanted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Status requests sent, for benchmarks and debugging
+        self.grants = 0
+
+    def notify(self) -> None:
+        """A progress notification arrived: the server wants more credit."""
+        self._wanted.set()
+
+    def start(self) -> None:
+        # Small jobs can finish before any notification: ask right away
+        self._wanted.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while not self._completion.done():
+            try:
+                await asyncio.wait_for(self._wanted.wait(), timeout=self._idle_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wanted.clear()
+            if self._completion.done():
+                return
+            try:
+                self.grants += 1
+                status = await self._send_request(self._status_method, timeout=5.0)
+            except Exception as e:
+                logger.debug(f"Status request error (expected on completion): {e}")
+                return
+            # The status response can be the first sign that the job finished
+            if not isinstance(status, dict):
+                continue
+            if self._job_id and status.get(self._job_id_key) not in (
+                None,
+                self._job_id,
+            ):
+                continue
+            if status.get("phase") in TERMINAL_PHASES:
+                if not self._completion.done():
+                    logger.debug(f"Job completed (from status): {status}")
+                    self._completion.set_result(status)
@@ -1,5 +1,9 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional, List
+import json
+import sqlite3
+import time
+import weakref
 
 
 class RssConfig(BaseModel):
@@ -10,33 +14,211 @@ class RssConfig(BaseModel):
     since_duration: str = "1 day"
     database_name: Optional[str] = None
     updated_at: Optional[str] = None
+    # Poll between min and max interval depending on feed activity, instead
+    # of every interval_seconds
+    adaptive_interval: bool = False
+    min_interval_seconds: int = 15
+    max_interval_seconds: int = 900
+
+
+class RssSubscription(BaseModel):
+    """A target database and filters for RSS syncs. "default" is RssConfig's."""
+
+    name: str
+    database_name: str
+    state_filter: Optional[str] = None
+    cover_only: bool = True
+    since_duration: str = "1 day"
+    enabled: bool = True
+
+
+class RssSubscriptionStatus(BaseModel):
+    """How a subscription's last sync went. phase is None until it first runs."""
+
+    phase: Optional[str] = None
+    exported_count: int = 0
+    total_count: int = 0
+    error_message: Optional[str] = None
+    error_code: Optional[str] = None
+    stderr: Optional[str] = None
+    sync_started_at: Optional[str] = None
+    sync_finished_at: Optional[str] = None
+
+
+class ExportJobRow(BaseModel):
+    export_id: str
+    database_name: str
+    output_db: str
+    params: dict = {}
+    status: str = "queued"  # queued|running|complete|canceled|error
+    phase: str = "queued"
+    completed: int = 0
+    total: int = 0
+    current_filing_id: Optional[str] = None
+    current: Optional[str] = None
+    total_exported: Optional[int] = None
+    warnings: List[str] = []
+    error_message: Optional[str] = None
+    db_export_id: Optional[int] = None
+    cancel_requested: bool = False
+    owner: Optional[str] = None
+    attempts: int = 0
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    queue_position: Optional[int] = None
+
+
+_EXPORT_JOB_COLUMNS = (
+    "export_id, database_name, output_db, params, status, phase, completed, "
+    "total, current_filing_id, current, total_exported, warnings, error_message, "
+    "db_export_id, cancel_requested, owner, attempts, created_at, started_at, "
+    "finished_at"
+)
+
+# Position among queued jobs, computed alongside each row
+_EXPORT_JOB_SELECT = f"""
+    SELECT {_EXPORT_JOB_COLUMNS},
+        CASE WHEN j.status = 'queued' THEN (
+            SELECT count(*) FROM datasette_libfec_export_jobs q
+            WHERE q.status = 'queued' AND q.created_at <= j.created_at
+        ) END AS queue_position
+    FROM datasette_libfec_export_jobs j
+"""
+
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+# Process-local copies of the RSS config and progress rows, per internal
+# database. Updates through InternalDB write through to them; entries also
+# expire after RSS_CACHE_SECONDS, for changes made by other processes sharing
+# the internal database.
+RSS_CACHE_SECONDS = 5.0
+_rss_caches: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+_RSS_CONFIG_SELECT = (
+    "SELECT enabled, interval_seconds, cover_only, state_filter, "
+    "since_duration, database_name, updated_at, adaptive_interval, "
+    "min_interval_seconds, max_interval_seconds "
+    "FROM datasette_libfec_rss_config WHERE id = 1"
+)
+
+_RSS_PROGRESS_COLUMNS = (
+    "phase",
+    "exported_count",
+    "total_count",
+    "current_filing_id",
+    "feed_title",
+    "feed_last_modified",
+    "error_message",
+    "error_code",
+    "sync_started_at",
+    "sync_finished_at",
+    "stderr",
+    "current_interval_seconds",
+)
+
+
+def _row_to_rss_config(row) -> RssConfig:
+    if row is None:
+        return RssConfig()
+    return RssConfig(
+        enabled=bool(row[0]),
+        interval_seconds=row[1],
+        cover_only=bool(row[2]),
+        state_filter=row[3],
+        since_duration=row[4],
+        database_name=row[5],
+        updated_at=row[6],
+        adaptive_interval=bool(row[7]),
+        min_interval_seconds=row[8],
+        max_interval_seconds=row[9],
+    )
+
+
+def _row_to_rss_progress(row) -> dict:
+    if row is None:
+        return {"phase": "idle"}
+    return dict(zip(_RSS_PROGRESS_COLUMNS, row))
+
+
+class _RssCache:
+    def __init__(self):
+        self.entries = {}
+        # Bumped by every write, so a read that raced one isn't cached
+        self.version = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= RSS_CACHE_SECONDS:
+            return None
+        return entry[1]
+
+    def put(self, key, value, version=None):
+        """Cache value, unless a write has happened since version was read."""
+        if version is not None and version != self.version:
+            return
+        self.entries[key] = (time.monotonic(), value)
+
+
+def _lease_expiry(lease_seconds: float) -> str:
+    return f"strftime('%Y-%m-%dT%H:%M:%f', 'now', '{float(lease_seconds):+f} seconds')"
+
+
+def _export_job_from_row(row) -> ExportJobRow:
+    return ExportJobRow(
+        export_id=row[0],
+        database_name=row[1],
+        output_db=row[2],
+        params=json.loads(row[3] or "{}"),
+        status=row[4],
+        phase=row[5],
+        completed=row[6],
+        total=row[7],
+        current_filing_id=row[8],
+        current=row[9],
+        total_exported=row[10],
+        warnings=json.loads(row[11] or "[]"),
+        error_message=row[12],
+        db_export_id=row[13],
+        cancel_requested=bool(row[14]),
+        owner=row[15],
+        attempts=row[16],
+        created_at=row[17],
+        started_at=row[18],
+        finished_at=row[19],
+        queue_position=row[20],
+    )
 
 
 class InternalDB:
     def __init__(self, internal_db):
         self.db = internal_db
 
-    async def get_rss_config(self) -> RssConfig:
-        def read(conn):
-            with conn:
-                row = conn.execute(
-                    "SELECT enabled, interval_seconds, cover_only, state_filter, "
-                    "since_duration, database_name, updated_at "
-                    "FROM datasette_libfec_rss_config WHERE id = 1"
-                ).fetchone()
-                if row is None:
-                    return RssConfig()
-                return RssConfig(
-                    enabled=bool(row[0]),
-                    interval_seconds=row[1],
-                    cover_only=bool(row[2]),
-                    state_filter=row[3],
-                    since_duration=row[4],
-                    database_name=row[5],
-                    updated_at=row[6],
-                )
+    def _rss_cache(self) -> _RssCache:
+        cache = _rss_caches.get(self.db)
+        if cache is None:
+            cache = _rss_caches[self.db] = _RssCache()
+        return cache
+
+    async def _read_rss_row(self, sql: str):
+        """Read one row without waiting behind queued writes."""
+        try:
+            return (await self.db.execute(sql)).first()
+        except sqlite3.OperationalError:
+            # A shared-cache in-memory internal DB can report a table locked
+            # by a write in progress; read on the write thread instead
+            return await self.db.execute_write_fn(
+                lambda conn: conn.execute(sql).fetchone()
+            )
 
-        return await self.db.execute_write_fn(read)
+    async def get_rss_config(self) -> RssConfig:
+        cache = self._rss_cache()
+        config = cache.get("config")
+        if config is None:
+            version = cache.version
+            config = _row_to_rss_config(await self._read_rss_row(_RSS_CONFIG_SELECT))
+            cache.put("config", config, version)
+        return config.model_copy()
 
     async def update_rss_config(self, **kwargs) -> RssConfig:
         def write(conn):
@@ -49,6 +231,9 @@ class InternalDB:
                     "state_filter",
                     "since_duration",
                     "database_name",
+                    "adaptive_interval",
+                    "min_interval_seconds",
+                    "max_interval_seconds",
                 }
                 updates = {k: v for k, v in kwargs.items() if k in allowed}
                 if not updates:
@@ -69,43 +254,31 @@ class InternalDB:
                 )
 
         await self.db.execute_write_fn(write)
+        cache = self._rss_cache()
+        cache.version += 1
+        cache.entries.pop("config", None)
         return await self.get_rss_config()
 
     async def get_rss_progress(self) -> dict:
-        def read(conn):
-            row = conn.execute(
-                "SELECT phase, exported_count, total_count, current_filing_id, "
-                "feed_title, feed_last_modified, error_message, error_code, "
-                "sync_started_at, sync_finished_at "
-                "FROM datasette_libfec_rss_progress WHERE id = 1"
-            ).fetchone()
-            if row is None:
-                return {"phase": "idle"}
-            return {
-                "phase": row[0],
-                "exported_count": row[1],
-                "total_count": row[2],
-                "current_filing_id": row[3],
-                "feed_title": row[4],
-                "feed_last_modified": row[5],
-                "error_message": row[6],
-                "error_code": row[7],
-                "sync_started_at": row[8],
-                "sync_finished_at": row[9],
-            }
-
-        return await self.db.execute_write_fn(read)
+        cache = self._rss_cache()
+        progress = cache.get("progress")
+        if progress is None:
+            version = cache.version
+            progress = _row_to_rss_progress(
+                await self._read_rss_row(
+                    f"SELECT {', '.join(_RSS_PROGRESS_COLUMNS)} "
+                    "FROM datasette_libfec_rss_progress WHERE id = 1"
+                )
+            )
+            cache.put("progress", progress, version)
+        return dict(progress)
 
     async def update_rss_progress(self, **kwargs) -> None:
+        updates = {k: v for k, v in kwargs.items() if k in _RSS_PROGRESS_COLUMNS}
+        if not updates:
+            return
+
         def write(conn):
-            allowed = {
-                "phase", "exported_count", "total_count", "current_filing_id",
-                "feed_title", "feed_last_modified", "error_message", "error_code",
-                "sync_started_at", "sync_finished_at",
-            }
-            updates = {k: v for k, v in kwargs.items() if k in allowed}
-            if not updates:
-                return
             set_parts = [f"{k} = ?" for k in updates]
             set_parts.append("updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')")
             conn.execute(
@@ -114,3 +287,379 @@ class InternalDB:
             )
 
         await self.db.execute_write_fn(write)
+        cache = self._rss_cache()
+        cache.version += 1
+        progress = cache.get("progress")
+        if progress is None:
+            cache.entries.pop("progress", None)
+        else:
+            cache.put("progress", {**progress, **updates})
+
+    async def list_rss_subscriptions(self) -> List[RssSubscription]:
+        result = await self.db.execute(
+            "SELECT name, database_name, state_filter, cover_only, "
+            "since_duration, enabled FROM datasette_libfec_rss_subscriptions "
+            "ORDER BY name"
+        )
+        return [
+            RssSubscription(
+                name=row[0],
+                database_name=row[1],
+                state_filter=row[2],
+                cover_only=bool(row[3]),
+                since_duration=row[4],
+                enabled=bool(row[5]),
+            )
+            for row in result.rows
+        ]
+
+    async def list_rss_subscription_status(self) -> Dict[str, RssSubscriptionStatus]:
+        """The last sync of each subscription, by name."""
+        columns = list(RssSubscriptionStatus.model_fields)
+        result = await self.db.execute(
+            f"SELECT name, {', '.join(columns)} "
+            "FROM datasette_libfec_rss_subscriptions"
+        )
+        return {
+            row[0]: RssSubscriptionStatus(
+                **{
+                    column: value
+                    for column, value in zip(columns, row[1:])
+                    if value is not None
+                }
+            )
+            for row in result.rows
+        }
+
+    async def update_rss_subscription_status(self, name: str, **kwargs) -> None:
+        """Like update_rss_progress, for a subscription other than "default"."""
+        updates = {
+            k: v for k, v in kwargs.items() if k in RssSubscriptionStatus.model_fields
+        }
+        if not updates:
+            return
+
+        def write(conn):
+            with conn:
+                conn.execute(
+                    "UPDATE datasette_libfec_rss_subscriptions SET "
+                    f"{', '.join(f'{k} = ?' for k in updates)} WHERE name = ?",
+                    [*updates.values(), name],
+                )
+
+        await self.db.execute_write_fn(write)
+
+    async def save_rss_subscription(self, subscription: RssSubscription) -> None:
+        def write(conn):
+            with conn:
+                conn.execute(
+                    "INSERT INTO datasette_libfec_rss_subscriptions "
+                    "(name, database_name, state_filter, cover_only, since_duration, "
+                    "enabled) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET "
+                    "database_name = excluded.database_name, "
+                    "state_filter = excluded.state_filter, "
+                    "cover_only = excluded.cover_only, "
+                    "since_duration = excluded.since_duration, "
+                    f"enabled = excluded.enabled, updated_at = {_NOW}",
+                    [
+                        subscription.name,
+                        subscription.database_name,
+                        subscription.state_filter,
+                        int(subscription.cover_only),
+                        subscription.since_duration,
+                        int(subscription.enabled),
+                    ],
+                )
+
+        await self.db.execute_write_fn(write)
+
+    async def delete_rss_subscription(self, name: str) -> bool:
+        def write(conn):
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM datasette_libfec_rss_subscriptions WHERE name = ?",
+                    [name],
+                )
+                conn.execute(
+                    "DELETE FROM datasette_libfec_rss_watermarks WHERE subscription = ?",
+                    [name],
+                )
+                return cursor.rowcount > 0
+
+        return await self.db.execute_write_fn(write)
+
+    async def get_rss_watermark(self, subscription: str) -> Optional[dict]:
+        """The newest feed position a subscription's syncs have seen."""
+        result = await self.db.execute(
+            "SELECT filters, last_pub_date, feed_last_modified, etag, "
+            "http_last_modified FROM datasette_libfec_rss_watermarks "
+            "WHERE subscription = ?",
+            [subscription],
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return {
+            "filters": json.loads(row[0] or "{}"),
+            "last_pub_date": row[1],
+            "feed_last_modified": row[2],
+            "etag": row[3],
+            "http_last_modified": row[4],
+        }
+
+    async def set_rss_watermark(
+        self,
+        subscription: str,
+        filters: dict,
+        last_pub_date: Optional[str],
+        feed_last_modified: Optional[str],
+        etag: Optional[str] = None,
+        http_last_modified: Optional[str] = None,
+    ) -> None:
+        def write(conn):
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO datasette_libfec_rss_watermarks "
+                    "(subscription, filters, last_pub_date, feed_last_modified, "
+                    f"etag, http_last_modified, updated_at) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, {_NOW})",
+                    [
+                        subscription,
+                        json.dumps(filters, sort_keys=True),
+                        last_pub_date,
+                        feed_last_modified,
+                        etag,
+                        http_last_modified,
+                    ],
+                )
+
+        await self.db.execute_write_fn(write)
+
+    async def create_export_job(
+        self, export_id: str, database_name: str, output_db: str, params: dict
+    ) -> None:
+        def write(conn):
+            with conn:
+                conn.execute(
+                    "INSERT INTO datasette_libfec_export_jobs "
+                    "(export_id, database_name, output_db, params) VALUES (?, ?, ?, ?)",
+                    [export_id, database_name, output_db, json.dumps(params)],
+                )
+
+        await self.db.execute_write_fn(write)
+
+    async def get_export_job(self, export_id: str) -> Optional[ExportJobRow]:
+        result = await self.db.execute(
+            _EXPORT_JOB_SELECT + " WHERE j.export_id = ?", [export_id]
+        )
+        row = result.first()
+        return _export_job_from_row(row) if row else None
+
+    async def latest_export_job(self, database_name: str) -> Optional[ExportJobRow]:
+        result = await self.db.execute(
+            _EXPORT_JOB_SELECT
+            + " WHERE j.database_name = ? ORDER BY j.created_at DESC LIMIT 1",
+            [database_name],
+        )
+        row = result.first()
+        return _export_job_from_row(row) if row else None
+
+    async def list_export_jobs(
+        self, database_name: str, limit: int = 50
+    ) -> List[ExportJobRow]:
+        result = await self.db.execute(
+            _EXPORT_JOB_SELECT
+            + " WHERE j.database_name = ? ORDER BY j.created_at DESC LIMIT ?",
+            [database_name, limit],
+        )
+        return [_export_job_from_row(row) for row in result.rows]
+
+    async def count_unfinished_export_jobs(self) -> int:
+        result = await self.db.execute(
+            "SELECT count(*) FROM datasette_libfec_export_jobs "
+            "WHERE status IN ('queued', 'running')"
+        )
+        return result.first()[0]
+
+    async def claim_export_job(
+        self, owner: str, lease_seconds: float, max_attempts: int
+    ) -> Optional[ExportJobRow]:
+        """
+        Take ownership of the oldest runnable job, or return None.
+
+        A job is runnable if it is queued, or running under a lease that has
+        expired (its owner died). Jobs whose database already has a job
+        running under a live lease are skipped, so each database has a single
+        writer. The lease is taken with a guarded UPDATE, so two workers can
+        never both own a job.
+        """
+        lease = _lease_expiry(lease_seconds)
+
+        def write(conn):
+            with conn:
+                # Give up on jobs that keep losing their owner
+                conn.execute(
+                    f"""
+                    UPDATE datasette_libfec_export_jobs
+                    SET status = 'error', phase = 'error', owner = NULL,
+                        error_message = 'Export was interrupted too many times',
+                        finished_at = {_NOW}, updated_at = {_NOW}
+                    WHERE status = 'running' AND coalesce(lease_expires_at, '') < {_NOW}
+                        AND attempts >= ?
+                    """,
+                    [max_attempts],
+                )
+                row = conn.execute(
+                    f"""
+                    SELECT export_id FROM datasette_libfec_export_jobs
+                    WHERE (
+                        status = 'queued'
+                        OR (status = 'running' AND coalesce(lease_expires_at, '') < {_NOW})
+                    )
+                    AND database_name NOT IN (
+                        SELECT database_name FROM datasette_libfec_export_jobs
+                        WHERE status = 'running' AND lease_expires_at >= {_NOW}
+                    )
+                    ORDER BY created_at
+                    LIMIT 1
+                    """
+                ).fetchone()
+                if row is None:
+                    return None
+                cursor = conn.execute(
+                    f"""
+                    UPDATE datasette_libfec_export_jobs
+                    SET status = 'running', owner = ?, lease_expires_at = {lease},
+                        attempts = attempts + 1,
+                        started_at = coalesce(started_at, {_NOW}),
+                        updated_at = {_NOW}
+                    WHERE export_id = ? AND (
+                        status = 'queued'
+                        OR (status = 'running' AND coalesce(lease_expires_at, '') < {_NOW})
+                    )
+                    """,
+                    [owner, row[0]],
+                )
+                if cursor.rowcount != 1:
+                    return None
+                return row[0]
+
+        export_id = await self.db.execute_write_fn(write)
+        if export_id is None:
+            return None
+        return await self.get_export_job(export_id)
+
+    async def heartbeat_export_jobs(
+        self, owner: str, lease_seconds: float, snapshots: dict[str, dict]
+    ) -> dict[str, bool]:
+        """
+        Extend the lease on jobs this worker owns and write their progress.
+
+        snapshots maps export_id to the progress columns to store (may be
+        empty for jobs with no new progress). All jobs are written in one
+        transaction. Returns {export_id: cancel_requested} for the jobs this
+        worker still owns; a job missing from the result has lost its lease.
+        """
+        lease = _lease_expiry(lease_seconds)
+        allowed = {
+            "phase", "completed", "total", "current_filing_id", "current",
+            "total_exported", "warnings",
+        }
+
+        def write(conn):
+            owned = {}
+            with conn:
+                for export_id, snapshot in snapshots.items():
+                    updates = {k: v for k, v in snapshot.items() if k in allowed}
+                    if "warnings" in updates:
+                        updates["warnings"] = json.dumps(updates["warnings"] or [])
+                    set_parts = [f"{k} = ?" for k in updates]
+                    set_parts.append(f"lease_expires_at = {lease}")
+                    set_parts.append(f"updated_at = {_NOW}")
+                    conn.execute(
+                        f"UPDATE datasette_libfec_export_jobs SET {', '.join(set_parts)} "
+                        "WHERE export_id = ? AND owner = ? AND status = 'running'",
+                        [*updates.values(), export_id, owner],
+                    )
+                if snapshots:
+                    placeholders = ", ".join("?" for _ in snapshots)
+                    for row in conn.execute(
+                        "SELECT export_id, cancel_requested "
+                        "FROM datasette_libfec_export_jobs "
+                        f"WHERE export_id IN ({placeholders}) AND owner = ? "
+                        "AND status = 'running'",
+                        [*snapshots, owner],
+                    ):
+                        owned[row[0]] = bool(row[1])
+            return owned
+
+        return await self.db.execute_write_fn(write)
+
+    async def finish_export_job(self, export_id: str, owner: str, **kwargs) -> None:
+        """Record a job's outcome and release its lease."""
+        allowed = {
+            "phase", "completed", "total", "current_filing_id", "current",
+            "total_exported", "warnings", "error_message", "db_export_id",
+        }
+
+        def write(conn):
+            updates = {k: v for k, v in kwargs.items() if k in allowed}
+            if "warnings" in updates:
+                updates["warnings"] = json.dumps(updates["warnings"] or [])
+            phase = updates.get("phase")
+            updates["status"] = phase if phase in ("complete", "canceled") else "error"
+            if updates["status"] == "error" and not updates.get("error_message"):
+                # Say why a job that didn't report an error counts as failed
+                updates["error_message"] = f"export ended in phase {phase or 'unknown'}"
+            set_parts = [f"{k} = ?" for k in updates]
+            set_parts.extend(
+                [
+                    "owner = NULL",
+                    "lease_expires_at = NULL",
+                    f"finished_at = {_NOW}",
+                    f"updated_at = {_NOW}",
+                ]
+            )
+            with conn:
+                conn.execute(
+                    f"UPDATE datasette_libfec_export_jobs SET {', '.join(set_parts)} "
+                    "WHERE export_id = ? AND owner = ?",
+                    [*updates.values(), export_id, owner],
+                )
+
+        await self.db.execute_write_fn(write)
+
+    async def request_export_cancel(self, export_id: str) -> Optional[str]:
+        """
+        Cancel a job. Queued jobs are canceled immediately; running jobs are
+        flagged for their owner to cancel. Returns the job's status afterwards,
+        or None if the job doesn't exist.
+        """
+
+        def write(conn):
+            with conn:
+                conn.execute(
+                    f"""
+                    UPDATE datasette_libfec_export_jobs
+                    SET status = 'canceled', phase = 'canceled',
+                        finished_at = {_NOW}, updated_at = {_NOW}
+                    WHERE export_id = ? AND status = 'queued'
+                    """,
+                    [export_id],
+                )
+                conn.execute(
+                    f"""
+                    UPDATE datasette_libfec_export_jobs
+                    SET cancel_requested = 1, updated_at = {_NOW}
+                    WHERE export_id = ? AND status = 'running'
+                    """,
+                    [export_id],
+                )
+                row = conn.execute(
+                    "SELECT status FROM datasette_libfec_export_jobs WHERE export_id = ?",
+                    [export_id],
+                ).fetchone()
+                return row[0] if row else None
+
+        return await self.db.execute_write_fn(write)
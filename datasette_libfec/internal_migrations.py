@@ -44,3 +44,120 @@ def m002_rss_progress(db: Database):
         INSERT OR IGNORE INTO datasette_libfec_rss_progress (id) VALUES (1);
         """
     )
+
+
+@internal_migrations()
+def m003_export_jobs(db: Database):
+    db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS datasette_libfec_export_jobs (
+            export_id TEXT PRIMARY KEY,
+            database_name TEXT NOT NULL,
+            output_db TEXT NOT NULL,
+            params TEXT NOT NULL DEFAULT '{}',
+            status TEXT NOT NULL DEFAULT 'queued',
+            phase TEXT NOT NULL DEFAULT 'queued',
+            completed INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            current_filing_id TEXT,
+            current TEXT,
+            total_exported INTEGER,
+            warnings TEXT NOT NULL DEFAULT '[]',
+            error_message TEXT,
+            db_export_id INTEGER,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            owner TEXT,
+            lease_expires_at TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+            started_at TEXT,
+            finished_at TEXT,
+            updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+        );
+
+        CREATE INDEX IF NOT EXISTS datasette_libfec_export_jobs_status
+            ON datasette_libfec_export_jobs (status, created_at);
+        """
+    )
+
+
+@internal_migrations()
+def m004_rss_progress_stderr(db: Database):
+    db["datasette_libfec_rss_progress"].add_column("stderr", str)
+
+
+@internal_migrations()
+def m005_rss_watermarks(db: Database):
+    db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS datasette_libfec_rss_watermarks (
+            database_name TEXT PRIMARY KEY,
+            filters TEXT NOT NULL DEFAULT '{}',
+            last_pub_date TEXT,
+            feed_last_modified TEXT,
+            updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+        );
+        """
+    )
+
+
+@internal_migrations()
+def m006_rss_watermark_validators(db: Database):
+    table = db["datasette_libfec_rss_watermarks"]
+    table.add_column("etag", str)
+    table.add_column("http_last_modified", str)
+
+
+@internal_migrations()
+def m007_rss_adaptive_interval(db: Database):
+    config = db["datasette_libfec_rss_config"]
+    config.add_column("adaptive_interval", int, not_null_default=0)
+    config.add_column("min_interval_seconds", int, not_null_default=15)
+    config.add_column("max_interval_seconds", int, not_null_default=900)
+    db["datasette_libfec_rss_progress"].add_column("current_interval_seconds", int)
+
+
+@internal_migrations()
+def m008_rss_subscriptions(db: Database):
+    db.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS datasette_libfec_rss_subscriptions (
+            name TEXT PRIMARY KEY,
+            database_name TEXT NOT NULL,
+            state_filter TEXT,
+            cover_only INTEGER NOT NULL DEFAULT 1,
+            since_duration TEXT NOT NULL DEFAULT '1 day',
+            enabled INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+            updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+        );
+        """
+    )
+    # High-water marks are now per subscription; the watcher's own settings
+    # are the "default" subscription
+    db["datasette_libfec_rss_watermarks"].transform(
+        rename={"database_name": "subscription"}
+    )
+    db.execute(
+        """
+        DELETE FROM datasette_libfec_rss_watermarks WHERE subscription IS NOT (
+            SELECT database_name FROM datasette_libfec_rss_config WHERE id = 1
+        )
+        """
+    )
+    db.execute("UPDATE datasette_libfec_rss_watermarks SET subscription = 'default'")
+
+
+@internal_migrations()
+def m009_rss_subscription_status(db: Database):
+    # The outcome of each subscription's last sync; the default subscription
+    # keeps using datasette_libfec_rss_progress
+    table = db["datasette_libfec_rss_subscriptions"]
+    table.add_column("phase", str)
+    table.add_column("exported_count", int)
+    table.add_column("total_count", int)
+    table.add_column("error_message", str)
+    table.add_column("error_code", str)
+    table.add_column("stderr", str)
+    table.add_column("sync_started_at", str)
+    table.add_column("sync_finished_at", str)
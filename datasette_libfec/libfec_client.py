@@ -8,6 +8,11 @@ import time
 from pathlib import Path
 from typing import Optional, TYPE_CHECKING, List
 
+from .export_pool import ExportProcessPool
+from .progress_aggregator import ProgressAggregator
+from .rss_process import RssProcessManager
+from .rpc_transport import STALL_SECONDS
+
 if TYPE_CHECKING:
     from .libfec_rpc_client import LibfecRpcClient
     from .libfec_export_rpc_client import LibfecExportRpcClient
@@ -29,6 +34,16 @@ class LibfecClient:
                     self.libfec_path = Path(found)
                 else:
                     self.libfec_path = candidate
+        self.export_pool = ExportProcessPool(str(self.libfec_path))
+        self.rss_process = RssProcessManager(str(self.libfec_path))
+        # Exports and syncs fail when libfec sends no progress for this long
+        self.stall_seconds = STALL_SECONDS
+        # Optional hard limits on how long an export or sync may take
+        self.export_deadline_seconds: Optional[float] = None
+        self.sync_deadline_seconds: Optional[float] = None
+        # Checked with a conditional request before each RSS run, if set. An
+        # extra request on top of libfec's own, so off by default
+        self.rss_feed_url: Optional[str] = None
 
     async def _run_libfec_command_async(self, args):
         """Async command execution - doesn't block event loop"""
@@ -76,7 +91,7 @@ class LibfecClient:
 
         Updates watcher_state with progress information from RPC notifications.
         """
-        from .libfec_rpc_client import LibfecRpcClient, RpcError
+        from .libfec_rpc_client import RpcError
 
         # Reset progress state
         watcher_state.phase = "idle"
@@ -88,47 +103,56 @@ class LibfecClient:
         watcher_state.error_message = None
         watcher_state.error_code = None
         watcher_state.error_data = None
+        watcher_state.stderr = None
         watcher_state.sync_start_time = time.time()
 
-        # Use RPC mode
-        rpc_client = LibfecRpcClient(str(self.libfec_path))
-        watcher_state.rpc_client = rpc_client
-
-        def on_progress(notification: dict) -> None:
-            """Progress callback - updates watcher_state from RPC notifications"""
-            method = notification.get("method")
-            params = notification.get("params", {})
-
-            if method == "sync/progress":
-                watcher_state.phase = params.get("phase", "idle")
-                watcher_state.exported_count = params.get("exported_count", 0)
-                watcher_state.total_count = params.get("total_count", 0)
-                watcher_state.current_filing_id = params.get("current_filing_id")
-                watcher_state.feed_title = params.get("feed_title")
-                watcher_state.feed_last_modified = params.get("feed_last_modified")
-
-                # Update currently_syncing based on phase
-                watcher_state.currently_syncing = watcher_state.phase in (
-                    "fetching",
-                    "exporting",
-                )
+        rpc_client = None
+        reusable = False
+
+        def apply_progress(params: dict) -> None:
+            """Updates watcher_state from the latest sync/progress notification"""
+            watcher_state.phase = params.get("phase", "idle")
+            watcher_state.exported_count = params.get("exported_count", 0)
+            watcher_state.total_count = params.get("total_count", 0)
+            watcher_state.current_filing_id = params.get("current_filing_id")
+            watcher_state.feed_title = params.get("feed_title")
+            watcher_state.feed_last_modified = params.get("feed_last_modified")
+
+            # Update currently_syncing based on phase
+            watcher_state.currently_syncing = watcher_state.phase in (
+                "fetching",
+                "exporting",
+            )
+            watcher_state.progress_changed()
+
+        # Bursts of notifications are applied once, with the latest values
+        on_progress = ProgressAggregator("sync/progress", apply_progress)
 
         try:
             watcher_state.currently_syncing = True
-            await rpc_client.start_process()
-
-            result = await rpc_client.sync_start(
-                since=since,
-                state=state,
-                cover_only=cover_only,
-                output_path=output_db,
-                progress_callback=on_progress,
-                write_metadata=True,
-            )
+            # The resident process, unless it needs (re)starting
+            rpc_client = await self.rss_process.acquire()
+            watcher_state.rpc_client = rpc_client
+
+            try:
+                result = await rpc_client.sync_start(
+                    since=since,
+                    state=state,
+                    cover_only=cover_only,
+                    output_path=output_db,
+                    progress_callback=on_progress,
+                    write_metadata=True,
+                    stall_seconds=self.stall_seconds,
+                    deadline_seconds=self.sync_deadline_seconds,
+                )
+            finally:
+                # Apply the last notification before the outcome
+                on_progress.flush()
 
             # Mark as complete
             watcher_state.phase = "complete"
             print(f"RSS sync complete: {result}")
+            reusable = True
 
         except RpcError as e:
             watcher_state.phase = "error"
@@ -137,10 +161,10 @@ class LibfecClient:
             watcher_state.error_data = str(e.data) if e.data else None
             print(f"RPC error: {e}, data: {e.data}")
 
-        except asyncio.TimeoutError:
+        except asyncio.TimeoutError as e:
             watcher_state.phase = "error"
-            watcher_state.error_message = "Sync timed out after 5 minutes"
-            print("RSS sync timeout")
+            watcher_state.error_message = str(e)
+            print(f"RSS sync timeout: {e}")
 
         except Exception as e:
             watcher_state.phase = "error"
@@ -149,14 +173,11 @@ class LibfecClient:
 
         finally:
             watcher_state.currently_syncing = False
-            try:
-                await rpc_client.shutdown()
-            except Exception as e:
-                print(f"Error shutting down RPC client: {e}")
-                try:
-                    await rpc_client.terminate()
-                except Exception:
-                    pass
+            if rpc_client is not None:
+                if watcher_state.phase == "error":
+                    watcher_state.stderr = rpc_client.stderr_tail()
+                # Processes that errored or timed out are shut down, not reused
+                await self.rss_process.release(rpc_client, reusable)
             watcher_state.rpc_client = None
 
     async def export_with_progress(
@@ -167,16 +188,18 @@ class LibfecClient:
         cover_only: bool,
         clobber: bool,
         export_state: ExportState,
+        deadline_seconds: Optional[float] = None,
     ) -> None:
         """
         Run export using RPC mode with real-time progress tracking.
 
         Updates export_state with progress information from RPC notifications.
+        deadline_seconds overrides export_deadline_seconds for this export.
         """
-        from .libfec_export_rpc_client import LibfecExportRpcClient, RpcError
+        from .libfec_export_rpc_client import RpcError
 
         # Reset progress state
-        export_state.phase = "idle"
+        export_state.phase = "starting"
         export_state.completed = 0
         export_state.total = 0
         export_state.current_filing_id = None
@@ -186,51 +209,59 @@ class LibfecClient:
         export_state.error_message = None
         export_state.export_start_time = time.time()
 
-        # Use RPC mode
-        rpc_client = LibfecExportRpcClient(str(self.libfec_path), output_db)
+        # Use a warm RPC process from the pool if there is one
+        rpc_client = await self.export_pool.acquire(output_db)
         export_state.rpc_client = rpc_client
-
-        def on_progress(notification: dict) -> None:
-            """Progress callback - updates export_state from RPC notifications"""
-            method = notification.get("method")
-            params = notification.get("params", {})
-
-            if method == "export/progress":
-                export_state.phase = params.get("phase", "idle")
-                export_state.completed = params.get("completed", 0)
-                export_state.total = params.get("total", 0)
-                export_state.current_filing_id = params.get("current_filing_id")
-                export_state.current = params.get("current")
-                export_state.total_exported = params.get("total_exported")
-                export_state.warnings = params.get("warnings", [])
-                if params.get("error_message"):
-                    export_state.error_message = params["error_message"]
+        reusable = False
+
+        def apply_progress(params: dict) -> None:
+            """Updates export_state from the latest export/progress notification"""
+            export_state.phase = params.get("phase", "idle")
+            export_state.completed = params.get("completed", 0)
+            export_state.total = params.get("total", 0)
+            export_state.current_filing_id = params.get("current_filing_id")
+            export_state.current = params.get("current")
+            export_state.total_exported = params.get("total_exported")
+            # Accumulated by the aggregator; the list only grows
+            export_state.warnings = on_progress.warnings
+            if params.get("error_message"):
+                export_state.error_message = params["error_message"]
+            export_state.progress_changed()
+
+        # Bursts of notifications are applied once, with the latest values
+        on_progress = ProgressAggregator("export/progress", apply_progress)
 
         try:
             export_state.running = True
-            await rpc_client.start_process()
-
-            result = await rpc_client.export_start(
-                filings=filings,
-                cycle=cycle,
-                cover_only=cover_only,
-                clobber=clobber,
-                progress_callback=on_progress,
-            )
 
-            # Mark as complete
-            export_state.phase = "complete"
+            try:
+                result = await rpc_client.export_start(
+                    filings=filings,
+                    cycle=cycle,
+                    cover_only=cover_only,
+                    clobber=clobber,
+                    progress_callback=on_progress,
+                    stall_seconds=self.stall_seconds,
+                    deadline_seconds=deadline_seconds or self.export_deadline_seconds,
+                )
+            finally:
+                # Apply the last notification before the outcome
+                on_progress.flush()
+
+            # Mark as complete (or canceled, if export/cancel was sent)
+            export_state.phase = result.get("phase", "complete")
             print(f"Export complete: {result}")
+            reusable = True
 
         except RpcError as e:
             export_state.phase = "error"
             export_state.error_message = str(e.data) if e.data else e.message
             print(f"RPC error: {e}")
 
-        except asyncio.TimeoutError:
+        except asyncio.TimeoutError as e:
             export_state.phase = "error"
-            export_state.error_message = "Export timed out after 5 minutes"
-            print("Export timeout")
+            export_state.error_message = str(e)
+            print(f"Export timeout: {e}")
 
         except Exception as e:
             export_state.phase = "error"
@@ -239,14 +270,8 @@ class LibfecClient:
 
         finally:
             export_state.running = False
-            try:
-                await rpc_client.shutdown()
-            except Exception as e:
-                print(f"Error shutting down RPC client: {e}")
-                try:
-                    await rpc_client.terminate()
-                except Exception:
-                    pass
+            # Processes that errored or timed out are shut down, not reused
+            await self.export_pool.release(rpc_client, reusable)
             export_state.rpc_client = None
 
 
@@ -272,9 +297,13 @@ class RssWatcherState:
         self.error_message: Optional[str] = None
         self.error_code: Optional[int] = None
         self.error_data: Optional[str] = None
+        self.stderr: Optional[str] = None
         self.sync_start_time: Optional[float] = None
         self.rpc_client: Optional["LibfecRpcClient"] = None
 
+    def progress_changed(self) -> None:
+        """Called after each sync/progress notification is applied."""
+
 
 # Export state
 class ExportState:
@@ -283,9 +312,7 @@ class ExportState:
         self.running = False
 
         # Progress tracking fields for export RPC mode
-        self.phase: str = (
-            "idle"  # idle|sourcing|downloading_bulk|exporting|complete|canceled|error
-        )
+        self.phase: str = "idle"  # idle|starting|sourcing|downloading_bulk|exporting|complete|canceled|error
         self.completed: int = 0
         self.total: int = 0
         self.current_filing_id: Optional[str] = None
@@ -295,3 +322,6 @@ class ExportState:
         self.error_message: Optional[str] = None
         self.export_start_time: Optional[float] = None
         self.rpc_client: Optional["LibfecExportRpcClient"] = None
+
+    def progress_changed(self) -> None:
+        """Called after each export/progress notification is applied."""
@@ -0,0 +1,104 @@
+"""
+Coalesce progress notifications from the libfec RPC clients.
+
+libfec sends a sync/progress or export/progress notification per filing, and
+RpcProcess dispatches a whole chunk of them in one go. Applying each one to
+the job state (and publishing it to event streams) is wasted work when the
+next one replaces it a microsecond later.
+
+ProgressAggregator is used as the client's progress_callback. It only keeps
+the latest notification's params, so at most one is ever pending, and applies
+it once the current burst has been read, at most once per interval. Warnings
+are the exception: they are accumulated as they arrive, copying only the new
+ones, so none are lost when notifications are skipped.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Minimum time between two applied notifications, in seconds
+APPLY_INTERVAL = 0.05
+
+
+def merge_warnings(warnings: List[str], incoming: List[str]) -> int:
+    """
+    Add the warnings from a notification to warnings, returning how many
+    were new. libfec reports every warning so far, so normally only the tail
+    past what we already have is copied; a list that doesn't continue ours is
+    taken to be new warnings only.
+    """
+    if not incoming:
+        return 0
+    have = len(warnings)
+    if len(incoming) > have and (not have or incoming[have - 1] == warnings[-1]):
+        warnings.extend(incoming[have:])
+        return len(incoming) - have
+    if len(incoming) <= have and incoming[-1] == warnings[-1]:
+        # Nothing since the last notification
+        return 0
+    warnings.extend(incoming)
+    return len(incoming)
+
+
+class ProgressAggregator:
+    """
+    A progress_callback that applies only the latest of a burst of
+    notifications for method, with the warnings accumulated so far.
+
+    apply(params) is called with the notification params; self.warnings is
+    the accumulated list, which only ever grows. Call flush() once the RPC
+    call has finished so the final notification is applied straight away.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        apply: Callable[[dict], None],
+        interval: float = APPLY_INTERVAL,
+    ):
+        self.method = method
+        self.apply = apply
+        self.interval = interval
+        self.warnings: List[str] = []
+        self.pending: Optional[dict] = None
+        # Counters, for benchmarks and debugging
+        self.received = 0
+        self.applied = 0
+        self._handle: Optional[asyncio.Handle] = None
+        self._last_applied = float("-inf")
+
+    def __call__(self, notification: dict) -> None:
+        if notification.get("method") != self.method:
+            return
+        params = notification.get("params") or {}
+        self.received += 1
+        merge_warnings(self.warnings, params.get("warnings") or [])
+        self.pending = params
+        if self._handle is None:
+            loop = asyncio.get_running_loop()
+            delay = self._last_applied + self.interval - loop.time()
+            if delay > 0:
+                self._handle = loop.call_later(delay, self.flush)
+            else:
+                # After the rest of the chunk being dispatched
+                self._handle = loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        """Apply the pending notification, if there is one."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        params, self.pending = self.pending, None
+        if params is None:
+            return
+        self.applied += 1
+        self._last_applied = asyncio.get_running_loop().time()
+        try:
+            self.apply(params)
+        except Exception as e:
+            logger.error(f"Progress callback error: {e}", exc_info=True)
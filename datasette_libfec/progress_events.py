@@ -0,0 +1,215 @@
+"""
+Push export and RSS progress to browsers over Server-Sent Events.
+
+Progress notifications from the libfec RPC clients are published here as they
+arrive. Each open event stream waits for its topic to change and sends the
+fields that differ from what it last sent, at most once per MIN_INTERVAL, so a
+burst of notifications turns into a handful of events per second.
+
+Publishing only reaches streams in the same process. When a topic hasn't been
+published to for REFRESH_SECONDS (say the export runs in another Datasette
+process) it is reloaded from the internal database, once per topic however
+many streams are open.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+# Minimum time between two events on the same stream
+MIN_INTERVAL = 0.25
+# Reload a topic from the database when nothing was published for this long
+REFRESH_SECONDS = 10.0
+
+Loader = Callable[[], Awaitable[Optional[dict]]]
+
+
+class _Topic:
+    def __init__(self):
+        self.state: dict[str, Any] = {}
+        self.version = 0
+        self.updated_at = 0.0
+        self.waiters: set[asyncio.Event] = set()
+
+
+class ProgressBroadcaster:
+    def __init__(self):
+        self._topics: dict[str, _Topic] = {}
+
+    def _topic(self, name: str) -> _Topic:
+        topic = self._topics.get(name)
+        if topic is None:
+            topic = self._topics[name] = _Topic()
+        return topic
+
+    def publish(self, name: str, fields: dict, replace: bool = False) -> None:
+        """Merge fields into (or replace) a topic's state and wake its streams."""
+        topic = self._topic(name)
+        if replace:
+            topic.state = dict(fields)
+        else:
+            topic.state.update(fields)
+        topic.version += 1
+        topic.updated_at = time.monotonic()
+        for waiter in topic.waiters:
+            waiter.set()
+
+    def discard(self, name: str) -> None:
+        """Forget a topic; streams already following it keep their copy."""
+        self._topics.pop(name, None)
+
+    async def refresh(self, name: str, loader: Loader, max_age: float) -> None:
+        """Reload a topic with loader() unless it was updated within max_age."""
+        topic = self._topic(name)
+        if topic.version and time.monotonic() - topic.updated_at < max_age:
+            return
+        # Stamp first so concurrent streams don't all hit the database
+        topic.updated_at = time.monotonic()
+        state = await loader()
+        if state is not None and state != topic.state:
+            self.publish(name, state, replace=True)
+
+    async def follow(
+        self,
+        name: str,
+        loader: Loader,
+        min_interval: float = MIN_INTERVAL,
+        refresh_seconds: float = REFRESH_SECONDS,
+    ) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield a topic's state each time it changes, at most once per
+        min_interval. Yields None after refresh_seconds without a change, so
+        the caller can send a keepalive.
+        """
+        topic = self._topic(name)
+        waiter = asyncio.Event()
+        topic.waiters.add(waiter)
+        try:
+            await self.refresh(name, loader, max_age=refresh_seconds)
+            seen = 0
+            while True:
+                if topic.version == seen:
+                    waiter.clear()
+                    try:
+                        await asyncio.wait_for(waiter.wait(), timeout=refresh_seconds)
+                    except asyncio.TimeoutError:
+                        await self.refresh(name, loader, max_age=refresh_seconds)
+                        if topic.version == seen:
+                            yield None
+                            continue
+                seen = topic.version
+                yield dict(topic.state)
+                await asyncio.sleep(min_interval)
+        finally:
+            topic.waiters.discard(waiter)
+
+
+def changed_fields(previous: Optional[dict], current: dict) -> dict:
+    """The fields of current that differ from previous; dropped fields become None."""
+    if previous is None:
+        return dict(current)
+    delta = {k: v for k, v in current.items() if previous.get(k) != v}
+    for key in previous.keys() - current.keys():
+        if previous[key] is not None:
+            delta[key] = None
+    return delta
+
+
+class EventStream:
+    """Writes a text/event-stream response directly to the ASGI send channel."""
+
+    def __init__(self, send, receive):
+        self._send = send
+        self._receive = receive
+        self.disconnected = asyncio.Event()
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await self._send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    # Stop nginx and friends from buffering the stream
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        self._watcher = asyncio.create_task(self._watch_disconnect())
+
+    async def _watch_disconnect(self) -> None:
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected.set()
+                return
+
+    async def _write(self, chunk: str) -> None:
+        await self._send(
+            {"type": "http.response.body", "body": chunk.encode(), "more_body": True}
+        )
+
+    async def event(self, data: dict, event: str = "progress") -> None:
+        await self._write(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+
+    async def keepalive(self) -> None:
+        await self._write(": keepalive\n\n")
+
+    async def close(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+        if not self.disconnected.is_set():
+            await self._send(
+                {"type": "http.response.body", "body": b"", "more_body": False}
+            )
+
+
+async def stream_topic(
+    send,
+    receive,
+    broadcaster: ProgressBroadcaster,
+    name: str,
+    loader: Loader,
+    is_finished: Callable[[dict], bool] = lambda state: False,
+) -> None:
+    """
+    Serve a topic as an event stream: a full snapshot first, then only the
+    changed fields. Ends when is_finished(state) or the client goes away.
+    """
+    stream = EventStream(send, receive)
+    await stream.start()
+    updates = broadcaster.follow(name, loader)
+    sent: Optional[dict] = None
+    try:
+        while not stream.disconnected.is_set():
+            next_update = asyncio.ensure_future(updates.__anext__())
+            disconnected = asyncio.ensure_future(stream.disconnected.wait())
+            done, _ = await asyncio.wait(
+                {next_update, disconnected}, return_when=asyncio.FIRST_COMPLETED
+            )
+            disconnected.cancel()
+            if next_update not in done:
+                next_update.cancel()
+                try:
+                    await next_update
+                except (asyncio.CancelledError, StopAsyncIteration):
+                    pass
+                break
+            state = next_update.result()
+            if state is None:
+                await stream.keepalive()
+                continue
+            delta = changed_fields(sent, state)
+            if delta:
+                await stream.event(delta)
+            sent = state
+            if is_finished(state):
+                break
+    finally:
+        await updates.aclose()
+        await stream.close()
@@ -2,11 +2,12 @@ from pydantic import BaseModel
 from datasette import Response
 from datasette_plugin_router import Body
 from typing import Optional, List
-import asyncio
-import uuid
 
 from .router import router, check_permission, check_write_permission
-from .state import libfec_client, export_state
+from .state import export_queue, progress
+from .internal_db import InternalDB, ExportJobRow
+from .export_queue import TERMINAL_PHASES, export_status_payload, export_topic
+from .progress_events import EventStream, stream_topic
 
 
 class ExportStartParams(BaseModel):
@@ -14,6 +15,8 @@ class ExportStartParams(BaseModel):
     cycle: Optional[int] = None
     cover_only: bool = False
     clobber: bool = False
+    # Fail the import if it takes longer than this, however it's progressing
+    deadline_seconds: Optional[int] = None
 
 
 class ExportResponse(BaseModel):
@@ -21,6 +24,41 @@ class ExportResponse(BaseModel):
     message: str
     export_id: Optional[str] = None
     phase: Optional[str] = None
+    queue_position: Optional[int] = None
+
+
+class ExportJobRecord(BaseModel):
+    export_id: str
+    status: str
+    phase: str
+    filings: Optional[List[str]] = None
+    cycle: Optional[int] = None
+    cover_only: bool = False
+    completed: int = 0
+    total: int = 0
+    queue_position: Optional[int] = None
+    error_message: Optional[str] = None
+    db_export_id: Optional[int] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
+class ExportJobsResponse(BaseModel):
+    status: str
+    jobs: List[ExportJobRecord]
+
+
+async def _find_job(
+    datasette, request, database: str, export_id: Optional[str] = None
+) -> Optional[ExportJobRow]:
+    """The job named by export_id (or ?export_id=), else the latest for this database."""
+    internal = InternalDB(datasette.get_internal_database())
+    export_id = export_id or request.args.get("export_id")
+    if export_id:
+        job = await internal.get_export_job(export_id)
+        return job if job and job.database_name == database else None
+    return await internal.latest_export_job(database)
 
 
 @router.POST("/(?P<database>[^/]+)/-/api/libfec/export/start", output=ExportResponse)
@@ -28,108 +66,167 @@ class ExportResponse(BaseModel):
 async def export_start(
     datasette, request, database: str, params: Body[ExportStartParams]
 ):
-    if export_state.running:
-        return Response.json(
-            {
-                "status": "error",
-                "message": "Export already in progress",
-                "phase": export_state.phase,
-            },
-            status=400,
-        )
-
     # Get output database
     output_db = datasette.databases[database]
 
-    # Start export in background task
-    async def run_export():
-        await libfec_client.export_with_progress(
-            output_db=output_db.path,
-            filings=params.filings,
-            cycle=params.cycle,
-            cover_only=params.cover_only,
-            clobber=params.clobber,
-            export_state=export_state,
-        )
-
-    export_state.export_id = f"export-{uuid.uuid4()}"
-    asyncio.create_task(run_export())
-
-    # Give it a moment to start
-    await asyncio.sleep(0.1)
+    job = await export_queue.submit(
+        datasette,
+        database=database,
+        output_db=output_db.path,
+        filings=params.filings,
+        cycle=params.cycle,
+        cover_only=params.cover_only,
+        clobber=params.clobber,
+        deadline_seconds=params.deadline_seconds,
+    )
 
     return Response.json(
         ExportResponse(
             status="success",
-            message="Export started",
-            export_id=export_state.export_id,
-            phase=export_state.phase,
+            message="Export queued",
+            export_id=job.export_id,
+            phase=job.phase,
+            queue_position=job.queue_position,
         ).model_dump()
     )
 
 
+async def _export_status(datasette, request, database, export_id=None):
+    job = await _find_job(datasette, request, database, export_id)
+    if job is None:
+        if export_id or request.args.get("export_id"):
+            return Response.json(
+                {"status": "error", "message": "Export not found"}, status=404
+            )
+        return Response.json(
+            {"status": "success", "message": "Export status", "phase": "idle"}
+        )
+
+    return Response.json(export_status_payload(job))
+
+
 @router.GET("/(?P<database>[^/]+)/-/api/libfec/export/status", output=ExportResponse)
 @check_permission()
 async def export_status(datasette, request, database: str):
-    response_data: dict[str, object] = {
-        "status": "success",
-        "message": "Export status",
-        "export_id": export_state.export_id,
-        "phase": export_state.phase,
-    }
-
-    # Add additional fields based on phase
-    if export_state.phase in ("sourcing", "downloading_bulk", "exporting"):
-        response_data["completed"] = export_state.completed
-        response_data["total"] = export_state.total
-
-        if export_state.phase == "downloading_bulk" and export_state.current:
-            response_data["current"] = export_state.current
-        elif export_state.phase == "exporting" and export_state.current_filing_id:
-            response_data["current_filing_id"] = export_state.current_filing_id
-
-    elif export_state.phase == "complete":
-        response_data["total_exported"] = export_state.total_exported
-        response_data["warnings"] = export_state.warnings
-
-        # Get the database export_id for redirect
-        try:
-            db = datasette.databases[database]
-            result = await db.execute(
-                "SELECT export_id FROM libfec_exports ORDER BY export_id DESC LIMIT 1"
-            )
-            row = result.first()
-            if row:
-                response_data["db_export_id"] = row[0]
-        except Exception:
-            pass
+    return await _export_status(datasette, request, database)
 
-    elif export_state.phase == "error":
-        response_data["error_message"] = export_state.error_message
 
-    return Response.json(response_data)
+@router.GET(
+    "/(?P<database>[^/]+)/-/api/libfec/export/(?P<export_id>[^/]+)/status$",
+    output=ExportResponse,
+)
+@check_permission()
+async def export_job_status(datasette, request, database: str, export_id: str):
+    return await _export_status(datasette, request, database, export_id)
 
 
-@router.POST("/(?P<database>[^/]+)/-/api/libfec/export/cancel", output=ExportResponse)
-@check_write_permission()
-async def export_cancel(datasette, request, database: str):
-    if not export_state.running:
+def _export_finished(state: dict) -> bool:
+    return state.get("phase") in TERMINAL_PHASES
+
+
+@router.GET("/(?P<database>[^/]+)/-/api/libfec/export/events$")
+@check_permission()
+async def export_events(datasette, request, send, receive, database: str):
+    """
+    Server-Sent Events stream of an export's status.
+
+    The first event is the same as GET export/status; after that each event
+    has only the fields that changed. The stream ends once the export does.
+    """
+    job = await _find_job(datasette, request, database)
+    if job is None and request.args.get("export_id"):
         return Response.json(
-            {"status": "error", "message": "No export in progress"}, status=400
+            {"status": "error", "message": "Export not found"}, status=404
+        )
+    if job is None or job.status not in ("queued", "running"):
+        # Nothing to follow: send the status once and end the stream
+        payload = (
+            export_status_payload(job)
+            if job
+            else {"status": "success", "message": "Export status", "phase": "idle"}
         )
+        stream = EventStream(send, receive)
+        await stream.start()
+        await stream.event(payload)
+        await stream.close()
+        return None
+
+    internal = InternalDB(datasette.get_internal_database())
+    export_id = job.export_id
+
+    async def load():
+        row = await internal.get_export_job(export_id)
+        return export_status_payload(row) if row else None
+
+    await stream_topic(
+        send,
+        receive,
+        progress,
+        export_topic(export_id),
+        load,
+        is_finished=_export_finished,
+    )
+    return None
+
+
+@router.GET("/(?P<database>[^/]+)/-/api/libfec/export/jobs$", output=ExportJobsResponse)
+@check_permission()
+async def export_jobs(datasette, request, database: str):
+    internal = InternalDB(datasette.get_internal_database())
+    jobs = [
+        ExportJobRecord(
+            export_id=job.export_id,
+            status=job.status,
+            phase=job.phase,
+            filings=job.params.get("filings"),
+            cycle=job.params.get("cycle"),
+            cover_only=job.params.get("cover_only", False),
+            completed=job.completed,
+            total=job.total,
+            queue_position=job.queue_position,
+            error_message=job.error_message,
+            db_export_id=job.db_export_id,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+        )
+        for job in await internal.list_export_jobs(database)
+    ]
+    return Response.json(ExportJobsResponse(status="success", jobs=jobs).model_dump())
+
 
-    # Cancel RPC export if in progress
-    if export_state.rpc_client:
-        try:
-            await export_state.rpc_client.export_cancel()
-        except Exception as e:
-            print(f"Error canceling RPC export: {e}")
+async def _export_cancel(datasette, request, database, export_id=None):
+    job = await _find_job(datasette, request, database, export_id)
+    if job is None and (export_id or request.args.get("export_id")):
+        return Response.json(
+            {"status": "error", "message": "Export not found"}, status=404
+        )
+    if job is None or job.status not in ("queued", "running"):
+        return Response.json(
+            {"status": "error", "message": "No export in progress"}, status=400
+        )
+    await export_queue.cancel(datasette, job.export_id)
 
     return Response.json(
         ExportResponse(
             status="success",
             message="Export canceled",
-            export_id=export_state.export_id,
+            export_id=job.export_id,
             phase="canceled",
         ).model_dump()
     )
+
+
+@router.POST("/(?P<database>[^/]+)/-/api/libfec/export/cancel", output=ExportResponse)
+@check_write_permission()
+async def export_cancel(datasette, request, database: str):
+    return await _export_cancel(datasette, request, database)
+
+
+@router.POST(
+    "/(?P<database>[^/]+)/-/api/libfec/export/(?P<export_id>[^/]+)/cancel$",
+    output=ExportResponse,
+)
+@check_write_permission()
+async def export_job_cancel(datasette, request, database: str, export_id: str):
+    return await _export_cancel(datasette, request, database, export_id)
@@ -3,6 +3,7 @@ from datasette import Response
 from typing import Optional, List, Literal
 
 from .router import router, check_permission
+from .export_data import fetch_export, fetch_export_inputs
 
 
 class ExportRecord(BaseModel):
@@ -111,84 +112,16 @@ async def get_export_detail(datasette, request, database: str, export_id: str):
     export_id_int = int(export_id)
 
     try:
-        # Get export record
-        export_result = await db.execute(
-            """
-            SELECT
-                export_id,
-                export_uuid,
-                created_at,
-                filings_count,
-                cover_only,
-                status,
-                error_message
-            FROM libfec_exports
-            WHERE export_id = ?
-        """,
-            [export_id_int],
-        )
-
-        export_row = export_result.first()
-        if not export_row:
+        export = await fetch_export(db, export_id_int)
+        if not export:
             return Response.json(
                 {"status": "error", "message": "Export not found"}, status=404
             )
 
-        export = {
-            "export_id": export_row[0],
-            "export_uuid": export_row[1],
-            "created_at": export_row[2],
-            "filings_count": export_row[3],
-            "cover_only": bool(export_row[4]),
-            "status": export_row[5],
-            "error_message": export_row[6],
-        }
-
         # Get inputs with their resolved filing IDs
         inputs = []
         try:
-            inputs_result = await db.execute(
-                """
-                SELECT
-                    i.id,
-                    i.input_type,
-                    i.input_value,
-                    i.cycle,
-                    i.office,
-                    i.state,
-                    i.district
-                FROM libfec_export_inputs i
-                WHERE i.export_id = ?
-                ORDER BY i.id
-            """,
-                [export_id_int],
-            )
-
-            for row in inputs_result.rows:
-                input_record = {
-                    "id": row[0],
-                    "input_type": row[1],
-                    "input_value": row[2],
-                    "cycle": row[3],
-                    "office": row[4],
-                    "state": row[5],
-                    "district": row[6],
-                    "filing_ids": [],
-                }
-
-                # Get filing IDs for this input
-                filings_for_input = await db.execute(
-                    """
-                    SELECT filing_id
-                    FROM libfec_export_input_filings
-                    WHERE input_id = ?
-                """,
-                    [row[0]],
-                )
-
-                input_record["filing_ids"] = [f[0] for f in filings_for_input.rows]
-                inputs.append(input_record)
-
+            inputs = await fetch_export_inputs(db, export_id_int)
         except Exception:
             # Table might not exist
             pass
@@ -2,6 +2,10 @@
 Routes for contest, candidate, and committee pages.
 """
 
+import asyncio
+import logging
+import time
+
 from datasette import Response
 
 from .router import (
@@ -11,6 +15,7 @@ from .router import (
     check_alerts_available,
     LIBFEC_WRITE_NAME,
 )
+from .export_data import fetch_export, fetch_export_inputs
 from .page_data import (
     AlertDetailLogEntry,
     AlertDetailPageData,
@@ -37,6 +42,32 @@ from .page_data import (
     WatchlistData,
 )
 
+logger = logging.getLogger("datasette_libfec.pages")
+
+
+async def _timed_execute(db, timings: dict[str, float], name: str, sql, params):
+    """Run a query and record how long it took, in ms, under timings[name]."""
+    start = time.perf_counter()
+    try:
+        return await db.execute(sql, params)
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+def _server_timing_headers(timings: dict[str, float]) -> dict[str, str]:
+    """Report per-query timings as a Server-Timing header (and in the debug log)."""
+    if not timings:
+        return {}
+    logger.debug(
+        "query timings: %s",
+        ", ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items()),
+    )
+    return {
+        "Server-Timing": ", ".join(
+            f"{name};dur={ms:.2f}" for name, ms in timings.items()
+        )
+    }
+
 
 @router.GET("/(?P<database>[^/]+)/-/libfec$")
 @check_permission()
@@ -161,6 +192,74 @@ async def filing_detail_page(datasette, request, database: str, filing_id: str):
     )
 
 
+async def fetch_contest_candidates(
+    db, state: str, office: str, district: str | None, cycle: int
+) -> list[Candidate]:
+    """
+    Candidates in a race, each with their principal committee's latest F3 totals.
+
+    The latest F3 per committee is picked with a window function in the same
+    query, so the cost is one round trip regardless of how many candidates
+    are in the race.
+    """
+    where = "state = ? AND office = ? AND cycle = ?"
+    params: list = [state, office, cycle]
+    if district:
+        where += " AND district = ?"
+        params.append(district)
+
+    if not await db.table_exists("libfec_F3"):
+        result = await db.execute(
+            f"""
+            SELECT * FROM libfec_candidates
+            WHERE {where}
+            GROUP BY candidate_id
+            ORDER BY name
+            """,
+            params,
+        )
+        return [Candidate(**dict(row)) for row in result.rows]
+
+    result = await db.execute(
+        f"""
+        WITH contest_candidates AS (
+            SELECT * FROM libfec_candidates
+            WHERE {where}
+            GROUP BY candidate_id
+        ),
+        ranked_f3 AS (
+            SELECT
+                fil.filer_id,
+                f3.coverage_through_date,
+                f3.col_a_total_receipts,
+                f3.col_a_total_disbursements,
+                f3.col_a_cash_on_hand_close_of_period,
+                ROW_NUMBER() OVER (
+                    PARTITION BY fil.filer_id
+                    ORDER BY f3.coverage_through_date DESC
+                ) AS rn
+            FROM libfec_F3 f3
+            JOIN libfec_filings fil ON f3.filing_id = fil.filing_id
+            WHERE fil.filer_id IN (
+                SELECT principal_campaign_committee FROM contest_candidates
+            )
+        )
+        SELECT
+            c.*,
+            r.coverage_through_date AS f3_coverage_through_date,
+            r.col_a_total_receipts AS f3_total_receipts,
+            r.col_a_total_disbursements AS f3_total_disbursements,
+            r.col_a_cash_on_hand_close_of_period AS f3_cash_on_hand_end
+        FROM contest_candidates c
+        LEFT JOIN ranked_f3 r
+            ON r.filer_id = c.principal_campaign_committee AND r.rn = 1
+        ORDER BY c.name
+        """,
+        params,
+    )
+    return [Candidate(**dict(row)) for row in result.rows]
+
+
 @router.GET("/(?P<database>[^/]+)/-/libfec/contest$")
 @check_permission()
 async def contest_page(datasette, request, database: str):
@@ -188,59 +287,9 @@ async def contest_page(datasette, request, database: str):
 
     try:
         db = datasette.databases[database]
-
-        if office == "H" and district:
-            candidates_result = await db.execute(
-                """
-                SELECT * FROM libfec_candidates
-                WHERE state = ? AND office = ? AND district = ? AND cycle = ?
-                GROUP BY candidate_id
-                ORDER BY name
-                """,
-                [state, office, district, cycle],
-            )
-        else:
-            candidates_result = await db.execute(
-                """
-                SELECT * FROM libfec_candidates
-                WHERE state = ? AND office = ? AND cycle = ?
-                GROUP BY candidate_id
-                ORDER BY name
-                """,
-                [state, office, cycle],
-            )
-
-        # Build candidates list and fetch F3 data for each
-        candidates = []
-        for row in candidates_result.rows:
-            candidate_data = dict(row)
-            committee_id = candidate_data.get("principal_campaign_committee")
-
-            if committee_id:
-                # Get most recent F3 filing for this committee
-                f3_result = await db.execute(
-                    """
-                    SELECT
-                        f3.coverage_through_date,
-                        f3.col_a_total_receipts,
-                        f3.col_a_total_disbursements,
-                        f3.col_a_cash_on_hand_close_of_period
-                    FROM libfec_F3 f3
-                    JOIN libfec_filings fil ON f3.filing_id = fil.filing_id
-                    WHERE fil.filer_id = ?
-                    ORDER BY f3.coverage_through_date DESC
-                    LIMIT 1
-                    """,
-                    [committee_id],
-                )
-                f3_row = f3_result.first()
-                if f3_row:
-                    candidate_data["f3_coverage_through_date"] = f3_row[0]
-                    candidate_data["f3_total_receipts"] = f3_row[1]
-                    candidate_data["f3_total_disbursements"] = f3_row[2]
-                    candidate_data["f3_cash_on_hand_end"] = f3_row[3]
-
-            candidates.append(Candidate(**candidate_data))
+        candidates = await fetch_contest_candidates(
+            db, state, office, district if office == "H" else None, cycle
+        )
 
     except Exception as e:
         error = str(e)
@@ -289,48 +338,60 @@ async def candidate_page(datasette, request, database: str, candidate_id: str):
     committee = None
     filings = []
     error = None
-    principal_committee_id = None
+    timings: dict[str, float] = {}
 
     try:
         db = datasette.databases[database]
 
-        # Fetch candidate from database
-        candidate_result = await db.execute(
-            """
-            SELECT * FROM libfec_candidates
+        # The committee and filings queries look up the principal committee
+        # themselves, so all three can run at once.
+        principal_committee = """
+            SELECT principal_campaign_committee FROM libfec_candidates
             WHERE candidate_id = ? AND cycle = ?
-            """,
-            [candidate_id, cycle],
-        )
-        candidate_row = candidate_result.first()
-        if candidate_row:
-            candidate = Candidate(**dict(candidate_row))
-            principal_committee_id = candidate.principal_campaign_committee
-
-        # Get principal committee if available
-        if principal_committee_id:
-            committee_result = await db.execute(
+            LIMIT 1
+        """
+        candidate_result, committee_result, filings_result = await asyncio.gather(
+            _timed_execute(
+                db,
+                timings,
+                "candidate",
                 """
+                SELECT * FROM libfec_candidates
+                WHERE candidate_id = ? AND cycle = ?
+                """,
+                [candidate_id, cycle],
+            ),
+            _timed_execute(
+                db,
+                timings,
+                "committee",
+                f"""
                 SELECT * FROM libfec_committees
-                WHERE committee_id = ? AND cycle = ?
+                WHERE committee_id = ({principal_committee}) AND cycle = ?
                 """,
-                [principal_committee_id, cycle],
-            )
-            committee_row = committee_result.first()
-            if committee_row:
-                committee = Committee(**dict(committee_row))
-
-            # Fetch filings for this committee
-            filings_result = await db.execute(
-                """
+                [candidate_id, cycle, cycle],
+            ),
+            _timed_execute(
+                db,
+                timings,
+                "filings",
+                f"""
                 SELECT * FROM libfec_filings
-                WHERE filer_id = ?
+                WHERE filer_id = ({principal_committee})
                 ORDER BY filing_id DESC
                 LIMIT 50
                 """,
-                [principal_committee_id],
-            )
-            filings = [Filing(**dict(row)) for row in filings_result.rows]
+                [candidate_id, cycle],
+            ),
+        )
+
+        candidate_row = candidate_result.first()
+        if candidate_row:
+            candidate = Candidate(**dict(candidate_row))
+        committee_row = committee_result.first()
+        if committee_row:
+            committee = Committee(**dict(committee_row))
+        filings = [Filing(**dict(row)) for row in filings_result.rows]
 
     except Exception as e:
         error = str(e)
@@ -353,7 +414,8 @@ async def candidate_page(datasette, request, database: str, candidate_id: str):
                 "entrypoint": "src/candidate_view.ts",
                 "page_data": page_data.model_dump(),
             },
-        )
+        ),
+        headers=_server_timing_headers(timings),
     )
 
 
@@ -377,58 +439,23 @@ async def export_detail_page(datasette, request, database: str, export_id: str):
     error = None
 
     try:
-        # Get export record
-        export_result = await db.execute(
-            """
-            SELECT export_uuid, created_at, status, filings_count, cover_only, error_message
-            FROM libfec_exports
-            WHERE export_id = ?
-        """,
-            [export_id_int],
-        )
-        export_row = export_result.first()
-
-        if not export_row:
+        export = await fetch_export(db, export_id_int)
+        if not export:
             return Response.html("<h1>Export not found</h1>", status=404)
 
-        export_uuid = export_row[0]
-        created_at = export_row[1]
-        status = export_row[2]
-        filings_count = export_row[3] or 0
-        cover_only = bool(export_row[4])
-        error_message = export_row[5]
+        export_uuid = export["export_uuid"]
+        created_at = export["created_at"]
+        status = export["status"]
+        filings_count = export["filings_count"] or 0
+        cover_only = export["cover_only"]
+        error_message = export["error_message"]
 
         # Get inputs
         try:
-            inputs_result = await db.execute(
-                """
-                SELECT id, input_type, input_value, cycle
-                FROM libfec_export_inputs
-                WHERE export_id = ?
-                ORDER BY id
-            """,
-                [export_id_int],
-            )
-
-            for row in inputs_result.rows:
-                input_record = ExportInputInfo(
-                    id=row[0],
-                    input_type=row[1],
-                    input_value=row[2],
-                    cycle=row[3],
-                    filing_ids=[],
-                )
-                # Get filing IDs for this input
-                filings_for_input = await db.execute(
-                    """
-                    SELECT filing_id
-                    FROM libfec_export_input_filings
-                    WHERE input_id = ?
-                """,
-                    [row[0]],
-                )
-                input_record.filing_ids = [f[0] for f in filings_for_input.rows]
-                inputs.append(input_record)
+            inputs = [
+                ExportInputInfo(**input_record)
+                for input_record in await fetch_export_inputs(db, export_id_int)
+            ]
         except Exception:
             pass
 
@@ -510,51 +537,58 @@ async def committee_page(datasette, request, database: str, committee_id: str):
     candidate = None
     filings = []
     error = None
-    candidate_id = None
+    timings: dict[str, float] = {}
 
     try:
         db = datasette.databases[database]
 
-        # Fetch committee from database (prefer requested cycle, fall back to any)
-        committee_result = await db.execute(
-            """
+        # Prefer the requested cycle, fall back to the most recent one. The
+        # candidate query resolves candidate_id itself so it doesn't have to
+        # wait for the committee query.
+        committee_sql = """
             SELECT * FROM libfec_committees
             WHERE committee_id = ?
             ORDER BY CASE WHEN cycle = ? THEN 0 ELSE 1 END, cycle DESC
             LIMIT 1
-            """,
-            [committee_id, cycle],
-        )
-        committee_row = committee_result.first()
-        if committee_row:
-            committee = Committee(**dict(committee_row))
-            candidate_id = committee.candidate_id
-
-        # If this committee has a candidate_id, fetch the candidate
-        if candidate_id:
-            candidate_result = await db.execute(
-                """
+        """
+        committee_result, candidate_result, filings_result = await asyncio.gather(
+            _timed_execute(
+                db, timings, "committee", committee_sql, [committee_id, cycle]
+            ),
+            _timed_execute(
+                db,
+                timings,
+                "candidate",
+                f"""
                 SELECT * FROM libfec_candidates
-                WHERE candidate_id = ?
+                WHERE candidate_id = (
+                    SELECT candidate_id FROM ({committee_sql})
+                )
                 ORDER BY CASE WHEN cycle = ? THEN 0 ELSE 1 END, cycle DESC
                 LIMIT 1
                 """,
-                [candidate_id, cycle],
-            )
-            candidate_row = candidate_result.first()
-            if candidate_row:
-                candidate = Candidate(**dict(candidate_row))
-
-        # Fetch filings for this committee
-        filings_result = await db.execute(
-            """
-            SELECT * FROM libfec_filings
-            WHERE filer_id = ?
-            ORDER BY filing_id DESC
-            LIMIT 50
-            """,
-            [committee_id],
+                [committee_id, cycle, cycle],
+            ),
+            _timed_execute(
+                db,
+                timings,
+                "filings",
+                """
+                SELECT * FROM libfec_filings
+                WHERE filer_id = ?
+                ORDER BY filing_id DESC
+                LIMIT 50
+                """,
+                [committee_id],
+            ),
         )
+
+        committee_row = committee_result.first()
+        if committee_row:
+            committee = Committee(**dict(committee_row))
+        candidate_row = candidate_result.first()
+        if candidate_row:
+            candidate = Candidate(**dict(candidate_row))
         filings = [Filing(**dict(row)) for row in filings_result.rows]
 
     except Exception as e:
@@ -581,7 +615,8 @@ async def committee_page(datasette, request, database: str, committee_id: str):
                 "entrypoint": "src/committee_view.ts",
                 "page_data": page_data.model_dump(),
             },
-        )
+        ),
+        headers=_server_timing_headers(timings),
     )
 
 
@@ -1,23 +1,33 @@
 """RSS watcher API routes — reads progress from internal DB, controls cron task."""
 
+import re
+
 from pydantic import BaseModel
 from datasette import Response
 from datasette_plugin_router import Body
-from typing import Optional
+from typing import List, Optional
 
 from .router import router, check_permission, check_write_permission
-from .internal_db import InternalDB
+from .internal_db import InternalDB, RssSubscription, RssSubscriptionStatus
+from .progress_events import stream_topic
+from .rss_handler import RSS_TOPIC, scheduled_interval
+from .state import progress
 
 
 class RssStatusResponse(BaseModel):
     enabled: bool
     running: bool
     phase: str
+    # The interval the watcher is polling at, chosen by the adaptive
+    # scheduler if adaptive_interval is on
     interval_seconds: int = 60
+    adaptive_interval: bool = False
     seconds_until_next_sync: Optional[int] = None
     exported_count: int = 0
     total_count: int = 0
     error_message: Optional[str] = None
+    # The end of libfec's stderr from the last failed sync
+    stderr: Optional[str] = None
 
 
 class RssConfigResponse(BaseModel):
@@ -28,6 +38,9 @@ class RssConfigResponse(BaseModel):
     since_duration: str = "1 day"
     database_name: Optional[str] = None
     updated_at: Optional[str] = None
+    adaptive_interval: bool = False
+    min_interval_seconds: int = 15
+    max_interval_seconds: int = 900
 
 
 class RssConfigUpdateParams(BaseModel):
@@ -37,6 +50,30 @@ class RssConfigUpdateParams(BaseModel):
     state_filter: Optional[str] = None
     since_duration: Optional[str] = None
     database_name: Optional[str] = None
+    adaptive_interval: Optional[bool] = None
+    min_interval_seconds: Optional[int] = None
+    max_interval_seconds: Optional[int] = None
+
+
+class RssSubscriptionRecord(RssSubscription):
+    last_sync: RssSubscriptionStatus
+
+
+class RssSubscriptionsResponse(BaseModel):
+    subscriptions: List[RssSubscriptionRecord]
+
+
+class RssSubscriptionParams(BaseModel):
+    name: str
+    # Defaults to the database in the URL
+    database_name: Optional[str] = None
+    state_filter: Optional[str] = None
+    cover_only: bool = True
+    since_duration: str = "1 day"
+    enabled: bool = True
+
+
+_SUBSCRIPTION_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
 
 
 class RssSyncRecord(BaseModel):
@@ -87,9 +124,8 @@ def _seconds_until(next_run_at: str | None) -> int | None:
         return None
 
 
-@router.GET("/(?P<database>[^/]+)/-/api/libfec/rss/status$", output=RssStatusResponse)
-@check_permission()
-async def rss_status(datasette, request, database: str):
+async def rss_status_payload(datasette) -> dict:
+    """The RSS status API response, from the internal DB and cron scheduler."""
     internal = InternalDB(datasette.get_internal_database())
     config = await internal.get_rss_config()
     progress = await internal.get_rss_progress()
@@ -106,18 +142,43 @@ async def rss_status(datasette, request, database: str):
     except Exception:
         pass
 
-    return Response.json(
-        RssStatusResponse(
-            enabled=task_enabled,
-            running=progress.get("phase") == "syncing",
-            phase=progress.get("phase", "idle"),
-            interval_seconds=config.interval_seconds,
-            seconds_until_next_sync=_seconds_until(next_run_at),
-            exported_count=progress.get("exported_count", 0),
-            total_count=progress.get("total_count", 0),
-            error_message=progress.get("error_message"),
-        ).model_dump()
-    )
+    return RssStatusResponse(
+        enabled=task_enabled,
+        running=progress.get("phase") == "syncing",
+        phase=progress.get("phase", "idle"),
+        interval_seconds=scheduled_interval(
+            config, progress.get("current_interval_seconds")
+        ),
+        adaptive_interval=config.adaptive_interval,
+        seconds_until_next_sync=_seconds_until(next_run_at),
+        exported_count=progress.get("exported_count", 0),
+        total_count=progress.get("total_count", 0),
+        error_message=progress.get("error_message"),
+        stderr=progress.get("stderr"),
+    ).model_dump()
+
+
+@router.GET("/(?P<database>[^/]+)/-/api/libfec/rss/status$", output=RssStatusResponse)
+@check_permission()
+async def rss_status(datasette, request, database: str):
+    return Response.json(await rss_status_payload(datasette))
+
+
+@router.GET("/(?P<database>[^/]+)/-/api/libfec/rss/events$")
+@check_permission()
+async def rss_events(datasette, request, send, receive, database: str):
+    """
+    Server-Sent Events stream of the RSS watcher status.
+
+    The first event is the same as GET rss/status; after that each event has
+    only the fields that changed.
+    """
+
+    async def load():
+        return await rss_status_payload(datasette)
+
+    await stream_topic(send, receive, progress, RSS_TOPIC, load)
+    return None
 
 
 @router.GET("/(?P<database>[^/]+)/-/api/libfec/rss/config$", output=RssConfigResponse)
@@ -143,7 +204,18 @@ async def rss_config_update(
         updates["database_name"] = database
 
     internal = InternalDB(datasette.get_internal_database())
+    previous = await internal.get_rss_config()
     config = await internal.update_rss_config(**updates)
+    if config.min_interval_seconds > config.max_interval_seconds:
+        config = await internal.update_rss_config(
+            max_interval_seconds=config.min_interval_seconds
+        )
+    adaptive = ("adaptive_interval", "min_interval_seconds", "max_interval_seconds")
+    if any(getattr(config, k) != getattr(previous, k) for k in adaptive):
+        # Start the adaptive scheduler over at the minimum interval
+        await internal.update_rss_progress(current_interval_seconds=None)
+    # Otherwise keep polling at the interval it has adapted to
+    current = (await internal.get_rss_progress()).get("current_interval_seconds")
 
     # Sync cron task with new config
     try:
@@ -152,7 +224,7 @@ async def rss_config_update(
             await scheduler.add_task(
                 name="libfec:rss-sync",
                 handler="libfec:rss-sync",
-                schedule={"interval": config.interval_seconds},
+                schedule={"interval": scheduled_interval(config, current)},
                 config={},
                 overlap="skip",
             )
@@ -163,6 +235,8 @@ async def rss_config_update(
     except Exception:
         pass
 
+    progress.publish(RSS_TOPIC, await rss_status_payload(datasette), replace=True)
+
     return Response.json(config.model_dump())
 
 
@@ -275,3 +349,77 @@ async def rss_sync_detail(datasette, request, database: str, sync_id: str):
             "filings": filings,
         }
     )
+
+
+@router.GET(
+    "/(?P<database>[^/]+)/-/api/libfec/rss/subscriptions$",
+    output=RssSubscriptionsResponse,
+)
+@check_permission()
+async def rss_subscriptions(datasette, request, database: str):
+    """
+    RSS subscriptions besides the watcher's own database and filters, with
+    how each one's last sync went. Every enabled one is synced from the same
+    feed request when the watcher runs, so none sync while it's disabled.
+    """
+    internal = InternalDB(datasette.get_internal_database())
+    subscriptions = await internal.list_rss_subscriptions()
+    statuses = await internal.list_rss_subscription_status()
+    records = [
+        RssSubscriptionRecord(
+            **subscription.model_dump(),
+            last_sync=statuses.get(subscription.name, RssSubscriptionStatus()),
+        )
+        for subscription in subscriptions
+    ]
+    return Response.json(RssSubscriptionsResponse(subscriptions=records).model_dump())
+
+
+@router.POST(
+    "/(?P<database>[^/]+)/-/api/libfec/rss/subscriptions/save$",
+    output=RssSubscription,
+)
+@check_write_permission()
+async def rss_subscription_save(
+    datasette, request, database: str, params: Body[RssSubscriptionParams]
+):
+    """Create or replace the subscription with this name."""
+    if not _SUBSCRIPTION_NAME.match(params.name) or params.name == "default":
+        return Response.json(
+            {
+                "status": "error",
+                "message": "Subscription names are letters, digits, - and _, "
+                "and can't be 'default'",
+            },
+            status=400,
+        )
+    database_name = params.database_name or database
+    db = datasette.databases.get(database_name)
+    if not db or not db.path:
+        return Response.json(
+            {
+                "status": "error",
+                "message": f"Database {database_name} not found or has no file",
+            },
+            status=400,
+        )
+
+    subscription = RssSubscription(
+        **{**params.model_dump(), "database_name": database_name}
+    )
+    internal = InternalDB(datasette.get_internal_database())
+    await internal.save_rss_subscription(subscription)
+    return Response.json(subscription.model_dump())
+
+
+@router.POST(
+    "/(?P<database>[^/]+)/-/api/libfec/rss/subscriptions/(?P<name>[^/]+)/delete$"
+)
+@check_write_permission()
+async def rss_subscription_delete(datasette, request, database: str, name: str):
+    internal = InternalDB(datasette.get_internal_database())
+    if not await internal.delete_rss_subscription(name):
+        return Response.json(
+            {"status": "error", "message": "Subscription not found"}, status=404
+        )
+    return Response.json({"status": "success"})
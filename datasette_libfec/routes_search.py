@@ -1,95 +1,261 @@
+import asyncio
+import json
+
 from pydantic import BaseModel
 from datasette import Response
 from datasette_plugin_router import Body
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 from .router import router, check_permission
-from .state import libfec_client
-
-# Cache for search RPC clients (keyed by cycle)
-search_clients = {}
+from .search_cache import normalize_query
+from .search_index import COMMITTEE_FIELDS, local_search
+from .state import search_cache, search_pools
 
 
 class SearchParams(BaseModel):
     query: str
     cycle: Optional[int] = None
     limit: int = 100
+    # "libfec" asks the libfec search process, falling back to the local index
+    # if it fails; "local" only searches what's imported into this database.
+    mode: Literal["libfec", "local"] = "libfec"
 
 
 class SearchResponse(BaseModel):
     status: str
-    cycle: int
+    cycle: Optional[int]
     query: str
     candidate_count: int
     committee_count: int
     candidates: List[dict]
     committees: List[dict]
+    # Where the results came from: "libfec" or "local"
+    source: str
+
+
+class SearchStatsResponse(BaseModel):
+    status: str
+    cache: dict
+    # Search processes per resident cycle
+    processes: dict
+
+
+class SearchStatusResponse(BaseModel):
+    status: str
+    # Whether every prewarmed cycle has a search process ready
+    ready: bool
+    cycles: dict
+
+
+class SearchStartError(Exception):
+    """No search process could be started for the cycle."""
+
+
+async def fetch_local_committees(
+    db, committee_ids: List[str], cycle: Optional[int]
+) -> dict:
+    """
+    Committees already imported into libfec_committees, by committee_id, in
+    the shape search results use. One query for all of committee_ids;
+    cycle=None looks in every cycle.
+    """
+    if db is None or not committee_ids:
+        return {}
+    if not await db.table_exists("libfec_committees"):
+        return {}
+    result = await db.execute(
+        """
+        SELECT * FROM libfec_committees
+        WHERE (:cycle IS NULL OR cycle = :cycle)
+          AND committee_id IN (SELECT value FROM json_each(:ids))
+        """,
+        {"cycle": cycle, "ids": json.dumps(committee_ids)},
+    )
+    found = {}
+    for row in result.rows:
+        row = dict(row)
+        found.setdefault(
+            row["committee_id"], {field: row.get(field) for field in COMMITTEE_FIELDS}
+        )
+    return found
+
+
+async def fetch_committees(
+    db, client, committee_ids: List[str], cycle: int, max_in_flight: int = 4
+) -> list:
+    """
+    Committee records for committee_ids, in order, skipping any that can't be
+    found. They come from libfec_committees where imported; the rest are
+    requested from the search process concurrently, at most max_in_flight
+    at a time, rather than one by one.
+    """
+    local = await fetch_local_committees(db, committee_ids, cycle)
+    remote_ids = [c for c in committee_ids if c not in local]
+    # Keep to the process's in-flight limit, which the single slot this
+    # search holds doesn't account for
+    slots = asyncio.Semaphore(max_in_flight)
+
+    async def get_committee(committee_id: str):
+        async with slots:
+            return await client.get_committee(committee_id, cycle)
+
+    remote = await asyncio.gather(
+        *[get_committee(c) for c in remote_ids],
+        return_exceptions=True,
+    )
+    # Skip committees whose lookup failed
+    found = dict(local)
+    for committee_id, committee in zip(remote_ids, remote):
+        if committee and not isinstance(committee, BaseException):
+            found[committee_id] = committee
+    return [found[c] for c in committee_ids if c in found]
+
+
+async def run_search(db, cycle: int, query: str, limit: int) -> dict:
+    """Run a search on one of the cycle's search processes."""
+    # Reserve a slot on one of this cycle's search processes
+    pool = search_pools.for_cycle(cycle)
+    try:
+        client = await pool.acquire()
+    except Exception as e:
+        raise SearchStartError(str(e)) from e
+
+    try:
+        result = await client.search_query(query=query, cycle=cycle, limit=limit)
+
+        candidates = result["candidates"]
+        committees = result["committees"]
+
+        # Include principal campaign committees for matched candidates
+        missing_committee_ids = principal_committee_ids(candidates, committees)
+        committees.extend(
+            await fetch_committees(
+                db, client, missing_committee_ids, cycle, pool.max_in_flight
+            )
+        )
+
+        return {
+            "status": "success",
+            "cycle": result["cycle"],
+            "query": result["query"],
+            "candidate_count": result["candidate_count"],
+            "committee_count": len(committees),
+            "candidates": candidates,
+            "committees": committees,
+            "source": "libfec",
+        }
+    finally:
+        pool.release(client)
 
 
-@router.POST("/(?P<database>[^/]+)/-/api/libfec/search", output=SearchResponse)
+def principal_committee_ids(candidates: List[dict], committees: List[dict]) -> list:
+    """Principal campaign committees of candidates not already in committees."""
+    existing_committee_ids = {c["committee_id"] for c in committees}
+    missing_committee_ids = []
+    for candidate in candidates:
+        pcc_id = candidate.get("principal_campaign_committee")
+        if pcc_id and pcc_id not in existing_committee_ids:
+            missing_committee_ids.append(pcc_id)
+            existing_committee_ids.add(pcc_id)  # Avoid duplicates
+    return missing_committee_ids
+
+
+async def run_local_search(
+    db, cycle: Optional[int], query: str, limit: int
+) -> Optional[dict]:
+    """
+    Search the FTS index of this database's imported candidates and
+    committees. None if the database has nothing to search.
+    """
+    if db is None:
+        return None
+    result = await local_search(db, query, cycle, limit)
+    if result is None:
+        return None
+    candidates = result["candidates"]
+    committees = result["committees"]
+    local = await fetch_local_committees(
+        db, principal_committee_ids(candidates, committees), cycle
+    )
+    committees.extend(local.values())
+    return {
+        "status": "success",
+        "cycle": cycle,
+        "query": query,
+        "candidate_count": len(candidates),
+        "committee_count": len(committees),
+        "candidates": candidates,
+        "committees": committees,
+        "source": "local",
+    }
+
+
+@router.POST("/(?P<database>[^/]+)/-/api/libfec/search$", output=SearchResponse)
 @check_permission()
 async def search(datasette, request, database: str, params: Body[SearchParams]):
-    """Search for candidates and committees using libfec search --rpc"""
-    from .libfec_search_rpc_client import LibfecSearchRpcClient, RpcError
+    """
+    Search for candidates and committees using libfec search --rpc, or the
+    local FTS index with mode="local".
+    """
+    db = datasette.databases.get(database)
 
-    cycle = params.cycle or 2026
-
-    # Get or create search client for this cycle
-    if cycle not in search_clients:
+    if params.mode == "local":
         try:
-            client = LibfecSearchRpcClient(str(libfec_client.libfec_path), cycle)
-            await client.start_process()
-            search_clients[cycle] = client
+            result = await run_local_search(
+                db, params.cycle, params.query, params.limit
+            )
         except Exception as e:
+            return Response.json(
+                {"status": "error", "message": f"Search failed: {str(e)}"},
+                status=500,
+            )
+        if result is None:
             return Response.json(
                 {
                     "status": "error",
-                    "message": f"Failed to start search process: {str(e)}",
+                    "message": "No imported candidates or committees to search",
                 },
-                status=500,
+                status=404,
             )
+        return Response.json(result)
 
-    client = search_clients[cycle]
+    cycle = params.cycle or 2026
+    # Principal committees can come from this database's libfec_committees,
+    # so results aren't shared between databases
+    key = (database, normalize_query(params.query), cycle, params.limit)
 
     try:
-        result = await client.search_query(
-            query=params.query, cycle=cycle, limit=params.limit
+        # Identical searches share a cached result, or one in-flight RPC call
+        result = await search_cache.get_or_compute(
+            key, lambda: run_search(db, cycle, params.query, params.limit)
         )
+        return Response.json(dict(result, query=params.query))
+    except Exception as e:
+        error = search_error_response(e)
 
-        candidates = result["candidates"]
-        committees = result["committees"]
+    # libfec is missing or failing: answer from the local index if there is one.
+    # Not cached, so libfec results come back as soon as it recovers.
+    try:
+        result = await run_local_search(db, cycle, params.query, params.limit)
+    except Exception:
+        result = None
+    if result is None:
+        return error
+    return Response.json(result)
 
-        # Include principal campaign committees for matched candidates
-        existing_committee_ids = {c["committee_id"] for c in committees}
-        missing_committee_ids = []
-        for candidate in candidates:
-            pcc_id = candidate.get("principal_campaign_committee")
-            if pcc_id and pcc_id not in existing_committee_ids:
-                missing_committee_ids.append(pcc_id)
-                existing_committee_ids.add(pcc_id)  # Avoid duplicates
-
-        # Fetch missing principal committees
-        for committee_id in missing_committee_ids:
-            try:
-                committee = await client.get_committee(committee_id, cycle)
-                if committee:
-                    committees.append(committee)
-            except Exception:
-                pass  # Skip if committee lookup fails
 
+def search_error_response(e: Exception) -> Response:
+    from .libfec_search_rpc_client import RpcError
+
+    if isinstance(e, SearchStartError):
         return Response.json(
             {
-                "status": "success",
-                "cycle": result["cycle"],
-                "query": result["query"],
-                "candidate_count": result["candidate_count"],
-                "committee_count": len(committees),
-                "candidates": candidates,
-                "committees": committees,
-            }
+                "status": "error",
+                "message": f"Failed to start search process: {str(e)}",
+            },
+            status=500,
         )
-
-    except RpcError as e:
+    if isinstance(e, RpcError):
         return Response.json(
             {
                 "status": "error",
@@ -98,7 +264,37 @@ async def search(datasette, request, database: str, params: Body[SearchParams]):
             },
             status=500,
         )
-    except Exception as e:
-        return Response.json(
-            {"status": "error", "message": f"Search failed: {str(e)}"}, status=500
-        )
+    return Response.json(
+        {"status": "error", "message": f"Search failed: {str(e)}"}, status=500
+    )
+
+
+@router.GET(
+    "/(?P<database>[^/]+)/-/api/libfec/search/stats$", output=SearchStatsResponse
+)
+@check_permission()
+async def search_stats(datasette, request, database: str):
+    """Search result cache counters and search processes, for monitoring."""
+    return Response.json(
+        SearchStatsResponse(
+            status="success",
+            cache=search_cache.stats(),
+            processes=search_pools.stats(),
+        ).model_dump()
+    )
+
+
+@router.GET(
+    "/(?P<database>[^/]+)/-/api/libfec/search/status$", output=SearchStatusResponse
+)
+@check_permission()
+async def search_status(datasette, request, database: str):
+    """Readiness of the search processes prewarmed at startup."""
+    cycles = search_pools.readiness()
+    return Response.json(
+        SearchStatusResponse(
+            status="success",
+            ready=all(c["state"] == "ready" for c in cycles.values()),
+            cycles=cycles,
+        ).model_dump()
+    )
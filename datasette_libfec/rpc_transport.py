@@ -0,0 +1,493 @@
+"""
+Shared JSON-RPC 2.0 transport for the `libfec ... --rpc` subprocesses.
+
+libfec speaks JSONL on stdin/stdout: one request, response or notification
+per line. RpcProcess spawns the subprocess, reads its stdout, routes
+responses to the waiting request by ID and hands notifications to
+handle_notification(), which the export, RSS and search clients override.
+
+Reading is done in large chunks that are split into lines here, so a burst of
+progress notifications costs one event-loop wakeup rather than one per line.
+Lines are decoded with orjson when it is installed, falling back to the
+standard library. Lines may be up to LINE_LIMIT bytes; a longer one is logged
+and skipped instead of killing the reader.
+
+stderr is drained continuously into a ring buffer of the last STDERR_LINES
+lines, so a chatty process can never fill the pipe and block, and the tail is
+available for error reports (stderr_tail()).
+
+Requests can be pipelined: any number may be in flight on one process, each
+matched to its response by ID. send_batch() writes several requests in a
+single write. libfec itself rejects JSON-RPC batch arrays, so those are only
+sent when asked for with as_array=True, but array responses are understood.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Longest line accepted from libfec (large search results come as one line)
+LINE_LIMIT = 16 * 1024 * 1024
+# How much of stdout to read at a time
+READ_SIZE = 256 * 1024
+# stderr lines kept per process, and the longest kept line
+STDERR_LINES = 100
+STDERR_LINE_LENGTH = 1000
+# How long to let stderr catch up after stdout closes, in seconds
+STDERR_GRACE = 0.5
+# A long-running job fails if no notification arrives for this long
+STALL_SECONDS = 120.0
+
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+else:
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    loads = json.loads
+
+
+class RpcError(Exception):
+    """JSON-RPC error response"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        self.code = code
+        self.message = message
+        self.data = data
+        super().__init__(f"RPC Error {code}: {message}")
+
+
+def _expire(future: asyncio.Future, method: str) -> None:
+    if not future.done():
+        future.set_exception(TimeoutError(f"RPC request timed out: {method}"))
+
+
+class RpcProcess:
+    """
+    A libfec subprocess speaking JSON-RPC 2.0 over JSONL.
+
+    Subclasses provide command() and handle_notification(), and may override
+    process_exited() to fail their own futures when the process dies.
+    """
+
+    # Used in log messages
+    name = "libfec"
+    # Whether start_process() waits for the server's ready notification
+    wait_for_ready = True
+    # Default timeout for send_request(), in seconds
+    request_timeout = 5.0
+
+    def __init__(self, libfec_path: str):
+        self.libfec_path = libfec_path
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.request_id = 0
+        self.pending_requests: dict[int, asyncio.Future] = {}
+        self.listen_task: Optional[asyncio.Task] = None
+        self.stderr_task: Optional[asyncio.Task] = None
+        self.ready_future: Optional[asyncio.Future] = None
+        # Messages read from stdout, for benchmarks and debugging
+        self.messages_read = 0
+        # Loop time of the last notification, for the stall watchdog
+        self.last_notification_at = 0.0
+        # Most recent stderr lines
+        self.stderr_lines: deque[str] = deque(maxlen=STDERR_LINES)
+        self._closing = False
+
+    def command(self) -> List[str]:
+        """Arguments to run libfec with."""
+        raise NotImplementedError
+
+    def handle_notification(self, method: str, params: dict, msg: dict) -> None:
+        """Called for every notification (a message without an id)."""
+
+    def process_exited(self) -> None:
+        """Called once stdout closes, after pending requests have failed."""
+
+    def is_alive(self) -> bool:
+        """Whether the process is running and its output is still being read."""
+        return (
+            self.process is not None
+            and self.process.returncode is None
+            and self.listen_task is not None
+            and not self.listen_task.done()
+        )
+
+    def stderr_tail(self, lines: int = 20) -> Optional[str]:
+        """The last few lines the process wrote to stderr, if any."""
+        if not self.stderr_lines:
+            return None
+        return "\n".join(list(self.stderr_lines)[-lines:])
+
+    def exit_error(self, message: str) -> RuntimeError:
+        """An error for the process exiting, with the end of its stderr."""
+        tail = self.stderr_tail(5)
+        if tail and not self._closing:
+            message = f"{message}: {tail}"
+        return RuntimeError(message)
+
+    async def start_process(self) -> None:
+        """Spawn the subprocess and, if wait_for_ready, wait until it's ready"""
+        if self.process is not None:
+            raise RuntimeError("Process already started")
+
+        command = self.command()
+        logger.info(f"Starting {self.name} --rpc: {' '.join(command)}")
+
+        loop = asyncio.get_running_loop()
+        self.ready_future = loop.create_future()
+
+        self.process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=LINE_LIMIT,
+        )
+
+        self.listen_task = loop.create_task(self._listen_for_messages())
+        self.stderr_task = loop.create_task(self._listen_for_stderr())
+
+        if not self.wait_for_ready:
+            return
+        try:
+            await asyncio.wait_for(self.ready_future, timeout=5.0)
+            logger.info(f"{self.name} RPC server ready")
+        except asyncio.TimeoutError:
+            logger.error("Timeout waiting for ready notification")
+            await self.terminate()
+            raise RuntimeError(f"{self.name} process did not send ready notification")
+
+    async def _listen_for_stderr(self) -> None:
+        """
+        Drain stderr into stderr_lines, so the process never blocks on a full
+        pipe. Read in chunks like stdout, so overlong lines can't stop it.
+        """
+        if not self.process or not self.process.stderr:
+            return
+
+        stderr = self.process.stderr
+        partial = b""
+        try:
+            while True:
+                chunk = await stderr.read(READ_SIZE)
+                if not chunk:
+                    if partial:
+                        self._stderr_line(partial)
+                    break
+                lines = (partial + chunk).split(b"\n")
+                # Only the start of an unfinished line is kept
+                partial = lines.pop()[:STDERR_LINE_LENGTH]
+                for line in lines:
+                    self._stderr_line(line)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error reading stderr: {e}")
+
+    def _stderr_line(self, line: bytes) -> None:
+        text = line[:STDERR_LINE_LENGTH].decode(errors="replace").rstrip()
+        if text:
+            self.stderr_lines.append(text)
+            logger.warning(f"{self.name} stderr: {text}")
+
+    async def _listen_for_messages(self) -> None:
+        """Read stdout in chunks and dispatch each complete line."""
+        if not self.process or not self.process.stdout:
+            return
+
+        stdout = self.process.stdout
+        buffer = bytearray()
+        # Set while skipping the rest of a line longer than LINE_LIMIT
+        discarding = False
+        try:
+            while True:
+                chunk = await stdout.read(READ_SIZE)
+                if not chunk:
+                    if self._closing:
+                        logger.debug(f"{self.name} process exited")
+                    else:
+                        logger.error(
+                            f"{self.name} process stdout EOF (process crashed?)"
+                        )
+                        # Let stderr catch up: its last lines say why
+                        if self.stderr_task is not None:
+                            await asyncio.wait([self.stderr_task], timeout=STDERR_GRACE)
+                    self._fail_pending(
+                        self.exit_error(f"{self.name} process terminated unexpectedly")
+                    )
+                    self.process_exited()
+                    break
+
+                buffer += chunk
+                start = 0
+                while True:
+                    end = buffer.find(b"\n", start)
+                    if end < 0:
+                        break
+                    if discarding:
+                        discarding = False
+                    elif end > start:
+                        self._handle_line(bytes(buffer[start:end]))
+                    start = end + 1
+                del buffer[:start]
+
+                if len(buffer) > LINE_LIMIT:
+                    logger.error(
+                        f"Skipping line over {LINE_LIMIT} bytes from {self.name}"
+                    )
+                    buffer.clear()
+                    discarding = True
+
+        except asyncio.CancelledError:
+            logger.debug("Message listener cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Error in message listener: {e}", exc_info=True)
+
+    def _handle_line(self, line: bytes) -> None:
+        try:
+            msg = loads(line)
+        except ValueError as e:
+            logger.error(f"Invalid JSON from {self.name}: {line[:200]!r} - {e}")
+            return
+        self._dispatch(msg)
+
+    def _dispatch(self, msg: Any) -> None:
+        if isinstance(msg, list):
+            # Response to a batch array
+            for item in msg:
+                self._dispatch(item)
+            return
+        if not isinstance(msg, dict):
+            logger.error(f"Unexpected message from {self.name}: {msg!r}")
+            return
+        self.messages_read += 1
+
+        if "id" in msg:
+            # Response - match to pending request
+            future = self.pending_requests.get(msg["id"])
+            if future is None or future.done():
+                if msg["id"] is None and "error" in msg:
+                    logger.error(f"{self.name} RPC error: {msg['error']}")
+                return
+            if "error" in msg:
+                err = msg["error"]
+                future.set_exception(
+                    RpcError(
+                        err.get("code", -1),
+                        err.get("message", "Unknown error"),
+                        err.get("data"),
+                    )
+                )
+            elif "result" in msg:
+                future.set_result(msg["result"])
+            else:
+                future.set_exception(RuntimeError(f"Invalid RPC response: {msg}"))
+        elif "method" in msg:
+            self.last_notification_at = asyncio.get_running_loop().time()
+            method = msg["method"]
+            params = msg.get("params") or {}
+            if method == "ready":
+                if self.ready_future and not self.ready_future.done():
+                    self.ready_future.set_result(params)
+            self.handle_notification(method, params, msg)
+
+    def _fail_pending(self, error: Exception) -> None:
+        for future in self.pending_requests.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def _new_request(
+        self, method: str, params: Optional[dict]
+    ) -> Tuple[int, dict, asyncio.Future]:
+        self.request_id += 1
+        # Several requests can be in flight at once, so keep our own ID
+        request_id = self.request_id
+        request: dict[str, Any] = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            request["params"] = params
+        future = asyncio.get_running_loop().create_future()
+        self.pending_requests[request_id] = future
+        return request_id, request, future
+
+    async def _wait(
+        self, future: asyncio.Future, method: str, timeout: Optional[float]
+    ) -> Any:
+        timeout = self.request_timeout if timeout is None else timeout
+        # A timer on the future is cheaper than wait_for's wrapper
+        handle = asyncio.get_running_loop().call_later(timeout, _expire, future, method)
+        try:
+            return await future
+        finally:
+            handle.cancel()
+
+    async def send_request(
+        self,
+        method: str,
+        params: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Send JSON-RPC request via stdin, wait for response.
+
+        Args:
+            method: RPC method name
+            params: Method parameters
+            timeout: Response timeout in seconds (default request_timeout)
+
+        Returns:
+            Result from response
+
+        Raises:
+            RpcError: On JSON-RPC error response
+            TimeoutError: On timeout
+            RuntimeError: On process errors
+        """
+        if not self.process or not self.process.stdin:
+            raise RuntimeError("Process not started")
+
+        request_id, request, future = self._new_request(method, params)
+        try:
+            self.process.stdin.write(dumps(request) + b"\n")
+            await self.process.stdin.drain()
+            logger.debug(f"Sent {self.name} RPC request: {method} (id={request_id})")
+            return await self._wait(future, method, timeout)
+        except TimeoutError:
+            logger.error(f"{self.name} RPC request timeout: {method}")
+            raise
+        finally:
+            self.pending_requests.pop(request_id, None)
+
+    async def send_batch(
+        self,
+        calls: Sequence[Tuple[str, Optional[dict]]],
+        timeout: Optional[float] = None,
+        as_array: bool = False,
+    ) -> List[Any]:
+        """
+        Send several (method, params) requests in one write and wait for all
+        of them. Returns each result, or the exception it failed with, in
+        order. With as_array the requests go as one JSON-RPC batch array,
+        which libfec doesn't accept; otherwise they are pipelined as lines.
+        """
+        if not self.process or not self.process.stdin:
+            raise RuntimeError("Process not started")
+        if not calls:
+            return []
+
+        requests = [self._new_request(method, params) for method, params in calls]
+        try:
+            if as_array:
+                payload = dumps([request for _, request, _ in requests]) + b"\n"
+            else:
+                payload = b"".join(dumps(request) + b"\n" for _, request, _ in requests)
+            self.process.stdin.write(payload)
+            await self.process.stdin.drain()
+            return await asyncio.gather(
+                *[
+                    self._wait(future, method, timeout)
+                    for (_, _, future), (method, _) in zip(requests, calls)
+                ],
+                return_exceptions=True,
+            )
+        finally:
+            for request_id, _, _ in requests:
+                self.pending_requests.pop(request_id, None)
+
+    async def wait_for_progress(
+        self,
+        future: asyncio.Future,
+        what: str,
+        stall_seconds: float = STALL_SECONDS,
+        deadline_seconds: Optional[float] = None,
+    ) -> Any:
+        """
+        Wait for a long-running job's future for as long as the process keeps
+        sending notifications. Raises TimeoutError if none arrive for
+        stall_seconds, or once deadline_seconds have passed if given; the
+        future itself is left alone. what names the job in the error.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = None if deadline_seconds is None else started + deadline_seconds
+        while True:
+            now = loop.time()
+            stall_at = max(self.last_notification_at, started) + stall_seconds
+            if deadline is not None and now >= deadline:
+                logger.error(f"{what} passed its {deadline_seconds:g}s deadline")
+                raise TimeoutError(
+                    f"{what} did not finish within {deadline_seconds:g} seconds"
+                )
+            if now >= stall_at:
+                logger.error(f"{what} stalled: no progress for {stall_seconds:g}s")
+                raise TimeoutError(
+                    f"{what} stalled: no progress for {stall_seconds:g} seconds"
+                )
+            wake_at = stall_at if deadline is None else min(stall_at, deadline)
+            await asyncio.wait([future], timeout=wake_at - now)
+            if future.done():
+                return future.result()
+
+    async def shutdown(self) -> None:
+        """Gracefully shutdown RPC process"""
+        if not self.process:
+            return
+
+        self._closing = True
+        try:
+            await self.send_request("shutdown", timeout=2.0)
+        except Exception as e:
+            logger.warning(f"Shutdown request failed: {e}")
+
+        # Wait for process to exit
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            logger.warning("Process did not exit after shutdown, terminating")
+            await self.terminate()
+
+        await self._cancel_listeners()
+        self.process = None
+
+    async def terminate(self) -> None:
+        """Force kill the process (for cleanup)"""
+        self._closing = True
+        if self.process:
+            try:
+                self.process.terminate()
+                await asyncio.wait_for(self.process.wait(), timeout=2.0)
+            except asyncio.TimeoutError:
+                logger.warning("Process did not terminate, killing")
+                self.process.kill()
+                await self.process.wait()
+            except Exception as e:
+                logger.error(f"Error terminating process: {e}")
+
+        await self._cancel_listeners()
+        self.process = None
+
+    async def _cancel_listeners(self) -> None:
+        for task in [self.listen_task, self.stderr_task]:
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
@@ -0,0 +1,87 @@
+"""
+Conditional requests for the FEC filings RSS feed.
+
+libfec downloads the feed itself on every sync. Before starting any, the RSS
+cron handler makes one request for the feed, conditional on the ETags and
+Last-Modified times every subscription last synced at, and compares the
+validators in the response with each subscription's to skip the syncs of those
+that are up to date. When the feed has changed, the pubDates of its items are
+read from that same response, so subscriptions with nothing newer than their
+last sync can be skipped too: libfec's sync/start can't be given the feed, but
+this way it only downloads it again for subscriptions that have news.
+
+The request is on top of libfec's own, so it only runs when the rss_feed_url
+plugin setting turns it on.
+"""
+
+import urllib.error
+import urllib.request
+from typing import List, Optional
+from xml.etree import ElementTree
+
+# The feed `libfec rss` reads
+FEED_URL = "https://efilingapps.fec.gov/rss/generate?preDefinedFilingType=ALL"
+
+CHECK_TIMEOUT = 10.0
+
+
+class FeedCheck:
+    def __init__(
+        self,
+        not_modified: bool,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        pub_dates: Optional[List[Optional[str]]] = None,
+    ):
+        self.not_modified = not_modified
+        self.etag = etag
+        self.last_modified = last_modified
+        # pubDate of every item in the feed, if it was downloaded and parsed
+        self.pub_dates = pub_dates
+
+
+def item_pub_dates(body: bytes) -> Optional[List[Optional[str]]]:
+    """The pubDate of each item in an RSS document, None if it isn't one."""
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError:
+        return None
+    return [item.findtext("pubDate") for item in root.iter("item")]
+
+
+def check_feed(
+    url: str,
+    etags: Optional[List[str]] = None,
+    last_modified: Optional[str] = None,
+    timeout: float = CHECK_TIMEOUT,
+) -> FeedCheck:
+    """
+    Request url, conditional on any of etags or on last_modified. Blocking, so
+    run it in a thread. Raises on network errors and unexpected statuses.
+    """
+    etags = etags or []
+    headers = {"User-Agent": "datasette-libfec"}
+    if etags:
+        headers["If-None-Match"] = ", ".join(etags)
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return FeedCheck(
+                False,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                item_pub_dates(response.read()),
+            )
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        # A 304 may leave out validators that haven't changed, which is only
+        # unambiguous if a single one was sent. If-None-Match takes precedence
+        # over If-Modified-Since.
+        return FeedCheck(
+            True,
+            e.headers.get("ETag") or (etags[0] if len(etags) == 1 else None),
+            e.headers.get("Last-Modified") or (None if etags else last_modified),
+        )
@@ -3,26 +3,92 @@ RSS sync cron handler — replaces the old RssWatcher background loop.
 
 Registered as a cron handler via cron_register_handlers hook.
 Reads config from internal DB, runs sync, writes progress to internal DB.
+
+Each run syncs every subscription in turn: the watcher's own database and
+filters (the "default" subscription) and any in
+datasette_libfec_rss_subscriptions, on the one resident libfec process. So
+subscriptions only sync while the watcher is enabled. The default
+subscription's progress is the watcher's; the others record theirs on their
+own rows.
+
+Each successful sync records a high-water mark: the newest rss_pub_date it
+imported and the feed's last-modified time. The next sync asks libfec only for
+items since then, less SINCE_OVERLAP, instead of the whole since_duration
+window, so a run that finds nothing new doesn't rescan a day of the feed.
+since_duration still bounds how far back a sync looks, and the mark is
+ignored when the filters it was recorded under have changed.
+
+The mark also keeps the feed's ETag and Last-Modified. With rss_feed_url set,
+a run first makes one conditional request for the feed for all subscriptions
+(see rss_feed.py), and for each subscription the feed hasn't changed for since
+its last sync, records a "not-modified" sync without starting libfec. If the
+feed has changed, the items in that one response are compared with each
+subscription's mark, and those with nothing published since are skipped the
+same way, so libfec only downloads the feed for subscriptions with news. The
+request comes on top of those downloads, so it is off by default.
+
+With adaptive_interval on, the cron task's interval is set after every run:
+min_interval_seconds after a sync that exported new filings, otherwise double
+the last interval, up to max_interval_seconds.
 """
 
 import asyncio
+import json
 import logging
+import re
 import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
 
-from .internal_db import InternalDB
+from .internal_db import InternalDB, RssConfig, RssSubscription
+from .progress_events import ProgressBroadcaster
+from .rss_feed import FeedCheck, check_feed
 
 logger = logging.getLogger("datasette_libfec.rss")
 
+# Progress topic the RSS watcher status is published on
+RSS_TOPIC = "rss"
+
+# How far before the high-water mark a sync starts, for items that show up in
+# the feed later than their pubDate
+SINCE_OVERLAP = timedelta(minutes=10)
+
+# Pending adaptive interval changes, referenced until they finish
+_reschedules: set = set()
+
+_DURATION_RE = re.compile(
+    r"^\s*(\d+)\s*(minute|min|hour|day|week)s?(\s+ago)?\s*$", re.IGNORECASE
+)
+_DURATION_UNITS = {
+    "minute": timedelta(minutes=1),
+    "min": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
 
 class RssProgressWriter:
     """Duck-type compatible callback for libfec RPC client.
 
     The client sets attributes like exported_count, total_count, etc.
     This adapter buffers writes and flushes to the internal DB periodically.
+    For the default subscription it writes the watcher's progress and
+    publishes every change to the RSS progress topic straight away; other
+    subscriptions write their own status row.
     """
 
-    def __init__(self, internal_db: InternalDB):
+    def __init__(
+        self,
+        internal_db: InternalDB,
+        progress: ProgressBroadcaster,
+        subscription: str = "default",
+    ):
         self._db = internal_db
+        self._progress = progress
+        self._subscription = subscription
         self._state = {
             "phase": "syncing",
             "exported_count": 0,
@@ -32,6 +98,7 @@ class RssProgressWriter:
             "error_code": None,
             "feed_title": None,
             "feed_last_modified": None,
+            "stderr": None,
         }
         self._dirty = False
         self._last_flush = 0.0
@@ -50,10 +117,29 @@ class RssProgressWriter:
             return self._state[name]
         raise AttributeError(name)
 
-    async def flush(self):
-        if not self._dirty:
+    def progress_changed(self):
+        if self._subscription != "default":
+            return
+        phase = self._state["phase"]
+        self._progress.publish(
+            RSS_TOPIC,
+            {
+                "phase": phase,
+                "running": phase == "syncing",
+                "exported_count": self._state["exported_count"],
+                "total_count": self._state["total_count"],
+                "error_message": self._state["error_message"],
+                "stderr": self._state["stderr"],
+            },
+        )
+
+    async def flush(self, **fields):
+        """Write buffered progress, plus any extra columns, in one update."""
+        if not self._dirty and not fields:
             return
-        await self._db.update_rss_progress(**self._state)
+        await update_sync_status(
+            self._db, self._subscription, **{**self._state, **fields}
+        )
         self._dirty = False
         self._last_flush = time.time()
 
@@ -64,34 +150,163 @@ class RssProgressWriter:
 
 async def rss_sync_handler(datasette, config):
     """Cron handler for RSS sync. Reads config, runs sync, writes progress."""
-    from .libfec_client import LibfecClient
+    from .state import libfec_client
 
     internal_db = InternalDB(datasette.get_internal_database())
     rss_config = await internal_db.get_rss_config()
+    exported = 0
+    try:
+        subscriptions = [default_subscription(rss_config)] + [
+            subscription
+            for subscription in await internal_db.list_rss_subscriptions()
+            if subscription.enabled
+        ]
+        watermarks = {}
+        for subscription in subscriptions:
+            watermark = await internal_db.get_rss_watermark(subscription.name)
+            # A mark recorded under other filters says nothing about these
+            if watermark and watermark["filters"] == subscription_filters(subscription):
+                watermarks[subscription.name] = watermark
+        # One feed request however many subscriptions there are
+        check = await check_feed_changed(
+            libfec_client.rss_feed_url, list(watermarks.values())
+        )
+        failures = []
+        for subscription in subscriptions:
+            try:
+                exported += await run_sync(
+                    datasette,
+                    internal_db,
+                    subscription,
+                    watermarks.get(subscription.name),
+                    check,
+                )
+            except Exception as e:
+                # Don't let one subscription hold up the rest
+                failures.append(e)
+        if failures:
+            raise failures[0]
+    finally:
+        if rss_config.adaptive_interval:
+            await adapt_interval(datasette, internal_db, rss_config, exported > 0)
+
+
+async def update_sync_status(
+    internal_db: InternalDB, subscription: str, **fields
+) -> None:
+    """
+    Record sync progress: the watcher's progress for the default
+    subscription, otherwise the subscription's own row.
+    """
+    if subscription == "default":
+        await internal_db.update_rss_progress(**fields)
+    else:
+        await internal_db.update_rss_subscription_status(subscription, **fields)
+
+
+def default_subscription(rss_config: RssConfig) -> RssSubscription:
+    """The subscription made of the watcher's own settings."""
+    return RssSubscription(
+        name="default",
+        database_name=rss_config.database_name or "",
+        state_filter=rss_config.state_filter,
+        cover_only=rss_config.cover_only,
+        since_duration=rss_config.since_duration,
+    )
+
+
+def subscription_filters(subscription: RssSubscription) -> dict:
+    return {
+        "since_duration": subscription.since_duration,
+        "state_filter": subscription.state_filter,
+        "cover_only": subscription.cover_only,
+    }
 
-    if not rss_config.database_name:
+
+async def run_sync(
+    datasette,
+    internal_db: InternalDB,
+    subscription: RssSubscription,
+    watermark: Optional[dict],
+    check: Optional[FeedCheck],
+) -> int:
+    """Sync one subscription, returning how many new filings it exported."""
+    from .routes_rss import rss_status_payload
+    from .state import libfec_client, progress as progress_events
+
+    async def publish_status():
+        # The watcher status only covers the default subscription
+        if subscription.name == "default":
+            progress_events.publish(
+                RSS_TOPIC, await rss_status_payload(datasette), replace=True
+            )
+
+    if not subscription.database_name:
         logger.warning("RSS sync: no database_name configured")
-        return
+        return 0
 
-    db = datasette.databases.get(rss_config.database_name)
+    db = datasette.databases.get(subscription.database_name)
     if not db or not db.path:
-        logger.warning("RSS sync: database %s not found or has no path", rss_config.database_name)
-        return
+        logger.warning(
+            "RSS sync: database %s not found or has no path",
+            subscription.database_name,
+        )
+        return 0
+
+    filters = subscription_filters(subscription)
+    since = sync_since(subscription.since_duration, watermark, filters)
+
+    started_at = _now_iso()
+    unchanged = feed_unchanged(check, watermark)
+    if unchanged or not feed_has_news(check, watermark):
+        if not unchanged:
+            # Nothing new in this version of the feed either, so let the next
+            # run's conditional request cover it
+            await internal_db.set_rss_watermark(
+                subscription.name,
+                filters,
+                watermark["last_pub_date"],
+                watermark["feed_last_modified"],
+                etag=check.etag,
+                http_last_modified=check.last_modified,
+            )
+        await record_not_modified(db, since, subscription)
+        await update_sync_status(
+            internal_db,
+            subscription.name,
+            phase="idle",
+            exported_count=0,
+            total_count=0,
+            current_filing_id=None,
+            error_message=None,
+            error_code=None,
+            stderr=None,
+            sync_started_at=started_at,
+            sync_finished_at=_now_iso(),
+        )
+        await publish_status()
+        logger.info("RSS sync skipped for %s: nothing new in feed", subscription.name)
+        return 0
 
     # Reset progress
-    await internal_db.update_rss_progress(
+    await update_sync_status(
+        internal_db,
+        subscription.name,
         phase="syncing",
         exported_count=0,
         total_count=0,
         current_filing_id=None,
         error_message=None,
         error_code=None,
-        sync_started_at=_now_iso(),
+        stderr=None,
+        sync_started_at=started_at,
         sync_finished_at=None,
     )
+    await publish_status()
 
-    progress = RssProgressWriter(internal_db)
-    client = LibfecClient()
+    progress = RssProgressWriter(internal_db, progress_events, subscription.name)
+    # Shared, so the stall and deadline settings apply
+    client = libfec_client
 
     # Periodic flush task
     async def periodic_flush():
@@ -104,24 +319,40 @@ async def rss_sync_handler(datasette, config):
     try:
         await client.rss_watch_with_progress(
             db.path,
-            rss_config.state_filter,
-            rss_config.cover_only,
+            subscription.state_filter,
+            subscription.cover_only,
             progress,
-            since=rss_config.since_duration,
+            since=since,
         )
-        await progress.flush()
-        await internal_db.update_rss_progress(
-            phase="idle",
-            sync_finished_at=_now_iso(),
+        if progress._state["phase"] == "complete":
+            await internal_db.set_rss_watermark(
+                subscription.name,
+                filters,
+                await newest_pub_date(db) or (watermark or {}).get("last_pub_date"),
+                progress._state["feed_last_modified"],
+                etag=check.etag if check else None,
+                http_last_modified=check.last_modified if check else None,
+            )
+        await progress.flush(phase="idle", sync_finished_at=_now_iso())
+        await publish_status()
+        logger.info(
+            "RSS sync complete for %s: %d exported",
+            subscription.name,
+            progress._state["exported_count"],
         )
-        logger.info("RSS sync complete: %d exported", progress._state["exported_count"])
+        if progress._state["phase"] == "error":
+            return 0
+        return progress._state["exported_count"] or 0
     except Exception as e:
-        await internal_db.update_rss_progress(
+        await update_sync_status(
+            internal_db,
+            subscription.name,
             phase="error",
             error_message=str(e),
             sync_finished_at=_now_iso(),
         )
-        logger.error("RSS sync failed: %s", e)
+        await publish_status()
+        logger.error("RSS sync failed for %s: %s", subscription.name, e)
         raise
     finally:
         flush_task.cancel()
@@ -131,7 +362,229 @@ async def rss_sync_handler(datasette, config):
             pass
 
 
-def _now_iso() -> str:
-    from datetime import datetime, timezone
+def next_interval(current: int, found_new: bool, rss_config) -> int:
+    """The adaptive interval to use after a sync with the current one."""
+    if found_new:
+        return rss_config.min_interval_seconds
+    return min(current * 2, rss_config.max_interval_seconds)
+
+
+def scheduled_interval(rss_config, current: Optional[int] = None) -> int:
+    """The interval the RSS cron task should run at."""
+    if not rss_config.adaptive_interval:
+        return rss_config.interval_seconds
+    return max(
+        rss_config.min_interval_seconds,
+        min(current or 0, rss_config.max_interval_seconds),
+    )
+
+
+async def adapt_interval(
+    datasette, internal_db: InternalDB, rss_config, found_new: bool
+) -> None:
+    """
+    Move the cron task to the next adaptive interval, if it isn't already
+    scheduled at it.
+    """
+    from .routes_rss import rss_status_payload
+    from .state import progress as progress_events
+
+    progress = await internal_db.get_rss_progress()
+    current = scheduled_interval(rss_config, progress.get("current_interval_seconds"))
+    interval = next_interval(current, found_new, rss_config)
+    if interval != progress.get("current_interval_seconds"):
+        await internal_db.update_rss_progress(current_interval_seconds=interval)
+    try:
+        scheduler = datasette._cron_scheduler
+    except AttributeError:
+        return
+    # Compare with the task itself rather than the last interval we set: a
+    # config change may have registered it again since
+    if await task_interval(scheduler) == interval:
+        return
+    run = asyncio.current_task()
+
+    async def reschedule():
+        # The scheduler sets next_run_at from the schedule the run started
+        # with once the handler returns, so change it after that
+        await asyncio.wait([run])
+        try:
+            await scheduler.update_task(
+                "libfec:rss-sync", schedule={"interval": interval}
+            )
+        except Exception as e:
+            logger.warning("RSS sync: could not change interval: %s", e)
+        progress_events.publish(
+            RSS_TOPIC, await rss_status_payload(datasette), replace=True
+        )
+
+    task = asyncio.create_task(reschedule())
+    _reschedules.add(task)
+    task.add_done_callback(_reschedules.discard)
+    logger.info("RSS sync: polling every %d seconds", interval)
+
+
+async def task_interval(scheduler) -> Optional[int]:
+    """The interval the RSS cron task is scheduled at, if it has one."""
+    try:
+        task = await scheduler.internal_db.get_task("libfec:rss-sync")
+    except Exception:
+        return None
+    if task is None or task.schedule_type != "interval":
+        return None
+    return json.loads(task.schedule_config).get("seconds")
+
+
+async def check_feed_changed(
+    url: Optional[str], watermarks: List[dict]
+) -> Optional[FeedCheck]:
+    """
+    Request the feed, conditional on the validators in watermarks. None if
+    checking is turned off or the request failed, in which case every
+    subscription syncs as usual.
+    """
+    if not url:
+        return None
+    etags = sorted({w["etag"] for w in watermarks if w.get("etag")})
+    # Unchanged since the earliest means unchanged since all of them
+    times = [
+        (parse_feed_time(w.get("http_last_modified")), w["http_last_modified"])
+        for w in watermarks
+        if w.get("http_last_modified")
+    ]
+    times = [t for t in times if t[0] is not None]
+    last_modified = min(times)[1] if times else None
+    try:
+        return await asyncio.to_thread(check_feed, url, etags, last_modified)
+    except Exception as e:
+        logger.warning("RSS sync: conditional feed request failed: %s", e)
+        return None
+
+
+def feed_unchanged(check: Optional[FeedCheck], watermark: Optional[dict]) -> bool:
+    """Whether the feed is as it was when the watermark was recorded."""
+    if check is None or not watermark:
+        return False
+    if check.etag and watermark.get("etag"):
+        return check.etag == watermark["etag"]
+    current = parse_feed_time(check.last_modified)
+    seen = parse_feed_time(watermark.get("http_last_modified"))
+    return current is not None and seen is not None and current <= seen
+
 
+def feed_has_news(check: Optional[FeedCheck], watermark: Optional[dict]) -> bool:
+    """
+    Whether the feed in check may have items newer than the watermark's mark.
+    True when there is no telling: no parsed feed, no mark or undated items.
+    """
+    if check is None or check.pub_dates is None or not watermark:
+        return True
+    mark = parse_feed_time(watermark.get("last_pub_date")) or parse_feed_time(
+        watermark.get("feed_last_modified")
+    )
+    if mark is None:
+        return True
+    for value in check.pub_dates:
+        published = parse_feed_time(value)
+        if published is None or published > mark:
+            return True
+    return False
+
+
+async def record_not_modified(db, since: str, subscription: RssSubscription) -> None:
+    """Add a "not-modified" row to libfec_rss_syncs for a skipped sync."""
+    now = _now_iso()
+    try:
+        await db.execute_write(
+            "INSERT INTO libfec_rss_syncs (sync_uuid, created_at, completed_at, "
+            "since_filter, state_filter, new_filings_count, exported_count, "
+            "cover_only, status) VALUES (?, ?, ?, ?, ?, 0, 0, ?, 'not-modified')",
+            [
+                str(uuid.uuid4()),
+                now,
+                now,
+                since,
+                subscription.state_filter,
+                subscription.cover_only,
+            ],
+        )
+    except Exception as e:
+        # libfec creates the table on its first sync
+        logger.warning("RSS sync: could not record not-modified sync: %s", e)
+
+
+def parse_feed_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an RSS pubDate or Last-Modified value, RFC 2822 or ISO 8601, as an
+    aware datetime (UTC if it has no offset). None if it can't be parsed.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_duration(value: str) -> Optional[timedelta]:
+    """Parse a since_duration like "1 day" or "2 hours ago"."""
+    match = _DURATION_RE.match(value or "")
+    if not match:
+        return None
+    return int(match.group(1)) * _DURATION_UNITS[match.group(2).lower()]
+
+
+def sync_since(
+    since_duration: str,
+    watermark: Optional[dict],
+    filters: dict,
+    now: Optional[datetime] = None,
+) -> str:
+    """
+    The `since` to send with sync/start: the high-water mark less
+    SINCE_OVERLAP, or since_duration if there is no usable mark or the mark is
+    older than since_duration allows.
+    """
+    if not watermark or watermark.get("filters") != filters:
+        return since_duration
+    window = parse_duration(since_duration)
+    if window is None:
+        return since_duration
+    mark = parse_feed_time(watermark.get("last_pub_date")) or parse_feed_time(
+        watermark.get("feed_last_modified")
+    )
+    if mark is None:
+        return since_duration
+    now = now or datetime.now(timezone.utc)
+    since = min(mark - SINCE_OVERLAP, now)
+    if since <= now - window:
+        return since_duration
+    return since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+async def newest_pub_date(db) -> Optional[str]:
+    """The newest rss_pub_date imported by the latest sync into db, if any."""
+    try:
+        result = await db.execute(
+            "SELECT rss_pub_date FROM libfec_rss_filings WHERE sync_id = "
+            "(SELECT max(sync_id) FROM libfec_rss_syncs)"
+        )
+    except Exception as e:
+        logger.warning("RSS sync: could not read rss_pub_date: %s", e)
+        return None
+    # pubDates are RFC 2822, which doesn't sort as text
+    dates = [(parse_feed_time(row[0]), row[0]) for row in result.rows]
+    dates = [d for d in dates if d[0] is not None]
+    if not dates:
+        return None
+    return max(dates)[1]
+
+
+def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,138 @@
+"""
+The resident `libfec rss --rpc` process used by RSS syncs.
+
+The RSS cron task runs every minute by default and most runs find nothing
+new, so starting and stopping libfec was most of what a run cost. Instead one
+process is kept running between runs and each run sends it a new sync/start;
+the output database is a sync/start parameter, so any database can use it.
+
+Before the process is reused it must answer sync/status with an idle phase.
+It is replaced after max_age_seconds, after a sync that didn't end cleanly,
+and shut down once it has gone unused for idle_seconds (say the watcher was
+turned off).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from .libfec_rpc_client import LibfecRpcClient
+
+logger = logging.getLogger(__name__)
+
+# Phases in which the process has no sync in flight and can take a new one
+IDLE_PHASES = ("idle", "complete", "canceled")
+
+
+class RssProcessManager:
+    def __init__(
+        self,
+        libfec_path: str,
+        max_age_seconds: float = 3600.0,
+        idle_seconds: float = 600.0,
+    ):
+        self.libfec_path = libfec_path
+        self.max_age_seconds = max_age_seconds
+        self.idle_seconds = idle_seconds
+        self.client: Optional[LibfecRpcClient] = None
+        self.started_at = 0.0
+        self.released_at = 0.0
+        self.syncs_run = 0
+        self.spawned = 0
+        self.reused = 0
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> LibfecRpcClient:
+        """The resident process if it is healthy, otherwise a new one."""
+        client, self.client = self.client, None
+        if client is not None:
+            if await self._healthy(client):
+                self.reused += 1
+                return client
+            await self._stop(client)
+        client = LibfecRpcClient(self.libfec_path)
+        await client.start_process()
+        self.spawned += 1
+        self.started_at = time.monotonic()
+        self.syncs_run = 0
+        return client
+
+    async def release(self, client: LibfecRpcClient, reusable: bool) -> None:
+        """
+        Hand the process back after a sync. It stays resident if the sync
+        ended cleanly and it isn't due for recycling; otherwise it is shut
+        down and the next sync starts a fresh one.
+        """
+        self.syncs_run += 1
+        client.progress_callback = None
+        client.completion_future = None
+        # The next sync's errors should only show its own stderr
+        client.stderr_lines.clear()
+        if not reusable or not client.is_alive():
+            await self._stop(client)
+            return
+        if time.monotonic() - self.started_at >= self.max_age_seconds:
+            logger.info(f"Recycling libfec rss process after {self.syncs_run} syncs")
+            await self._stop(client)
+            return
+        if self.client is not None:
+            # Another sync already returned one
+            await self._stop(client)
+            return
+        self.client = client
+        self.released_at = time.monotonic()
+        self._ensure_reaper()
+
+    async def close(self) -> None:
+        """Shut down the resident process."""
+        if self._reaper is not None and not self._reaper.done():
+            self._reaper.cancel()
+        client, self.client = self.client, None
+        if client is not None:
+            await self._stop(client)
+
+    async def _healthy(self, client: LibfecRpcClient) -> bool:
+        if not client.is_alive():
+            return False
+        if client.listen_task.get_loop() is not asyncio.get_running_loop():
+            # Started under an event loop that has since gone away
+            return False
+        try:
+            status = await client.send_request("sync/status", timeout=2.0)
+        except Exception as e:
+            logger.warning(f"Resident libfec rss process failed health check: {e}")
+            return False
+        return status.get("phase", "idle") in IDLE_PHASES
+
+    async def _stop(self, client: LibfecRpcClient) -> None:
+        try:
+            await client.shutdown()
+        except Exception as e:
+            logger.warning(f"Error shutting down libfec rss process: {e}")
+            try:
+                await client.terminate()
+            except Exception:
+                pass
+
+    def _ensure_reaper(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._reaper is None
+            or self._reaper.done()
+            or self._reaper.get_loop() is not loop
+        ):
+            self._reaper = loop.create_task(self._reap())
+
+    async def _reap(self) -> None:
+        """Shut the process down once it has been unused for idle_seconds."""
+        while self.client is not None:
+            remaining = self.released_at + self.idle_seconds - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(min(remaining, 30.0))
+                continue
+            client, self.client = self.client, None
+            logger.info("Shutting down idle libfec rss process")
+            await self._stop(client)
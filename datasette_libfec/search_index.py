@@ -0,0 +1,209 @@
+"""
+Local full-text search over imported candidates and committees.
+
+libfec_candidates and libfec_committees each get an FTS5 table with prefix
+indexes, so typeahead queries like "pel" or "C0040" are answered from the
+user database without a trip to the `libfec search --rpc` process.
+
+The FTS tables store their own copy of the indexed columns, keyed by the
+source table's rowid, and are kept in sync by triggers. libfec imports with
+INSERT OR REPLACE, which doesn't fire delete triggers, so searches join back
+to the source table and ignore index rows whose source row is gone; those are
+pruned whenever the index is synced. If libfec recreates a source table its
+triggers go with it, and the next sync rebuilds that index from scratch.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+from typing import List, Optional
+
+# Fields returned for each search result
+CANDIDATE_FIELDS = (
+    "candidate_id",
+    "name",
+    "party_affiliation",
+    "election_year",
+    "office",
+    "state",
+    "district",
+    "incumbent_challenger_status",
+    "principal_campaign_committee",
+)
+COMMITTEE_FIELDS = (
+    "committee_id",
+    "name",
+    "committee_type",
+    "designation",
+    "party_affiliation",
+    "connected_org_name",
+    "candidate_id",
+)
+
+# source table -> its ID column; each is indexed on (name, ID)
+INDEXED_TABLES = {
+    "libfec_candidates": "candidate_id",
+    "libfec_committees": "committee_id",
+}
+
+# Prefix lengths with their own index, for typeahead
+PREFIX_LENGTHS = "2 3 4"
+
+
+def fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+def _triggers(table: str, id_column: str) -> dict:
+    fts = fts_table(table)
+    insert = (
+        f"INSERT OR REPLACE INTO {fts}(rowid, name, {id_column}) "
+        f"VALUES (new.rowid, new.name, new.{id_column});"
+    )
+    return {
+        f"{fts}_ai": f"AFTER INSERT ON {table} BEGIN {insert} END",
+        f"{fts}_ad": (
+            f"AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.rowid; END"
+        ),
+        f"{fts}_au": (
+            f"AFTER UPDATE ON {table} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.rowid; {insert} END"
+        ),
+    }
+
+
+def _names(conn: sqlite3.Connection, kind: str) -> set:
+    return {
+        row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", [kind])
+    }
+
+
+def index_status(conn: sqlite3.Connection) -> dict:
+    """
+    For each source table that exists, whether its FTS table and triggers are
+    all in place.
+    """
+    tables = _names(conn, "table")
+    triggers = _names(conn, "trigger")
+    return {
+        table: fts_table(table) in tables
+        and set(_triggers(table, id_column)) <= triggers
+        for table, id_column in INDEXED_TABLES.items()
+        if table in tables
+    }
+
+
+def sync_search_index(conn: sqlite3.Connection) -> None:
+    """Create, rebuild or prune the FTS tables for every source table present."""
+    ready = index_status(conn)
+    for table, is_ready in ready.items():
+        id_column = INDEXED_TABLES[table]
+        fts = fts_table(table)
+        with conn:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"name, {id_column}, prefix='{PREFIX_LENGTHS}', "
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+            if is_ready:
+                conn.execute(
+                    f"DELETE FROM {fts} WHERE rowid NOT IN (SELECT rowid FROM {table})"
+                )
+                continue
+            # New, or the source table was recreated without our triggers
+            conn.execute(f"DELETE FROM {fts}")
+            conn.execute(
+                f"INSERT INTO {fts}(rowid, name, {id_column}) "
+                f"SELECT rowid, name, {id_column} FROM {table}"
+            )
+            for name, body in _triggers(table, id_column).items():
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                conn.execute(f"CREATE TRIGGER {name} {body}")
+
+
+async def ensure_search_index(db) -> None:
+    """Bring the search indexes for a user database up to date."""
+    await db.execute_write_fn(sync_search_index)
+
+
+def fts_query(query: str) -> Optional[str]:
+    """
+    An FTS5 MATCH expression requiring every word of query as a prefix, or
+    None if query has no searchable words.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def _search_table(
+    conn: sqlite3.Connection,
+    table: str,
+    fields: tuple,
+    match: str,
+    cycle: Optional[int],
+    limit: int,
+) -> List[dict]:
+    id_column = INDEXED_TABLES[table]
+    # One row per ID: the best-ranked one when searching every cycle
+    cursor = conn.execute(
+        f"""
+        SELECT t.*, MIN(f.rank) AS score
+        FROM {fts_table(table)} f
+        JOIN {table} t ON t.rowid = f.rowid
+        WHERE {fts_table(table)} MATCH :match
+          AND (:cycle IS NULL OR t.cycle = :cycle)
+        GROUP BY t.{id_column}
+        ORDER BY score
+        LIMIT :limit
+        """,
+        {"match": match, "cycle": cycle, "limit": limit},
+    )
+    columns = [d[0] for d in cursor.description]
+    return [
+        {field: row.get(field) for field in fields}
+        for row in (dict(zip(columns, values)) for values in cursor)
+    ]
+
+
+def _local_search(
+    conn: sqlite3.Connection, query: str, cycle: Optional[int], limit: int
+) -> Optional[dict]:
+    ready = index_status(conn)
+    if not ready or not all(ready.values()):
+        return None
+    match = fts_query(query)
+    results = {"candidates": [], "committees": []}
+    if match is None:
+        return results
+    if "libfec_candidates" in ready:
+        results["candidates"] = _search_table(
+            conn, "libfec_candidates", CANDIDATE_FIELDS, match, cycle, limit
+        )
+    if "libfec_committees" in ready:
+        results["committees"] = _search_table(
+            conn, "libfec_committees", COMMITTEE_FIELDS, match, cycle, limit
+        )
+    return results
+
+
+async def local_search(
+    db, query: str, cycle: Optional[int], limit: int
+) -> Optional[dict]:
+    """
+    Candidates and committees in db matching every word of query as a
+    prefix, best matches first. cycle=None searches every cycle. Returns None
+    if db has neither libfec_candidates nor libfec_committees.
+    """
+    results = await db.execute_fn(lambda conn: _local_search(conn, query, cycle, limit))
+    if results is None:
+        # Index missing or out of date: sync it once, then search
+        await ensure_search_index(db)
+        results = await db.execute_fn(
+            lambda conn: _local_search(conn, query, cycle, limit)
+        )
+    return results
@@ -0,0 +1,475 @@
+"""
+Pools of `libfec search --rpc` processes, one pool per election cycle.
+
+A single search process handles one request at a time, so every typeahead
+request would otherwise queue behind the others. Each cycle gets up to
+`size` processes. A request goes to the least-loaded one, and a process takes
+at most `max_in_flight` requests at once (later ones are pipelined on its
+stdin). When every process is at its limit, requests wait for a free slot.
+
+Processes are started on demand. The first request for a cycle starts one,
+and another is started in the background whenever all of them are busy,
+until there are `size`.
+
+The pools are supervised. A process that dies is dropped as soon as its
+output closes and, if its cycle is still in use, replaced. Failed starts and
+repeated crashes back off exponentially; while a cycle is backing off with no
+process running, searches for it fail fast instead of piling up. Processes
+idle for `idle_seconds` are shut down, and at most `max_cycles` cycles keep
+processes at all, the least recently used one being closed first.
+
+Cycles can be prewarmed at startup so the first search doesn't pay for
+spawning libfec and its ready handshake. Prewarmed cycles are pinned: they
+keep at least one process however long they sit idle, are never closed to
+make room for other cycles, and are always restarted after a crash.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+from .libfec_search_rpc_client import LibfecSearchRpcClient
+
+logger = logging.getLogger(__name__)
+
+ClientFactory = Callable[[int], LibfecSearchRpcClient]
+
+# Restart backoff after the second consecutive failure: BACKOFF_BASE, doubling
+# per further failure, up to BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# A process that ran this long before dying resets the backoff
+STABLE_SECONDS = 60.0
+# How often the supervisor checks for idle processes and cycles
+SUPERVISE_SECONDS = 5.0
+
+
+class SearchUnavailable(RuntimeError):
+    """The cycle's search processes keep failing and are backing off."""
+
+
+class SearchPool:
+    """The search processes for one cycle."""
+
+    def __init__(
+        self,
+        cycle: int,
+        client_factory: ClientFactory,
+        size: int = 2,
+        max_in_flight: int = 4,
+        idle_seconds: float = 300.0,
+    ):
+        self.cycle = cycle
+        self.client_factory = client_factory
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self.idle_seconds = idle_seconds
+        self.clients: list[LibfecSearchRpcClient] = []
+        self.in_flight: dict[LibfecSearchRpcClient, int] = {}
+        self.started_at: dict[LibfecSearchRpcClient, float] = {}
+        self.last_used: dict[LibfecSearchRpcClient, float] = {}
+        self.used_at = time.monotonic()
+        self.starting = 0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.restarts = 0
+        # Keep a process running even when idle (see prewarm)
+        self.pinned = False
+        self._waiters: deque[asyncio.Future] = deque()
+        # Background starts and restarts, held until they finish
+        self._tasks: set[asyncio.Task] = set()
+
+    async def acquire(self) -> LibfecSearchRpcClient:
+        """Reserve a slot on the least-loaded process; release() it afterwards."""
+        self.used_at = time.monotonic()
+        while True:
+            self._drop_dead()
+            available = [
+                c for c in self.clients if self.in_flight[c] < self.max_in_flight
+            ]
+            if available:
+                client = min(available, key=lambda c: self.in_flight[c])
+                if self.in_flight[client] and self._can_grow():
+                    # Everyone is busy: add a process for the next requests.
+                    # It counts as starting from now, so requests arriving
+                    # before it runs don't start more than size.
+                    self.starting += 1
+                    self._background(self._grow())
+                return self._reserve(client)
+            if not self.clients and not self.starting and self.backing_off():
+                raise SearchUnavailable(
+                    f"Search process for cycle {self.cycle} keeps failing, "
+                    f"retrying in {self.retry_at - time.monotonic():.0f}s"
+                )
+            if self._can_grow():
+                try:
+                    client = await self._start()
+                except Exception:
+                    # Waiters can retry the start themselves or fail fast
+                    self._wake_all()
+                    raise
+                # Requests that queued behind this start can share the process
+                self._wake_one()
+                return self._reserve(client)
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+
+    def release(self, client: LibfecSearchRpcClient) -> None:
+        if client in self.in_flight:
+            self.in_flight[client] -= 1
+            self.last_used[client] = time.monotonic()
+        self._wake_one()
+
+    def _reserve(self, client: LibfecSearchRpcClient) -> LibfecSearchRpcClient:
+        self.in_flight[client] += 1
+        self.last_used[client] = time.monotonic()
+        return client
+
+    def _wake_one(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def _wake_all(self) -> None:
+        waiters, self._waiters = self._waiters, deque()
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def client(self) -> AsyncIterator[LibfecSearchRpcClient]:
+        client = await self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def busy(self) -> bool:
+        return bool(sum(self.in_flight.values()) or self.starting or self._waiters)
+
+    def backing_off(self) -> bool:
+        return time.monotonic() < self.retry_at
+
+    async def close(self) -> None:
+        clients, self.clients = self.clients, []
+        self.in_flight = {}
+        self.started_at = {}
+        self.last_used = {}
+        for client in clients:
+            await self._stop(client)
+
+    async def warm(self) -> None:
+        """Start a process unless one is already running or starting."""
+        self._drop_dead()
+        if not self.clients and not self.starting:
+            await self._start()
+            self._wake_one()
+
+    async def evict_idle(self) -> None:
+        """
+        Shut down processes with nothing in flight for idle_seconds. A pinned
+        pool keeps its last one.
+        """
+        cutoff = time.monotonic() - self.idle_seconds
+        for client in list(self.clients):
+            if self.in_flight[client] or self.last_used[client] > cutoff:
+                continue
+            if self.pinned and len(self.clients) == 1:
+                break
+            logger.info(f"Shutting down idle search process for cycle {self.cycle}")
+            self._forget(client)
+            await self._stop(client)
+
+    def _can_grow(self) -> bool:
+        return len(self.clients) + self.starting < self.size and not self.backing_off()
+
+    def _drop_dead(self) -> None:
+        loop = asyncio.get_running_loop()
+        for client in list(self.clients):
+            # A process started under an event loop that has since gone away
+            # can't be talked to any more either
+            if client.listen_task.get_loop() is not loop:
+                self._forget(client)
+            elif not client.is_alive():
+                self._on_exit(client)
+
+    def _forget(self, client: LibfecSearchRpcClient) -> None:
+        if client in self.clients:
+            self.clients.remove(client)
+        self.in_flight.pop(client, None)
+        self.started_at.pop(client, None)
+        self.last_used.pop(client, None)
+
+    def _on_exit(self, client: LibfecSearchRpcClient) -> None:
+        """A process died without being shut down: drop it and maybe replace it."""
+        if client not in self.clients:
+            return  # Shut down or already handled
+        uptime = time.monotonic() - self.started_at.get(client, 0.0)
+        self._forget(client)
+        logger.warning(
+            f"Search process for cycle {self.cycle} died after {uptime:.0f}s"
+        )
+        if uptime >= STABLE_SECONDS:
+            self.failures = 0
+        self._failed()
+        # Only replace processes for cycles that are still being searched
+        if self._in_use():
+            self._background(self._restart())
+        # Waiters may now be able to start a process, or should fail fast
+        self._wake_all()
+
+    def _failed(self) -> None:
+        self.failures += 1
+        # The first failure is retried straight away
+        if self.failures > 1:
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.failures - 2))
+            self.retry_at = time.monotonic() + delay
+
+    def _in_use(self) -> bool:
+        return self.pinned or time.monotonic() - self.used_at < self.idle_seconds
+
+    async def _restart(self) -> None:
+        """Start a replacement process, backing off between failed attempts."""
+        while self._in_use():
+            await asyncio.sleep(max(0.0, self.retry_at - time.monotonic()))
+            if self.clients or self.starting:
+                return  # A request already started a replacement
+            self.restarts += 1
+            try:
+                await self._start()
+            except Exception as e:
+                logger.warning(
+                    f"Could not restart search process for cycle {self.cycle}: {e}"
+                )
+                continue
+            self._wake_one()
+            return
+
+    async def _start(self, reserved: bool = False) -> LibfecSearchRpcClient:
+        """Start a process. reserved: the caller already counted it in starting."""
+        if not reserved:
+            self.starting += 1
+        try:
+            client = self.client_factory(self.cycle)
+            await client.start_process()
+        except Exception:
+            self._failed()
+            raise
+        finally:
+            self.starting -= 1
+        self.clients.append(client)
+        self.in_flight[client] = 0
+        self.started_at[client] = self.last_used[client] = time.monotonic()
+        # Notice a crash as soon as the process's output closes
+        client.listen_task.add_done_callback(lambda _: self._on_exit(client))
+        return client
+
+    async def _grow(self) -> None:
+        try:
+            await self._start(reserved=True)
+        except Exception as e:
+            logger.warning(f"Could not start extra search process: {e}")
+            self._wake_all()
+            return
+        # Requests waiting for a slot can use the new process
+        self._wake_one()
+
+    async def _stop(self, client: LibfecSearchRpcClient) -> None:
+        try:
+            await client.shutdown()
+        except Exception as e:
+            logger.warning(f"Error shutting down search process: {e}")
+
+    def _background(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._background_done)
+        return task
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Background task for cycle {self.cycle} search failed",
+                exc_info=task.exception(),
+            )
+
+
+class SearchPools:
+    """
+    One SearchPool per cycle, created on first use, with a supervisor that
+    reaps idle processes and keeps at most max_cycles cycles resident.
+    """
+
+    def __init__(
+        self,
+        libfec_path: str,
+        size: int = 2,
+        max_in_flight: int = 4,
+        client_factory: Optional[ClientFactory] = None,
+        idle_seconds: float = 300.0,
+        max_cycles: int = 4,
+    ):
+        self.libfec_path = libfec_path
+        self.size = size
+        self.max_in_flight = max_in_flight
+        self.idle_seconds = idle_seconds
+        self.max_cycles = max_cycles
+        self.client_factory = client_factory or (
+            lambda cycle: LibfecSearchRpcClient(self.libfec_path, cycle)
+        )
+        # Least recently used first
+        self.pools: OrderedDict[int, SearchPool] = OrderedDict()
+        # cycle -> prewarm progress, for cycles passed to prewarm()
+        self.prewarm_status: dict[int, dict] = {}
+        self.pinned_cycles: set[int] = set()
+        self._supervisor: Optional[asyncio.Task] = None
+        # Held so the task isn't garbage collected while it runs
+        self._prewarm_task: Optional[asyncio.Task] = None
+        # Pools being closed after eviction, likewise
+        self._closing: set[asyncio.Task] = set()
+
+    def for_cycle(self, cycle: int) -> SearchPool:
+        pool = self.pools.get(cycle)
+        if pool is None:
+            pool = self.pools[cycle] = SearchPool(
+                cycle,
+                self.client_factory,
+                self.size,
+                self.max_in_flight,
+                self.idle_seconds,
+            )
+            pool.pinned = cycle in self.pinned_cycles
+            self._evict_cycles(keep=cycle)
+        self.pools.move_to_end(cycle)
+        self._ensure_supervisor()
+        return pool
+
+    def prewarm(self, cycles: list[int]) -> asyncio.Task:
+        """Pin cycles and start a process for each, in the background."""
+        for cycle in cycles:
+            self.pinned_cycles.add(cycle)
+            self.for_cycle(cycle).pinned = True
+            self.prewarm_status[cycle] = {"state": "starting", "error": None}
+        task = asyncio.get_running_loop().create_task(self._prewarm(cycles))
+        task.add_done_callback(self._prewarm_done)
+        self._prewarm_task = task
+        return task
+
+    def _prewarm_done(self, task: asyncio.Task) -> None:
+        if task is self._prewarm_task:
+            self._prewarm_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Prewarming search processes failed", exc_info=task.exception()
+            )
+
+    async def _prewarm(self, cycles: list[int]) -> None:
+        async def warm(cycle: int) -> None:
+            status = self.prewarm_status[cycle]
+            started = time.monotonic()
+            try:
+                await self.for_cycle(cycle).warm()
+            except Exception as e:
+                logger.warning(f"Could not prewarm search for cycle {cycle}: {e}")
+                status.update(state="error", error=str(e))
+                return
+            status.update(state="ready", seconds=round(time.monotonic() - started, 3))
+
+        await asyncio.gather(*[warm(cycle) for cycle in cycles])
+
+    def readiness(self) -> dict:
+        """
+        Prewarm state of each prewarmed cycle: "starting", "ready", "error",
+        or "restarting" if it was ready but has no live process right now.
+        """
+        cycles = {}
+        for cycle, status in self.prewarm_status.items():
+            status = dict(status)
+            pool = self.pools.get(cycle)
+            processes = len(pool.clients) if pool else 0
+            if status["state"] == "ready" and not processes:
+                status["state"] = "restarting"
+            status["processes"] = processes
+            cycles[str(cycle)] = status
+        return cycles
+
+    def stats(self) -> dict:
+        return {
+            str(cycle): {
+                "processes": len(pool.clients),
+                "in_flight": sum(pool.in_flight.values()),
+                "restarts": pool.restarts,
+                "failures": pool.failures,
+                "backing_off": pool.backing_off(),
+            }
+            for cycle, pool in self.pools.items()
+        }
+
+    async def supervise(self) -> None:
+        """Reap idle processes and drop cycles that have none left."""
+        for cycle, pool in list(self.pools.items()):
+            pool._drop_dead()
+            await pool.evict_idle()
+            if not pool.clients and not pool.busy() and not pool._in_use():
+                del self.pools[cycle]
+
+    async def close(self) -> None:
+        if self._supervisor is not None and not self._supervisor.done():
+            self._supervisor.cancel()
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+        pools, self.pools = self.pools, OrderedDict()
+        self.prewarm_status = {}
+        self.pinned_cycles = set()
+        for pool in pools.values():
+            await pool.close()
+
+    def _evict_cycles(self, keep: Optional[int] = None) -> None:
+        """Close the least recently used cycles beyond max_cycles, except keep."""
+        excess = len(self.pools) - self.max_cycles
+        for cycle, pool in list(self.pools.items()):
+            if excess <= 0:
+                break
+            if cycle == keep or pool.pinned or pool.busy():
+                continue  # Busy ones are evicted once their requests finish
+            logger.info(f"Closing search processes for cycle {cycle}")
+            del self.pools[cycle]
+            task = asyncio.create_task(pool.close())
+            self._closing.add(task)
+            task.add_done_callback(self._close_done)
+            excess -= 1
+
+    def _close_done(self, task: asyncio.Task) -> None:
+        self._closing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Closing evicted search processes failed", exc_info=task.exception()
+            )
+
+    def _ensure_supervisor(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._supervisor is None
+            or self._supervisor.done()
+            or self._supervisor.get_loop() is not loop
+        ):
+            self._supervisor = loop.create_task(self._supervise_loop())
+
+    async def _supervise_loop(self) -> None:
+        """Supervise until no pools are left."""
+        while self.pools:
+            await asyncio.sleep(min(self.idle_seconds, SUPERVISE_SECONDS))
+            try:
+                await self.supervise()
+            except Exception as e:
+                logger.warning(f"Error supervising search processes: {e}")
+            self._evict_cycles()
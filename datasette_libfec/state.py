@@ -1,5 +1,12 @@
-from .libfec_client import LibfecClient, ExportState
+from .libfec_client import LibfecClient
+from .export_queue import ExportQueue
+from .progress_events import ProgressBroadcaster
+from .search_cache import SearchCache
+from .search_pool import SearchPools
 
 # Shared state - singleton instances
 libfec_client = LibfecClient()
-export_state = ExportState()
+progress = ProgressBroadcaster()
+export_queue = ExportQueue(libfec_client, progress)
+search_pools = SearchPools(str(libfec_client.libfec_path))
+search_cache = SearchCache()
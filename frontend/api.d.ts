@@ -40,6 +40,11 @@ export interface paths {
                              * @default 60
                              */
                             interval_seconds: number;
+                            /**
+                             * Adaptive Interval
+                             * @default false
+                             */
+                            adaptive_interval: boolean;
                             /**
                              * Seconds Until Next Sync
                              * @default null
@@ -60,6 +65,11 @@ export interface paths {
                              * @default null
                              */
                             error_message: string | null;
+                            /**
+                             * Stderr
+                             * @default null
+                             */
+                            stderr: string | null;
                         };
                     };
                 };
@@ -73,6 +83,41 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/{database}/-/api/libfec/rss/events": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content?: never;
+                };
+            };
+        };
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/{database}/-/api/libfec/rss/config": {
         parameters: {
             query?: never;
@@ -130,6 +175,21 @@ export interface paths {
                              * @default null
                              */
                             updated_at: string | null;
+                            /**
+                             * Adaptive Interval
+                             * @default false
+                             */
+                            adaptive_interval: boolean;
+                            /**
+                             * Min Interval Seconds
+                             * @default 15
+                             */
+                            min_interval_seconds: number;
+                            /**
+                             * Max Interval Seconds
+                             * @default 900
+                             */
+                            max_interval_seconds: number;
                         };
                     };
                 };
@@ -194,6 +254,21 @@ export interface paths {
                          * @default null
                          */
                         database_name?: string | null;
+                        /**
+                         * Adaptive Interval
+                         * @default null
+                         */
+                        adaptive_interval?: boolean | null;
+                        /**
+                         * Min Interval Seconds
+                         * @default null
+                         */
+                        min_interval_seconds?: number | null;
+                        /**
+                         * Max Interval Seconds
+                         * @default null
+                         */
+                        max_interval_seconds?: number | null;
                     };
                 };
             };
@@ -237,6 +312,21 @@ export interface paths {
                              * @default null
                              */
                             updated_at: string | null;
+                            /**
+                             * Adaptive Interval
+                             * @default false
+                             */
+                            adaptive_interval: boolean;
+                            /**
+                             * Min Interval Seconds
+                             * @default 15
+                             */
+                            min_interval_seconds: number;
+                            /**
+                             * Max Interval Seconds
+                             * @default 900
+                             */
+                            max_interval_seconds: number;
                         };
                     };
                 };
@@ -319,6 +409,176 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/{database}/-/api/libfec/rss/subscriptions": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content: {
+                        "application/json": {
+                            /** Subscriptions */
+                            subscriptions: components["schemas"]["RssSubscriptionRecord"][];
+                        };
+                    };
+                };
+            };
+        };
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/rss/subscriptions/save": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        post: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody: {
+                content: {
+                    "application/json": {
+                        /** Name */
+                        name: string;
+                        /**
+                         * Database Name
+                         * @default null
+                         */
+                        database_name?: string | null;
+                        /**
+                         * State Filter
+                         * @default null
+                         */
+                        state_filter?: string | null;
+                        /**
+                         * Cover Only
+                         * @default true
+                         */
+                        cover_only?: boolean;
+                        /**
+                         * Since Duration
+                         * @default 1 day
+                         */
+                        since_duration?: string;
+                        /**
+                         * Enabled
+                         * @default true
+                         */
+                        enabled?: boolean;
+                    };
+                };
+            };
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content: {
+                        "application/json": {
+                            /** Name */
+                            name: string;
+                            /** Database Name */
+                            database_name: string;
+                            /**
+                             * State Filter
+                             * @default null
+                             */
+                            state_filter: string | null;
+                            /**
+                             * Cover Only
+                             * @default true
+                             */
+                            cover_only: boolean;
+                            /**
+                             * Since Duration
+                             * @default 1 day
+                             */
+                            since_duration: string;
+                            /**
+                             * Enabled
+                             * @default true
+                             */
+                            enabled: boolean;
+                        };
+                    };
+                };
+            };
+        };
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/rss/subscriptions/{name}/delete": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        post: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                    name: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content?: never;
+                };
+            };
+        };
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/{database}/-/api/libfec/export/start": {
         parameters: {
             query?: never;
@@ -360,6 +620,11 @@ export interface paths {
                          * @default false
                          */
                         clobber?: boolean;
+                        /**
+                         * Deadline Seconds
+                         * @default null
+                         */
+                        deadline_seconds?: number | null;
                     };
                 };
             };
@@ -385,6 +650,11 @@ export interface paths {
                              * @default null
                              */
                             phase: string | null;
+                            /**
+                             * Queue Position
+                             * @default null
+                             */
+                            queue_position: number | null;
                         };
                     };
                 };
@@ -435,6 +705,11 @@ export interface paths {
                              * @default null
                              */
                             phase: string | null;
+                            /**
+                             * Queue Position
+                             * @default null
+                             */
+                            queue_position: number | null;
                         };
                     };
                 };
@@ -448,21 +723,20 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
-    "/{database}/-/api/libfec/export/cancel": {
+    "/{database}/-/api/libfec/export/{export_id}/status": {
         parameters: {
             query?: never;
             header?: never;
             path?: never;
             cookie?: never;
         };
-        get?: never;
-        put?: never;
-        post: {
+        get: {
             parameters: {
                 query?: never;
                 header?: never;
                 path: {
                     database: string;
+                    export_id: string;
                 };
                 cookie?: never;
             };
@@ -489,27 +763,353 @@ export interface paths {
                              * @default null
                              */
                             phase: string | null;
+                            /**
+                             * Queue Position
+                             * @default null
+                             */
+                            queue_position: number | null;
+                        };
+                    };
+                };
+            };
+        };
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/export/events": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content?: never;
+                };
+            };
+        };
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/export/jobs": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content: {
+                        "application/json": {
+                            /** Status */
+                            status: string;
+                            /** Jobs */
+                            jobs: components["schemas"]["ExportJobRecord"][];
+                        };
+                    };
+                };
+            };
+        };
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/export/cancel": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        post: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content: {
+                        "application/json": {
+                            /** Status */
+                            status: string;
+                            /** Message */
+                            message: string;
+                            /**
+                             * Export Id
+                             * @default null
+                             */
+                            export_id: string | null;
+                            /**
+                             * Phase
+                             * @default null
+                             */
+                            phase: string | null;
+                            /**
+                             * Queue Position
+                             * @default null
+                             */
+                            queue_position: number | null;
+                        };
+                    };
+                };
+            };
+        };
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/export/{export_id}/cancel": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        post: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                    export_id: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content: {
+                        "application/json": {
+                            /** Status */
+                            status: string;
+                            /** Message */
+                            message: string;
+                            /**
+                             * Export Id
+                             * @default null
+                             */
+                            export_id: string | null;
+                            /**
+                             * Phase
+                             * @default null
+                             */
+                            phase: string | null;
+                            /**
+                             * Queue Position
+                             * @default null
+                             */
+                            queue_position: number | null;
+                        };
+                    };
+                };
+            };
+        };
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/search": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        post: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody: {
+                content: {
+                    "application/json": {
+                        /** Query */
+                        query: string;
+                        /**
+                         * Cycle
+                         * @default null
+                         */
+                        cycle?: number | null;
+                        /**
+                         * Limit
+                         * @default 100
+                         */
+                        limit?: number;
+                        /**
+                         * Mode
+                         * @default libfec
+                         * @enum {string}
+                         */
+                        mode?: "libfec" | "local";
+                    };
+                };
+            };
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content: {
+                        "application/json": {
+                            /** Status */
+                            status: string;
+                            /** Cycle */
+                            cycle: number | null;
+                            /** Query */
+                            query: string;
+                            /** Candidate Count */
+                            candidate_count: number;
+                            /** Committee Count */
+                            committee_count: number;
+                            /** Candidates */
+                            candidates: {
+                                [key: string]: unknown;
+                            }[];
+                            /** Committees */
+                            committees: {
+                                [key: string]: unknown;
+                            }[];
+                            /** Source */
+                            source: string;
+                        };
+                    };
+                };
+            };
+        };
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/search/stats": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content: {
+                        "application/json": {
+                            /** Status */
+                            status: string;
+                            /** Cache */
+                            cache: {
+                                [key: string]: unknown;
+                            };
+                            /** Processes */
+                            processes: {
+                                [key: string]: unknown;
+                            };
                         };
                     };
                 };
             };
         };
+        put?: never;
+        post?: never;
         delete?: never;
         options?: never;
         head?: never;
         patch?: never;
         trace?: never;
     };
-    "/{database}/-/api/libfec/search": {
+    "/{database}/-/api/libfec/search/status": {
         parameters: {
             query?: never;
             header?: never;
             path?: never;
             cookie?: never;
         };
-        get?: never;
-        put?: never;
-        post: {
+        get: {
             parameters: {
                 query?: never;
                 header?: never;
@@ -518,24 +1118,7 @@ export interface paths {
                 };
                 cookie?: never;
             };
-            requestBody: {
-                content: {
-                    "application/json": {
-                        /** Query */
-                        query: string;
-                        /**
-                         * Cycle
-                         * @default null
-                         */
-                        cycle?: number | null;
-                        /**
-                         * Limit
-                         * @default 100
-                         */
-                        limit?: number;
-                    };
-                };
-            };
+            requestBody?: never;
             responses: {
                 /** @description OK */
                 200: {
@@ -546,27 +1129,19 @@ export interface paths {
                         "application/json": {
                             /** Status */
                             status: string;
-                            /** Cycle */
-                            cycle: number;
-                            /** Query */
-                            query: string;
-                            /** Candidate Count */
-                            candidate_count: number;
-                            /** Committee Count */
-                            committee_count: number;
-                            /** Candidates */
-                            candidates: {
-                                [key: string]: unknown;
-                            }[];
-                            /** Committees */
-                            committees: {
+                            /** Ready */
+                            ready: boolean;
+                            /** Cycles */
+                            cycles: {
                                 [key: string]: unknown;
-                            }[];
+                            };
                         };
                     };
                 };
             };
         };
+        put?: never;
+        post?: never;
         delete?: never;
         options?: never;
         head?: never;
@@ -978,6 +1553,42 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/{database}/-/libfec/alerts/{alert_id}": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                    alert_id: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content?: never;
+                };
+            };
+        };
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/{database}/-/libfec/filing-day": {
         parameters: {
             query?: never;
@@ -1165,10 +1776,258 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/{database}/-/api/libfec/alerts/new": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        post: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                };
+                cookie?: never;
+            };
+            requestBody: {
+                content: {
+                    "application/json": {
+                        /**
+                         * Name
+                         * @default
+                         */
+                        name?: string;
+                        /** Alert Type */
+                        alert_type: string;
+                        /**
+                         * Frequency
+                         * @default +1 second
+                         */
+                        frequency?: string;
+                        /** Destination Id */
+                        destination_id: string;
+                        /**
+                         * Committee Ids
+                         * @default []
+                         */
+                        committee_ids?: string[];
+                        /**
+                         * Races
+                         * @default []
+                         */
+                        races?: components["schemas"]["RaceSpec"][];
+                        /**
+                         * State Filter
+                         * @default
+                         */
+                        state_filter?: string;
+                        /**
+                         * Contributors
+                         * @default []
+                         */
+                        contributors?: components["schemas"]["ContributorCriteria"][];
+                    };
+                };
+            };
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content?: never;
+                };
+            };
+        };
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/{database}/-/api/libfec/alerts/{alert_id}/delete": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        post: {
+            parameters: {
+                query?: never;
+                header?: never;
+                path: {
+                    database: string;
+                    alert_id: string;
+                };
+                cookie?: never;
+            };
+            requestBody?: never;
+            responses: {
+                /** @description OK */
+                200: {
+                    headers: {
+                        [name: string]: unknown;
+                    };
+                    content?: never;
+                };
+            };
+        };
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
 }
 export type webhooks = Record<string, never>;
 export interface components {
     schemas: {
+        /** RssSubscriptionRecord */
+        RssSubscriptionRecord: {
+            /** Name */
+            name: string;
+            /** Database Name */
+            database_name: string;
+            /**
+             * State Filter
+             * @default null
+             */
+            state_filter: string | null;
+            /**
+             * Cover Only
+             * @default true
+             */
+            cover_only: boolean;
+            /**
+             * Since Duration
+             * @default 1 day
+             */
+            since_duration: string;
+            /**
+             * Enabled
+             * @default true
+             */
+            enabled: boolean;
+            last_sync: components["schemas"]["RssSubscriptionStatus"];
+        };
+        /**
+         * RssSubscriptionStatus
+         * @description How a subscription's last sync went. phase is None until it first runs.
+         */
+        RssSubscriptionStatus: {
+            /**
+             * Phase
+             * @default null
+             */
+            phase: string | null;
+            /**
+             * Exported Count
+             * @default 0
+             */
+            exported_count: number;
+            /**
+             * Total Count
+             * @default 0
+             */
+            total_count: number;
+            /**
+             * Error Message
+             * @default null
+             */
+            error_message: string | null;
+            /**
+             * Error Code
+             * @default null
+             */
+            error_code: string | null;
+            /**
+             * Stderr
+             * @default null
+             */
+            stderr: string | null;
+            /**
+             * Sync Started At
+             * @default null
+             */
+            sync_started_at: string | null;
+            /**
+             * Sync Finished At
+             * @default null
+             */
+            sync_finished_at: string | null;
+        };
+        /** ExportJobRecord */
+        ExportJobRecord: {
+            /** Export Id */
+            export_id: string;
+            /** Status */
+            status: string;
+            /** Phase */
+            phase: string;
+            /**
+             * Filings
+             * @default null
+             */
+            filings: string[] | null;
+            /**
+             * Cycle
+             * @default null
+             */
+            cycle: number | null;
+            /**
+             * Cover Only
+             * @default false
+             */
+            cover_only: boolean;
+            /**
+             * Completed
+             * @default 0
+             */
+            completed: number;
+            /**
+             * Total
+             * @default 0
+             */
+            total: number;
+            /**
+             * Queue Position
+             * @default null
+             */
+            queue_position: number | null;
+            /**
+             * Error Message
+             * @default null
+             */
+            error_message: string | null;
+            /**
+             * Db Export Id
+             * @default null
+             */
+            db_export_id: number | null;
+            /**
+             * Created At
+             * @default null
+             */
+            created_at: string | null;
+            /**
+             * Started At
+             * @default null
+             */
+            started_at: string | null;
+            /**
+             * Finished At
+             * @default null
+             */
+            finished_at: string | null;
+        };
         /** ExportRecord */
         ExportRecord: {
             /** Export Id */
@@ -1189,6 +2048,43 @@ export interface components {
              */
             error_message: string | null;
         };
+        /** ContributorCriteria */
+        ContributorCriteria: {
+            /**
+             * First Name
+             * @default
+             */
+            first_name: string;
+            /**
+             * Last Name
+             * @default
+             */
+            last_name: string;
+            /**
+             * City
+             * @default
+             */
+            city: string;
+            /**
+             * State
+             * @default
+             */
+            state: string;
+        };
+        /** RaceSpec */
+        RaceSpec: {
+            /** Office */
+            office: string;
+            /** State */
+            state: string;
+            /**
+             * District
+             * @default
+             */
+            district: string;
+            /** Cycle */
+            cycle: number;
+        };
     };
     responses: never;
     parameters: never;
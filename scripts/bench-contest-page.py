@@ -0,0 +1,119 @@
+"""
+Benchmark the contest page candidate query.
+
+Compares the old per-candidate F3 lookup (one query per candidate) against
+fetch_contest_candidates() on synthetic races of increasing size.
+
+    uv run scripts/bench-contest-page.py
+"""
+
+import asyncio
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from datasette.app import Datasette
+from datasette_libfec.routes_pages import fetch_contest_candidates
+
+RACE_SIZES = [5, 25, 100, 400]
+FILINGS_PER_COMMITTEE = 8
+RUNS = 20
+
+
+def build_db(path: Path, candidates: int) -> None:
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE libfec_candidates (
+            candidate_id TEXT, name TEXT, state TEXT, office TEXT,
+            district TEXT, principal_campaign_committee TEXT, cycle INTEGER
+        );
+        CREATE TABLE libfec_filings (
+            filing_id TEXT PRIMARY KEY, filer_id TEXT, filer_name TEXT,
+            cover_record_form TEXT
+        );
+        CREATE INDEX idx_filings_filer ON libfec_filings(filer_id);
+        CREATE TABLE libfec_F3 (
+            filing_id TEXT, coverage_through_date TEXT,
+            col_a_total_receipts REAL, col_a_total_disbursements REAL,
+            col_a_cash_on_hand_close_of_period REAL
+        );
+        CREATE INDEX idx_f3_filing ON libfec_F3(filing_id);
+    """)
+    filing_id = 0
+    for i in range(candidates):
+        committee_id = f"C{i:08d}"
+        conn.execute(
+            "INSERT INTO libfec_candidates VALUES (?, ?, 'US', 'P', NULL, ?, 2026)",
+            [f"P{i:08d}", f"Candidate {i}", committee_id],
+        )
+        for q in range(FILINGS_PER_COMMITTEE):
+            filing_id += 1
+            conn.execute(
+                "INSERT INTO libfec_filings VALUES (?, ?, ?, 'F3')",
+                [str(filing_id), committee_id, f"Committee {i}"],
+            )
+            conn.execute(
+                "INSERT INTO libfec_F3 VALUES (?, ?, ?, ?, ?)",
+                [str(filing_id), f"2025-{q + 1:02d}-28", q * 100, q * 50, q * 50],
+            )
+    conn.commit()
+    conn.close()
+
+
+async def legacy_fetch(db):
+    result = await db.execute(
+        """
+        SELECT * FROM libfec_candidates
+        WHERE state = ? AND office = ? AND cycle = ?
+        GROUP BY candidate_id
+        ORDER BY name
+        """,
+        ["US", "P", 2026],
+    )
+    rows = []
+    for row in result.rows:
+        data = dict(row)
+        f3 = await db.execute(
+            """
+            SELECT f3.coverage_through_date, f3.col_a_total_receipts,
+                   f3.col_a_total_disbursements, f3.col_a_cash_on_hand_close_of_period
+            FROM libfec_F3 f3
+            JOIN libfec_filings fil ON f3.filing_id = fil.filing_id
+            WHERE fil.filer_id = ?
+            ORDER BY f3.coverage_through_date DESC
+            LIMIT 1
+            """,
+            [data["principal_campaign_committee"]],
+        )
+        rows.append((data, f3.first()))
+    return rows
+
+
+async def timed(fn) -> float:
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main():
+    print(f"{'candidates':>10}  {'per-candidate ms':>16}  {'single query ms':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in RACE_SIZES:
+            path = Path(tmp) / f"race_{size}.db"
+            build_db(path, size)
+            db = Datasette([str(path)]).get_database(path.stem)
+
+            legacy = await timed(lambda: legacy_fetch(db))
+            current = await timed(
+                lambda: fetch_contest_candidates(db, "US", "P", None, 2026)
+            )
+            print(f"{size:>10}  {legacy:>16.2f}  {current:>15.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark the per-export process setup cost with and without the pool.
+
+"cold" spawns `libfec export --rpc`, waits for ready and shuts it down, as
+every export used to. "warm" gets a process from ExportProcessPool and hands
+it back, which is what an export pays for once the pool has a process idle.
+
+    uv run scripts/bench-export-pool.py
+"""
+
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from datasette_libfec.export_pool import ExportProcessPool
+from datasette_libfec.libfec_client import LibfecClient
+from datasette_libfec.libfec_export_rpc_client import LibfecExportRpcClient
+
+RUNS = 30
+
+
+async def cold(libfec_path: str, output_db: str) -> float:
+    start = time.perf_counter()
+    client = LibfecExportRpcClient(libfec_path, output_db)
+    await client.start_process()
+    await client.shutdown()
+    return (time.perf_counter() - start) * 1000
+
+
+async def warm(pool: ExportProcessPool, output_db: str) -> float:
+    start = time.perf_counter()
+    client = await pool.acquire(output_db)
+    await pool.release(client, reusable=True)
+    return (time.perf_counter() - start) * 1000
+
+
+async def main() -> None:
+    libfec_path = str(LibfecClient().libfec_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_db = str(Path(tmp) / "fec.db")
+
+        cold_ms = [await cold(libfec_path, output_db) for _ in range(RUNS)]
+
+        pool = ExportProcessPool(libfec_path)
+        await pool.warm(output_db)
+        warm_ms = [await warm(pool, output_db) for _ in range(RUNS)]
+        await pool.close()
+
+    print(f"{'':>6} {'median ms':>10} {'p95 ms':>8}")
+    for name, samples in (("cold", cold_ms), ("warm", warm_ms)):
+        p95 = statistics.quantiles(samples, n=20)[-1]
+        print(f"{name:>6} {statistics.median(samples):>10.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
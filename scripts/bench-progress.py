@@ -0,0 +1,129 @@
+"""
+Benchmark applying export/progress notifications to a running export job.
+
+Simulates an export of FILINGS filings, one export/progress notification per
+filing with a warning every WARNING_EVERY filings (libfec sends the whole
+list each time). Notifications are delivered CHUNK at a time, the way
+RpcProcess dispatches a chunk read from stdout, with a heartbeat snapshot
+(what export_queue writes to the internal DB) every HEARTBEAT_EVERY chunks.
+
+"per notification" is the old on_progress, which applied every notification
+and replaced the warnings list; "aggregated" is ProgressAggregator.
+
+    uv run scripts/bench-progress.py
+"""
+
+import asyncio
+import json
+import time
+
+from datasette_libfec.export_queue import ExportJob
+from datasette_libfec.internal_db import ExportJobRow
+from datasette_libfec.progress_aggregator import ProgressAggregator
+from datasette_libfec.progress_events import ProgressBroadcaster
+
+FILINGS = 20_000
+WARNING_EVERY = 10
+CHUNK = 500
+HEARTBEAT_EVERY = 4
+
+
+def notifications():
+    warnings = []
+    for i in range(FILINGS):
+        if i % WARNING_EVERY == 0:
+            warnings.append(f"FEC-{1000000 + i}: unknown form type")
+        yield {
+            "jsonrpc": "2.0",
+            "method": "export/progress",
+            "params": {
+                "phase": "exporting",
+                "completed": i + 1,
+                "total": FILINGS,
+                "current_filing_id": f"FEC-{1000000 + i}",
+                "warnings": list(warnings),
+            },
+        }
+
+
+def make_job():
+    row = ExportJobRow(export_id="export-1", database_name="fec", output_db="x.db")
+    return ExportJob(row, ProgressBroadcaster())
+
+
+def per_notification(job):
+    def on_progress(notification):
+        params = notification["params"]
+        job.phase = params.get("phase", "idle")
+        job.completed = params.get("completed", 0)
+        job.total = params.get("total", 0)
+        job.current_filing_id = params.get("current_filing_id")
+        job.current = params.get("current")
+        job.total_exported = params.get("total_exported")
+        job.warnings = params.get("warnings", [])
+        job.progress_changed()
+
+    return on_progress, None
+
+
+def aggregated(job):
+    def apply_progress(params):
+        job.phase = params.get("phase", "idle")
+        job.completed = params.get("completed", 0)
+        job.total = params.get("total", 0)
+        job.current_filing_id = params.get("current_filing_id")
+        job.current = params.get("current")
+        job.total_exported = params.get("total_exported")
+        job.warnings = aggregator.warnings
+        job.progress_changed()
+
+    aggregator = ProgressAggregator("export/progress", apply_progress)
+    return aggregator, aggregator
+
+
+async def run(make_callback):
+    job = make_job()
+    published = 0
+    original = job.progress_changed
+
+    def progress_changed():
+        nonlocal published
+        published += 1
+        original()
+
+    job.progress_changed = progress_changed
+    callback, aggregator = make_callback(job)
+    messages = list(notifications())
+
+    written = 0
+    began = time.process_time()
+    for n, start in enumerate(range(0, FILINGS, CHUNK)):
+        for msg in messages[start : start + CHUNK]:
+            callback(msg)
+        if n % HEARTBEAT_EVERY == 0:
+            snapshot = job.changed_snapshot()
+            if snapshot:
+                written += len(json.dumps(snapshot))
+        # Let the aggregator apply, as the reader waits for the next chunk
+        await asyncio.sleep(0.06)
+    if aggregator is not None:
+        aggregator.flush()
+    cpu = time.process_time() - began
+    assert job.completed == FILINGS
+    assert len(job.warnings) == FILINGS // WARNING_EVERY
+    return cpu, published, written
+
+
+async def main():
+    print(f"{FILINGS} notifications, {FILINGS // WARNING_EVERY} warnings")
+    print(f"{'':>17} {'cpu ms':>8} {'applied':>8} {'heartbeat KB':>13}")
+    for name, make_callback in [
+        ("per notification", per_notification),
+        ("aggregated", aggregated),
+    ]:
+        cpu, published, written = await run(make_callback)
+        print(f"{name:>17} {cpu * 1000:>8.1f} {published:>8} {written / 1024:>13.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
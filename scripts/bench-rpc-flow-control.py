@@ -0,0 +1,88 @@
+"""
+Benchmark export throughput against a fake libfec RPC server.
+
+tests/fake_libfec.py behaves like `libfec export --rpc`: it exports filings
+in batches of BATCH, emitting export/progress for each one, and after each
+batch blocks until it reads another line on stdin. Each filing takes FILING_MS.
+
+"poll" is the old client behaviour: an export/status request every 500ms.
+"credit" is StatusPump, which grants the next batch as soon as progress
+notifications arrive.
+
+    uv run scripts/bench-rpc-flow-control.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "tests"))
+
+from fake_libfec import install  # noqa: E402
+
+from datasette_libfec import libfec_export_rpc_client
+from datasette_libfec.flow_control import StatusPump
+from datasette_libfec.libfec_export_rpc_client import LibfecExportRpcClient
+
+FILINGS = 200
+FILING_MS = 2
+BATCH = 10
+
+
+class PollingPump(StatusPump):
+    """The old loop: a status request every 500ms, ignoring notifications."""
+
+    def notify(self) -> None:
+        pass
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+
+async def run_export(libfec_path: Path, output_db: str) -> tuple[float, int]:
+    client = LibfecExportRpcClient(str(libfec_path), output_db)
+    await client.start_process()
+    grants = 0
+
+    def on_progress(notification):
+        nonlocal grants
+        if client.status_pump:
+            grants = client.status_pump.grants
+
+    start = time.perf_counter()
+    await client.export_start(
+        filings=["C00123456"],
+        cycle=None,
+        cover_only=True,
+        clobber=False,
+        progress_callback=on_progress,
+    )
+    elapsed = time.perf_counter() - start
+    await client.shutdown()
+    return elapsed, grants
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        libfec_path = install(tmp)
+        os.environ.update(
+            FAKE_LIBFEC_ITEMS=str(FILINGS),
+            FAKE_LIBFEC_LATENCY_MS=str(FILING_MS),
+            FAKE_LIBFEC_BATCH=str(BATCH),
+        )
+        output_db = os.path.join(tmp, "fec.db")
+
+        print(f"{FILINGS} filings, {FILING_MS}ms each, batches of {BATCH}")
+        print(f"{'':>7} {'seconds':>8} {'filings/s':>10} {'status reqs':>12}")
+        for name, pump in (("poll", PollingPump), ("credit", StatusPump)):
+            libfec_export_rpc_client.StatusPump = pump
+            elapsed, grants = await run_export(libfec_path, output_db)
+            print(f"{name:>7} {elapsed:>8.2f} {FILINGS / elapsed:>10.0f} {grants:>12}")
+        libfec_export_rpc_client.StatusPump = StatusPump
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+"""
+Microbenchmarks for the JSON-RPC transport, through a fake subprocess.
+
+notifications: the fake server writes NOTIFICATIONS export/progress-sized
+notifications as fast as it can. "readline+json" is the reader the clients
+used before (readline per line, json.loads on each); "chunked" is
+RpcProcess's reader, with the standard library json and with orjson if it is
+installed. Max lag is the worst delay seen by a 1ms ticker task meanwhile.
+
+requests: REQUESTS echo requests sent one at a time, pipelined (all in
+flight at once) and with send_batch.
+
+    uv run scripts/bench-rpc-transport.py
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from datasette_libfec import rpc_transport
+from datasette_libfec.rpc_transport import RpcProcess
+
+NOTIFICATIONS = 100_000
+REQUESTS = 5_000
+
+FAKE_SERVER = """
+import json, sys
+
+def send(msg):
+    sys.stdout.write(json.dumps(msg) + "\\n")
+    sys.stdout.flush()
+
+send({"jsonrpc": "2.0", "method": "ready", "params": {}})
+for line in sys.stdin:
+    msg = json.loads(line)
+    if msg["method"] == "burst":
+        lines = [
+            json.dumps({"jsonrpc": "2.0", "method": "export/progress", "params": {
+                "phase": "exporting", "completed": i, "total": msg["params"]["count"],
+                "current_filing_id": f"FEC-{1000000 + i}",
+            }})
+            for i in range(msg["params"]["count"])
+        ]
+        sys.stdout.write("\\n".join(lines) + "\\n")
+    send({"jsonrpc": "2.0", "id": msg["id"], "result": msg.get("params")})
+    if msg["method"] == "shutdown":
+        break
+"""
+
+
+class FakeClient(RpcProcess):
+    name = "fake"
+
+    def __init__(self):
+        super().__init__(sys.executable)
+        self.notified = 0
+
+    def command(self):
+        return [sys.executable, "-c", FAKE_SERVER]
+
+    def handle_notification(self, method, params, msg):
+        self.notified += 1
+
+
+class ReadlineClient(FakeClient):
+    """The reader the clients used before RpcProcess."""
+
+    async def _listen_for_messages(self):
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                return
+            self._dispatch(json.loads(line.decode()))
+
+
+async def max_lag(stop: asyncio.Event) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - start - 0.001)
+    return worst
+
+
+async def bench_notifications(client_class, codec) -> tuple[float, float]:
+    rpc_transport.loads = codec
+    client = client_class()
+    await client.start_process()
+    stop = asyncio.Event()
+    lag = asyncio.create_task(max_lag(stop))
+    start = time.perf_counter()
+    await client.send_request("burst", {"count": NOTIFICATIONS}, timeout=120)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    assert client.notified == NOTIFICATIONS + 1  # plus ready
+    await client.shutdown()
+    return NOTIFICATIONS / elapsed, await lag
+
+
+async def bench_requests() -> None:
+    client = FakeClient()
+    await client.start_process()
+
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        await client.send_request("echo", {"i": i})
+    sequential = REQUESTS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[client.send_request("echo", {"i": i}) for i in range(REQUESTS)]
+    )
+    pipelined = REQUESTS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await client.send_batch([("echo", {"i": i}) for i in range(REQUESTS)])
+    batched = REQUESTS / (time.perf_counter() - start)
+    await client.shutdown()
+
+    print(f"\n{REQUESTS} requests, requests/s")
+    print(f"{'sequential':>12} {sequential:>10.0f}")
+    print(f"{'pipelined':>12} {pipelined:>10.0f}")
+    print(f"{'send_batch':>12} {batched:>10.0f}")
+
+
+async def main() -> None:
+    default_loads = rpc_transport.loads
+    readers = [
+        ("readline+json", ReadlineClient, json.loads),
+        ("chunked+json", FakeClient, json.loads),
+    ]
+    if rpc_transport.orjson is not None:
+        readers.append(("chunked+orjson", FakeClient, rpc_transport.orjson.loads))
+
+    print(f"{NOTIFICATIONS} notifications")
+    print(f"{'':>15} {'msgs/s':>10} {'max lag ms':>11}")
+    for name, client_class, codec in readers:
+        rate, lag = await bench_notifications(client_class, codec)
+        print(f"{name:>15} {rate:>10.0f} {lag * 1000:>11.1f}")
+    rpc_transport.loads = default_loads
+
+    await bench_requests()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark the per-sync process cost with and without a resident RSS process.
+
+"cold" spawns `libfec rss --rpc`, checks sync/status and shuts it down, as
+every RSS cron run used to. "warm" gets the resident process from
+RssProcessManager and hands it back, which is what a run pays once the
+process is up. Neither runs a sync, which is the same work either way.
+
+    uv run scripts/bench-rss-process.py
+"""
+
+import asyncio
+import statistics
+import time
+
+from datasette_libfec.libfec_client import LibfecClient
+from datasette_libfec.libfec_rpc_client import LibfecRpcClient
+from datasette_libfec.rss_process import RssProcessManager
+
+RUNS = 30
+
+
+async def cold(libfec_path: str) -> float:
+    start = time.perf_counter()
+    client = LibfecRpcClient(libfec_path)
+    await client.start_process()
+    await client.send_request("sync/status")
+    await client.shutdown()
+    return (time.perf_counter() - start) * 1000
+
+
+async def warm(manager: RssProcessManager) -> float:
+    start = time.perf_counter()
+    client = await manager.acquire()
+    await manager.release(client, reusable=True)
+    return (time.perf_counter() - start) * 1000
+
+
+async def main() -> None:
+    libfec_path = str(LibfecClient().libfec_path)
+    manager = RssProcessManager(libfec_path)
+    await warm(manager)
+
+    print(f"{RUNS} runs, ms per sync")
+    print(f"{'':>5} {'median':>8} {'p90':>8}")
+    for name, run in (
+        ("cold", lambda: cold(libfec_path)),
+        ("warm", lambda: warm(manager)),
+    ):
+        times = sorted([await run() for _ in range(RUNS)])
+        print(
+            f"{name:>5} {statistics.median(times):>8.1f} {times[int(RUNS * 0.9)]:>8.1f}"
+        )
+    await manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Benchmark reading the RSS status while the internal database is busy writing.
+
+A writer keeps the internal database's write thread occupied with WRITE_MS
+writes, the way progress flushes and export job heartbeats do. "write thread"
+reads the RSS progress row through execute_write_fn, as get_rss_progress used
+to; "cached" is InternalDB.get_rss_progress.
+
+    uv run scripts/bench-rss-status.py
+"""
+
+import asyncio
+import statistics
+import time
+
+from datasette.app import Datasette
+
+from datasette_libfec.internal_db import InternalDB
+
+RUNS = 50
+WRITE_MS = 20
+
+
+async def main() -> None:
+    ds = Datasette(memory=True)
+    await ds.invoke_startup()
+    db = ds.get_internal_database()
+    internal = InternalDB(db)
+
+    stop = False
+
+    async def writer():
+        while not stop:
+            await db.execute_write_fn(lambda conn: time.sleep(WRITE_MS / 1000))
+
+    writers = [asyncio.create_task(writer()) for _ in range(4)]
+
+    def read(conn):
+        return conn.execute(
+            "SELECT * FROM datasette_libfec_rss_progress WHERE id = 1"
+        ).fetchone()
+
+    print(f"{RUNS} reads, {WRITE_MS}ms writes queued, ms per read")
+    print(f"{'':>12} {'median':>8} {'p90':>8}")
+    for name, run in (
+        ("write thread", lambda: db.execute_write_fn(read)),
+        ("cached", internal.get_rss_progress),
+    ):
+        times = []
+        for _ in range(RUNS):
+            start = time.perf_counter()
+            await run()
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        print(
+            f"{name:>12} {statistics.median(times):>8.1f} {times[int(RUNS * 0.9)]:>8.1f}"
+        )
+
+    stop = True
+    await asyncio.gather(*writers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
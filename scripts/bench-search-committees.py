@@ -0,0 +1,84 @@
+"""
+Benchmark principal committee lookups for search results.
+
+The fake search client answers get_committee serially, like a single
+`libfec search --rpc` process, taking RPC_MS per request. "serial" is the old
+loop awaiting one get_committee at a time; "batched" is fetch_committees,
+which looks committees up in libfec_committees first and pipelines the rest.
+
+    uv run scripts/bench-search-committees.py
+"""
+
+import asyncio
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from datasette.app import Datasette
+
+from datasette_libfec.routes_search import fetch_committees
+
+RPC_MS = 2
+CYCLE = 2026
+
+
+class FakeSearchClient:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+
+    async def get_committee(self, committee_id, cycle):
+        # One process answers one request at a time, but requests written
+        # back to back skip the per-request round trip
+        async with self.lock:
+            await asyncio.sleep(RPC_MS / 1000)
+        return {"committee_id": committee_id, "name": committee_id}
+
+
+async def serial(client, committee_ids):
+    committees = []
+    for committee_id in committee_ids:
+        # The old loop also paid a round trip per committee
+        await asyncio.sleep(RPC_MS / 1000)
+        committees.append(await client.get_committee(committee_id, CYCLE))
+    return committees
+
+
+def make_db(path, committee_ids):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE libfec_committees (committee_id TEXT, name TEXT, cycle INTEGER)"
+    )
+    conn.executemany(
+        "INSERT INTO libfec_committees VALUES (?, ?, ?)",
+        [(c, c, CYCLE) for c in committee_ids],
+    )
+    conn.commit()
+    conn.close()
+
+
+async def main():
+    tmp = Path(tempfile.mkdtemp())
+    print(f"{'committees':>10} {'local':>6} {'serial ms':>10} {'batched ms':>11}")
+    for count in (10, 50, 100):
+        committee_ids = [f"C{i:08d}" for i in range(count)]
+        for local in (False, True):
+            path = tmp / f"fec-{count}-{local}.db"
+            make_db(str(path), committee_ids if local else [])
+            db = Datasette([str(path)]).databases[path.stem]
+            client = FakeSearchClient()
+
+            start = time.perf_counter()
+            await serial(client, committee_ids)
+            serial_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            found = await fetch_committees(db, client, committee_ids, CYCLE)
+            batched_ms = (time.perf_counter() - start) * 1000
+            assert len(found) == count
+
+            print(f"{count:>10} {str(local):>6} {serial_ms:>10.1f} {batched_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark local FTS5 search against the old LIKE scan.
+
+Builds a database with COMMITTEES committees over three cycles, then times
+typeahead-style prefix queries through local_search and through the LIKE
+query CommitteeSearch.svelte used to run.
+
+    uv run scripts/bench-search-local.py
+"""
+
+import asyncio
+import random
+import sqlite3
+import string
+import tempfile
+import time
+from pathlib import Path
+
+from datasette.app import Datasette
+
+from datasette_libfec.search_index import local_search
+
+COMMITTEES = 20_000
+QUERIES = ["ac", "act", "actb", "friends of", "pel", "C004", "zz"]
+RUNS = 50
+
+LIKE_SQL = """
+SELECT committee_id, name
+FROM libfec_committees
+WHERE name LIKE :term OR committee_id LIKE :term
+GROUP BY committee_id
+ORDER BY name
+LIMIT 20
+"""
+
+
+def make_db(path):
+    rng = random.Random(1)
+    words = ["".join(rng.choices(string.ascii_uppercase, k=6)) for _ in range(2000)]
+    words += ["ACTBLUE", "FRIENDS", "OF", "PELOSI", "FOR", "CONGRESS"]
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE libfec_committees (cycle INTEGER, committee_id TEXT, name TEXT)"
+    )
+    rows = []
+    for i in range(COMMITTEES):
+        name = " ".join(rng.choices(words, k=4))
+        for cycle in (2022, 2024, 2026):
+            rows.append((cycle, f"C{i:08d}", name))
+    conn.executemany("INSERT INTO libfec_committees VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+async def main():
+    path = Path(tempfile.mkdtemp()) / "fec.db"
+    make_db(str(path))
+    db = Datasette([str(path)]).databases["fec"]
+
+    start = time.perf_counter()
+    await local_search(db, "warm", None, 20)
+    print(f"index build: {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    print(f"{'query':>12} {'fts ms':>8} {'like ms':>8}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            await local_search(db, query, None, 20)
+        fts_ms = (time.perf_counter() - start) * 1000 / RUNS
+
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            await db.execute(LIKE_SQL, {"term": f"%{query}%"})
+        like_ms = (time.perf_counter() - start) * 1000 / RUNS
+        print(f"{query:>12} {fts_ms:>8.2f} {like_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,478 @@
+"""
+A stand-in for the libfec binary's --rpc modes, for tests and benchmarks.
+
+    fake_libfec.py export --rpc -o OUTPUT_DB
+    fake_libfec.py rss --rpc
+    fake_libfec.py search --rpc --cycle CYCLE
+
+It speaks the same JSONL protocol as libfec: a ready notification, then
+export/start, export/status and export/cancel (export), sync/start,
+sync/status and sync/cancel (rss), search/query, search/candidate and
+search/committee (search), and shutdown. Like libfec, exports and syncs
+process BATCH items and then wait for another line on stdin before carrying
+on, sending export/progress or sync/progress for every item. Each exported
+filing is written to the output database as synthetic libfec_filings rows.
+
+install() writes an executable wrapper for it, to use as
+DATASETTE_LIBFEC_BIN_PATH. Behaviour is set with environment variables:
+
+    FAKE_LIBFEC_ITEMS         filings an export or sync works through (10)
+    FAKE_LIBFEC_LATENCY_MS    time per filing or search request (0)
+    FAKE_LIBFEC_STARTUP_MS    delay before the ready notification (0)
+    FAKE_LIBFEC_BATCH         filings per batch between stdin reads (10)
+    FAKE_LIBFEC_WARN_EVERY    add a warning every N filings (0, never)
+    FAKE_LIBFEC_RESULTS       candidates and committees per search (5)
+    FAKE_LIBFEC_FAIL          failure to inject, one of:
+        crash:N     write to stderr and exit 1 after N filings
+        error:N     finish with phase "error" after N filings
+        hang:N      stop sending progress after N filings
+        reject      answer export/start and sync/start with an RPC error
+        no-ready    never send the ready notification
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name) or default)
+
+
+ITEMS = _env_int("FAKE_LIBFEC_ITEMS", 10)
+LATENCY = _env_int("FAKE_LIBFEC_LATENCY_MS", 0) / 1000
+STARTUP = _env_int("FAKE_LIBFEC_STARTUP_MS", 0) / 1000
+BATCH = max(1, _env_int("FAKE_LIBFEC_BATCH", 10))
+WARN_EVERY = _env_int("FAKE_LIBFEC_WARN_EVERY", 0)
+RESULTS = _env_int("FAKE_LIBFEC_RESULTS", 5)
+FAIL, _, FAIL_AFTER = (os.environ.get("FAKE_LIBFEC_FAIL") or "").partition(":")
+FAIL_AFTER = int(FAIL_AFTER or 0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS libfec_filings (
+    filing_id TEXT PRIMARY KEY,
+    filer_id TEXT,
+    filer_name TEXT,
+    cover_record_form TEXT,
+    coverage_from_date TEXT,
+    coverage_through_date TEXT
+);
+CREATE TABLE IF NOT EXISTS libfec_committees (
+    cycle INTEGER,
+    committee_id TEXT,
+    name TEXT,
+    committee_type TEXT,
+    designation TEXT,
+    party_affiliation TEXT,
+    connected_org_name TEXT,
+    candidate_id TEXT
+);
+CREATE TABLE IF NOT EXISTS libfec_exports (
+    export_id INTEGER PRIMARY KEY,
+    export_uuid TEXT,
+    created_at TEXT,
+    filings_count INTEGER,
+    cover_only INTEGER,
+    status TEXT,
+    error_message TEXT
+);
+CREATE TABLE IF NOT EXISTS libfec_export_filings (
+    export_id INTEGER,
+    filing_id TEXT,
+    success INTEGER,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS libfec_rss_syncs (
+    sync_id INTEGER PRIMARY KEY,
+    sync_uuid TEXT,
+    created_at TEXT,
+    completed_at TEXT,
+    since_filter TEXT,
+    preset_filter TEXT,
+    form_type_filter TEXT,
+    committee_filter TEXT,
+    state_filter TEXT,
+    party_filter TEXT,
+    total_feed_items INTEGER,
+    filtered_items INTEGER,
+    new_filings_count INTEGER,
+    exported_count INTEGER,
+    cover_only INTEGER,
+    status TEXT,
+    error_message TEXT
+);
+CREATE TABLE IF NOT EXISTS libfec_rss_filings (
+    sync_id INTEGER,
+    filing_id TEXT,
+    rss_pub_date TEXT,
+    rss_title TEXT,
+    committee_id TEXT,
+    form_type TEXT,
+    coverage_from TEXT,
+    coverage_through TEXT,
+    report_type TEXT,
+    export_success INTEGER,
+    export_message TEXT
+);
+"""
+
+
+def install(directory) -> Path:
+    """Write an executable `libfec` wrapper for this script into directory."""
+    wrapper = Path(directory) / "libfec"
+    wrapper.write_text(
+        f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).resolve()}" "$@"\n'
+    )
+    wrapper.chmod(wrapper.stat().st_mode | stat.S_IEXEC)
+    return wrapper
+
+
+def send(msg):
+    sys.stdout.write(json.dumps(msg) + "\n")
+    sys.stdout.flush()
+
+
+def result(msg, value):
+    send({"jsonrpc": "2.0", "id": msg["id"], "result": value})
+
+
+def error(msg, code, message, data=None):
+    err = {"code": code, "message": message}
+    if data is not None:
+        err["data"] = data
+    send({"jsonrpc": "2.0", "id": msg.get("id"), "error": err})
+
+
+def now():
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+
+
+def filing_row(n):
+    committee_id = f"C{n % 1000:08d}"
+    return (
+        str(1_000_000 + n),
+        committee_id,
+        f"FAKE COMMITTEE {n % 1000}",
+        "F3",
+        "2026-01-01",
+        "2026-03-31",
+    )
+
+
+class Job:
+    """An export or sync in progress, worked through a batch at a time."""
+
+    def __init__(self, kind, output_db, params):
+        self.kind = kind
+        self.params = params
+        self.phase = "exporting"
+        self.completed = 0
+        self.warnings = []
+        self.hung = False
+        self.conn = sqlite3.connect(output_db)
+        self.conn.executescript(SCHEMA)
+        filings = params.get("filings") or []
+        if kind == "export" and filings and all(f.isdigit() for f in filings):
+            # Filing IDs export themselves; anything else stands for ITEMS filings
+            self.filings = [int(f) - 1_000_000 for f in filings]
+        else:
+            self.filings = list(range(ITEMS))
+        self.total = len(self.filings)
+        with self.conn:
+            if kind == "export":
+                cursor = self.conn.execute(
+                    "INSERT INTO libfec_exports "
+                    "(export_uuid, created_at, filings_count, cover_only, status) "
+                    "VALUES (?, ?, ?, ?, 'started')",
+                    [
+                        f"fake-{time.time()}",
+                        now(),
+                        self.total,
+                        params.get("cover_only", False),
+                    ],
+                )
+                for committee_id in filings:
+                    if committee_id.startswith("C"):
+                        self.conn.execute(
+                            "INSERT INTO libfec_committees (cycle, committee_id, name) "
+                            "VALUES (?, ?, ?)",
+                            [params.get("cycle"), committee_id, f"FAKE {committee_id}"],
+                        )
+            else:
+                cursor = self.conn.execute(
+                    "INSERT INTO libfec_rss_syncs (sync_uuid, created_at, since_filter, "
+                    "state_filter, total_feed_items, filtered_items, cover_only, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 'started')",
+                    [
+                        f"fake-{time.time()}",
+                        now(),
+                        params.get("since"),
+                        params.get("state"),
+                        self.total,
+                        self.total,
+                        params.get("cover_only", False),
+                    ],
+                )
+        self.id = cursor.lastrowid
+
+    def start_result(self):
+        if self.kind == "export":
+            return {"export_id": f"export-{self.id}", "status": "started"}
+        return {"sync_id": self.id, "phase": "fetching"}
+
+    def status(self):
+        if self.kind == "export":
+            return {
+                "export_id": f"export-{self.id}",
+                "phase": self.phase,
+                "completed": self.completed,
+                "total": self.total,
+            }
+        return {
+            "sync_id": self.id,
+            "phase": self.phase,
+            "exported_count": self.completed,
+            "total_count": self.total,
+        }
+
+    def progress(self, **extra):
+        if self.kind == "export":
+            params = {
+                "phase": self.phase,
+                "completed": self.completed,
+                "total": self.total,
+                "warnings": list(self.warnings),
+            }
+            method = "export/progress"
+        else:
+            params = {
+                "phase": self.phase,
+                "exported_count": self.completed,
+                "total_count": self.total,
+                "feed_title": "FEC filings (fake)",
+                "feed_last_modified": now(),
+            }
+            method = "sync/progress"
+        params.update(extra)
+        send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def run_batch(self):
+        """Export up to BATCH filings, then return to wait for stdin."""
+        rows = []
+        for _ in range(BATCH):
+            if self.completed == FAIL_AFTER and FAIL in ("crash", "error", "hang"):
+                self.fail()
+                break
+            n = self.filings[self.completed]
+            if LATENCY:
+                time.sleep(LATENCY)
+            rows.append(filing_row(n))
+            self.completed += 1
+            if WARN_EVERY and self.completed % WARN_EVERY == 0:
+                self.warnings.append(f"{1_000_000 + n}: unrecognized line")
+            self.progress(current_filing_id=str(1_000_000 + n))
+            if self.completed == self.total:
+                break
+        self.write(rows)
+        if self.completed == self.total and self.phase == "exporting":
+            self.finish("complete")
+
+    def write(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO libfec_filings VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            if self.kind == "export":
+                self.conn.executemany(
+                    "INSERT INTO libfec_export_filings VALUES (?, ?, 1, NULL)",
+                    [(self.id, row[0]) for row in rows],
+                )
+            else:
+                self.conn.executemany(
+                    "INSERT INTO libfec_rss_filings (sync_id, filing_id, rss_pub_date, "
+                    "rss_title, committee_id, form_type, export_success) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 1)",
+                    [(self.id, row[0], now(), row[2], row[1], row[3]) for row in rows],
+                )
+
+    def fail(self):
+        if FAIL == "crash":
+            sys.stderr.write(f"fatal: fake crash after {self.completed} filings\n")
+            sys.stderr.flush()
+            os._exit(1)
+        if FAIL == "error":
+            self.finish("error", error_message="fake failure", error_code=-32000)
+        else:
+            self.hung = True
+
+    def finish(self, phase, **extra):
+        self.phase = phase
+        table = "libfec_exports" if self.kind == "export" else "libfec_rss_syncs"
+        column = "export_id" if self.kind == "export" else "sync_id"
+        with self.conn:
+            self.conn.execute(
+                f"UPDATE {table} SET status = ?, error_message = ? WHERE {column} = ?",
+                [phase, extra.get("error_message"), self.id],
+            )
+            if self.kind == "rss":
+                self.conn.execute(
+                    "UPDATE libfec_rss_syncs SET completed_at = ?, exported_count = ?, "
+                    "new_filings_count = ? WHERE sync_id = ?",
+                    [now(), self.completed, self.completed, self.id],
+                )
+        final = {"total_exported": self.completed} if self.kind == "export" else {}
+        self.progress(**final, **extra)
+
+    @property
+    def running(self):
+        return self.phase == "exporting" and not self.hung
+
+
+def search_results(params):
+    query = params.get("query", "")
+    limit = min(params.get("limit", 100), RESULTS)
+    candidates = [
+        {
+            "candidate_id": f"H6XX{i:05d}",
+            "name": f"{query.upper()} CANDIDATE {i}",
+            "party_affiliation": "DEM" if i % 2 else "REP",
+            "election_year": params.get("cycle"),
+            "office": "H",
+            "state": "XX",
+            "district": f"{i:02d}",
+            "incumbent_challenger_status": "C",
+            "principal_campaign_committee": f"C9{i:07d}",
+        }
+        for i in range(limit)
+    ]
+    committees = [
+        committee(f"C8{i:07d}", f"{query.upper()} COMMITTEE {i}") for i in range(limit)
+    ]
+    return {
+        "cycle": params.get("cycle"),
+        "query": query,
+        "candidate_count": len(candidates),
+        "candidates": candidates,
+        "committees": committees,
+    }
+
+
+def committee(committee_id, name):
+    return {
+        "committee_id": committee_id,
+        "name": name,
+        "committee_type": "H",
+        "designation": "P",
+        "party_affiliation": None,
+        "connected_org_name": None,
+        "candidate_id": None,
+    }
+
+
+def main(argv):
+    mode = argv[0] if argv else None
+    if "--rpc" not in argv or mode not in ("export", "rss", "search"):
+        sys.stderr.write("fake libfec only supports export, rss and search --rpc\n")
+        return 2
+    output_db = argv[argv.index("-o") + 1] if "-o" in argv else None
+    cycle = int(argv[argv.index("--cycle") + 1]) if "--cycle" in argv else 2026
+
+    inbox = queue.Queue()
+
+    def read():
+        for line in sys.stdin:
+            inbox.put(line)
+        inbox.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+
+    if STARTUP:
+        time.sleep(STARTUP)
+    if FAIL != "no-ready":
+        ready = {"version": "fake"}
+        if mode == "search":
+            ready["default_cycle"] = cycle
+        send({"jsonrpc": "2.0", "method": "ready", "params": ready})
+
+    job = None
+    prefix = {"export": "export/", "rss": "sync/"}.get(mode)
+
+    def handle(line):
+        nonlocal job
+        if line is None:
+            sys.exit(0)
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            error({}, -32700, "Parse error")
+            return
+        if not isinstance(msg, dict):
+            error({}, -32700, "Parse error")
+            return
+        method = msg.get("method")
+        params = msg.get("params") or {}
+        if method == "shutdown":
+            result(msg, {"ok": True})
+            sys.exit(0)
+        elif prefix and method == prefix + "start":
+            if FAIL == "reject":
+                error(msg, -32000, "Fake rejected start")
+            elif job is not None and job.phase == "exporting":
+                error(msg, -32000, "Already running")
+            else:
+                if mode == "rss":
+                    params = dict(params, filings=None)
+                job = Job(mode, output_db or params.get("export_path"), params)
+                result(msg, job.start_result())
+        elif prefix and method == prefix + "status":
+            if job is None:
+                idle = {"export_id": None} if mode == "export" else {"sync_id": None}
+                result(msg, {**idle, "phase": "idle"})
+            else:
+                result(msg, job.status())
+        elif prefix and method == prefix + "cancel":
+            if job is not None and job.phase == "exporting":
+                job.finish("canceled")
+            result(msg, {"ok": True})
+        elif mode == "search" and method == "search/query":
+            if LATENCY:
+                time.sleep(LATENCY)
+            result(msg, search_results(dict(params, cycle=params.get("cycle", cycle))))
+        elif mode == "search" and method == "search/committee":
+            if LATENCY:
+                time.sleep(LATENCY)
+            committee_id = params.get("committee_id", "")
+            if committee_id.startswith("C"):
+                result(msg, committee(committee_id, f"FAKE {committee_id}"))
+            else:
+                error(msg, -32000, "Committee not found")
+        elif mode == "search" and method == "search/candidate":
+            result(
+                msg,
+                search_results({"query": params.get("candidate_id"), "limit": 1})[
+                    "candidates"
+                ][0],
+            )
+        else:
+            error(msg, -32601, "Method not found", {"method": method})
+
+    while True:
+        handle(inbox.get())
+        while job is not None and job.running:
+            job.run_batch()
+            if not job.running:
+                break
+            # Like libfec, wait for the client before the next batch
+            handle(inbox.get())
+            while not inbox.empty():
+                handle(inbox.get())
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
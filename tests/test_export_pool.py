@@ -0,0 +1,90 @@
+"""Tests for the pool of warm libfec export processes."""
+
+import asyncio
+import pytest
+
+from datasette_libfec.export_pool import ExportProcessPool
+from datasette_libfec.libfec_client import LibfecClient
+
+LIBFEC_PATH = LibfecClient().libfec_path
+
+pytestmark = pytest.mark.skipif(
+    not LIBFEC_PATH.exists(), reason="libfec binary not installed"
+)
+
+
+@pytest.mark.asyncio
+async def test_idle_process_is_reused(tmp_path):
+    pool = ExportProcessPool(str(LIBFEC_PATH))
+    output_db = str(tmp_path / "fec.db")
+
+    first = await pool.acquire(output_db)
+    await pool.release(first, reusable=True)
+    second = await pool.acquire(output_db)
+    assert second is first
+    assert (pool.spawned, pool.reused) == (1, 1)
+
+    # Other output databases get their own process
+    other = await pool.acquire(str(tmp_path / "other.db"))
+    assert other is not first
+    assert pool.spawned == 2
+
+    await pool.release(second, reusable=True)
+    await pool.release(other, reusable=False)
+    assert pool.idle_count() == 1
+    await pool.close()
+    assert not first.is_alive()
+
+
+@pytest.mark.asyncio
+async def test_dead_process_is_replaced(tmp_path):
+    pool = ExportProcessPool(str(LIBFEC_PATH))
+    output_db = str(tmp_path / "fec.db")
+
+    client = await pool.acquire(output_db)
+    await pool.release(client, reusable=True)
+    client.process.kill()
+    await client.process.wait()
+
+    replacement = await pool.acquire(output_db)
+    assert replacement is not client
+    assert replacement.is_alive()
+    await pool.release(replacement, reusable=False)
+
+
+@pytest.mark.asyncio
+async def test_process_recycled_after_max_jobs(tmp_path):
+    pool = ExportProcessPool(str(LIBFEC_PATH), max_jobs_per_process=2)
+    output_db = str(tmp_path / "fec.db")
+
+    client = await pool.acquire(output_db)
+    await pool.release(client, reusable=True)
+    assert await pool.acquire(output_db) is client
+    await pool.release(client, reusable=True)
+    assert not client.is_alive()
+
+    # A replacement is started in the background, and held onto until it's up
+    assert len(pool._warming) == 1
+    for _ in range(100):
+        if pool.idle_count():
+            break
+        await asyncio.sleep(0.05)
+    replacement = await pool.acquire(output_db)
+    assert replacement is not client
+    assert pool.reused == 2
+    await pool.close()
+    await pool.release(replacement, reusable=False)
+
+
+@pytest.mark.asyncio
+async def test_idle_processes_are_reaped(tmp_path):
+    pool = ExportProcessPool(str(LIBFEC_PATH), idle_seconds=0.1)
+    client = await pool.acquire(str(tmp_path / "fec.db"))
+    await pool.release(client, reusable=True)
+
+    for _ in range(50):
+        if not client.is_alive():
+            break
+        await asyncio.sleep(0.05)
+    assert not client.is_alive()
+    assert pool.idle_count() == 0
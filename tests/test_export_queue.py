@@ -0,0 +1,210 @@
+"""Tests for the export job queue and its persistence in the internal database."""
+
+import asyncio
+import pytest
+import pytest_asyncio
+from datasette.app import Datasette
+
+from datasette_libfec.export_queue import ExportJob, ExportQueue
+from datasette_libfec.internal_db import ExportJobRow, InternalDB
+from datasette_libfec.progress_events import ProgressBroadcaster
+
+
+class BlockingClient:
+    """Stands in for LibfecClient: each export runs until release() is called."""
+
+    def __init__(self):
+        self.started = []
+        self.gates = {}
+
+    async def export_with_progress(
+        self,
+        output_db,
+        filings,
+        cycle,
+        cover_only,
+        clobber,
+        export_state,
+        deadline_seconds=None,
+    ):
+        self.started.append(export_state.export_id)
+        export_state.running = True
+        export_state.phase = "exporting"
+        export_state.total = 10
+        export_state.progress_changed()
+        gate = self.gates.setdefault(export_state.export_id, asyncio.Event())
+        await gate.wait()
+        export_state.running = False
+        export_state.completed = 10
+        export_state.total_exported = 10
+        export_state.phase = "complete"
+
+    def release(self, export_id):
+        self.gates.setdefault(export_id, asyncio.Event()).set()
+
+
+async def wait_until(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def ds():
+    datasette = Datasette(memory=True)
+    await datasette.invoke_startup()
+    return datasette
+
+
+def submit(queue, ds, database):
+    return queue.submit(
+        ds,
+        database=database,
+        output_db=f"/tmp/{database}.db",
+        filings=["C00123456"],
+        cycle=2026,
+        cover_only=False,
+        clobber=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_parallel_across_databases(ds):
+    client = BlockingClient()
+    queue = ExportQueue(client, max_workers=2)
+    internal = InternalDB(ds.get_internal_database())
+
+    a = await submit(queue, ds, "a")
+    b = await submit(queue, ds, "b")
+    c = await submit(queue, ds, "c")
+
+    async def two_started():
+        return len(client.started) == 2
+
+    await wait_until(two_started)
+    assert client.started == [a.export_id, b.export_id]
+    queued = await internal.get_export_job(c.export_id)
+    assert queued.status == "queued"
+    assert queued.queue_position == 1
+
+    client.release(a.export_id)
+
+    async def c_started():
+        return c.export_id in client.started
+
+    await wait_until(c_started)
+    done = await internal.get_export_job(a.export_id)
+    assert done.status == "complete"
+    assert done.total_exported == 10
+    assert done.owner is None
+
+    client.release(b.export_id)
+    client.release(c.export_id)
+
+    async def all_done():
+        jobs = await internal.list_export_jobs("c")
+        return jobs[0].status == "complete"
+
+    await wait_until(all_done)
+
+
+@pytest.mark.asyncio
+async def test_one_job_at_a_time_per_database(ds):
+    client = BlockingClient()
+    queue = ExportQueue(client, max_workers=4)
+    internal = InternalDB(ds.get_internal_database())
+
+    first = await submit(queue, ds, "fec")
+    second = await submit(queue, ds, "fec")
+
+    async def first_started():
+        return client.started == [first.export_id]
+
+    await wait_until(first_started)
+    await asyncio.sleep(0.05)
+    assert client.started == [first.export_id]
+    assert (await internal.latest_export_job("fec")).export_id == second.export_id
+
+    client.release(first.export_id)
+
+    async def second_started():
+        return second.export_id in client.started
+
+    await wait_until(second_started)
+    client.release(second.export_id)
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_job(ds):
+    client = BlockingClient()
+    queue = ExportQueue(client, max_workers=1)
+    internal = InternalDB(ds.get_internal_database())
+
+    running = await submit(queue, ds, "a")
+    queued = await submit(queue, ds, "b")
+
+    assert await queue.cancel(ds, queued.export_id) == "canceled"
+    job = await internal.get_export_job(queued.export_id)
+    assert job.phase == "canceled"
+    assert job.queue_position is None
+
+    client.release(running.export_id)
+
+    async def finished():
+        return (await internal.get_export_job(running.export_id)).status == "complete"
+
+    await wait_until(finished)
+    assert client.started == [running.export_id]
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed(ds):
+    client = BlockingClient()
+    queue = ExportQueue(client, max_workers=1)
+    internal = InternalDB(ds.get_internal_database())
+
+    await internal.create_export_job("export-orphan", "fec", "/tmp/fec.db", {})
+    # A worker that claimed the job and then died: its lease is already expired
+    claimed = await internal.claim_export_job("dead-worker", -1, 3)
+    assert claimed.export_id == "export-orphan"
+
+    queue.start(ds)
+
+    async def resumed():
+        return client.started == ["export-orphan"]
+
+    await wait_until(resumed)
+    job = await internal.get_export_job("export-orphan")
+    assert job.owner == queue.owner
+    assert job.attempts == 2
+    client.release("export-orphan")
+
+
+@pytest.mark.asyncio
+async def test_job_ending_mid_phase_is_an_error_with_a_message(ds):
+    internal = InternalDB(ds.get_internal_database())
+    await internal.create_export_job("export-1", "fec", "/tmp/fec.db", {})
+    await internal.claim_export_job("worker", 60, 3)
+
+    await internal.finish_export_job("export-1", "worker", phase="exporting")
+
+    job = await internal.get_export_job("export-1")
+    assert job.status == "error"
+    assert job.error_message == "export ended in phase exporting"
+
+
+def test_changed_snapshot_only_rewrites_new_warnings():
+    row = ExportJobRow(export_id="export-1", database_name="fec", output_db="x.db")
+    job = ExportJob(row, ProgressBroadcaster())
+    job.warnings = ["a"]
+    assert job.changed_snapshot()["warnings"] == ["a"]
+    assert job.changed_snapshot() == {}
+
+    job.completed = 5
+    snapshot = job.changed_snapshot()
+    assert snapshot["completed"] == 5
+    assert "warnings" not in snapshot
+
+    job.warnings.append("b")
+    assert job.changed_snapshot()["warnings"] == ["a", "b"]
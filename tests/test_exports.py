@@ -0,0 +1,81 @@
+"""Tests for the export history API."""
+
+import sqlite3
+import pytest
+import pytest_asyncio
+from datasette.app import Datasette
+
+
+@pytest_asyncio.fixture
+async def datasette_with_exports(tmp_path):
+    db_path = tmp_path / "fec.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        CREATE TABLE libfec_exports (
+            export_id INTEGER PRIMARY KEY,
+            export_uuid TEXT,
+            created_at TEXT,
+            filings_count INTEGER,
+            cover_only INTEGER,
+            status TEXT,
+            error_message TEXT
+        );
+        CREATE TABLE libfec_export_inputs (
+            id INTEGER PRIMARY KEY,
+            export_id INTEGER,
+            input_type TEXT,
+            input_value TEXT,
+            cycle INTEGER,
+            office TEXT,
+            state TEXT,
+            district TEXT
+        );
+        CREATE TABLE libfec_export_input_filings (
+            input_id INTEGER,
+            filing_id TEXT
+        );
+        CREATE TABLE libfec_export_filings (
+            export_id INTEGER,
+            filing_id TEXT,
+            success INTEGER,
+            message TEXT
+        );
+
+        INSERT INTO libfec_exports VALUES
+            (1, 'uuid-1', '2026-01-01', 3, 1, 'complete', NULL);
+        INSERT INTO libfec_export_inputs VALUES
+            (10, 1, 'committee', 'C00123456', 2026, NULL, NULL, NULL),
+            (11, 1, 'contest', 'CA12', 2026, 'H', 'CA', '12'),
+            (12, 1, 'filing', '999', NULL, NULL, NULL, NULL);
+        INSERT INTO libfec_export_input_filings VALUES
+            (10, '1001'), (10, '1002'), (11, '1003');
+        INSERT INTO libfec_export_filings VALUES
+            (1, '1001', 1, NULL), (1, '1002', 1, NULL), (1, '1003', 0, 'bad');
+    """)
+    conn.close()
+    return Datasette(
+        [str(db_path)],
+        config={"permissions": {"datasette_libfec_access": True}},
+    )
+
+
+@pytest.mark.asyncio
+async def test_export_detail_inputs_with_filing_ids(datasette_with_exports):
+    response = await datasette_with_exports.client.get("/fec/-/api/libfec/exports/1")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["export"]["export_uuid"] == "uuid-1"
+    assert data["export"]["cover_only"] is True
+    assert [(i["id"], i["filing_ids"]) for i in data["inputs"]] == [
+        (10, ["1001", "1002"]),
+        (11, ["1003"]),
+        (12, []),
+    ]
+    assert data["inputs"][1]["district"] == "12"
+    assert [f["success"] for f in data["filings"]] == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_export_detail_not_found(datasette_with_exports):
+    response = await datasette_with_exports.client.get("/fec/-/api/libfec/exports/2")
+    assert response.status_code == 404
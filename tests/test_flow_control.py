@@ -0,0 +1,91 @@
+"""Tests for StatusPump, the RPC flow control used by exports and RSS syncs."""
+
+import asyncio
+import pytest
+
+from datasette_libfec.flow_control import StatusPump
+
+
+class FakeServer:
+    """Answers status requests; each answer can be held back with a gate."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_request(self, method, timeout=5.0):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await self.gate.wait()
+        self.in_flight -= 1
+        return self.statuses.pop(0) if self.statuses else {"phase": "exporting"}
+
+
+@pytest.mark.asyncio
+async def test_notifications_grant_credit_one_request_at_a_time():
+    server = FakeServer([])
+    completion = asyncio.get_running_loop().create_future()
+    pump = StatusPump(
+        server.send_request, "export/status", completion, idle_interval=60
+    )
+    pump.start()
+    await asyncio.sleep(0.01)
+    # The first grant is sent straight away
+    assert server.requests == 1
+
+    server.gate.clear()
+    for _ in range(20):
+        pump.notify()
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+    # Notifications while a request is outstanding collapse into one more grant
+    assert server.requests == 2
+    server.gate.set()
+    await asyncio.sleep(0.01)
+    assert server.requests == 3
+    assert server.max_in_flight == 1
+    await pump.stop()
+
+
+@pytest.mark.asyncio
+async def test_idle_interval_grants_without_notifications():
+    server = FakeServer([])
+    completion = asyncio.get_running_loop().create_future()
+    pump = StatusPump(
+        server.send_request, "export/status", completion, idle_interval=0.02
+    )
+    pump.start()
+    await asyncio.sleep(0.15)
+    assert server.requests >= 4
+    await pump.stop()
+
+
+@pytest.mark.asyncio
+async def test_terminal_status_completes_job():
+    server = FakeServer(
+        [
+            # Left over from the previous export on a reused process
+            {"export_id": "export-old", "phase": "complete"},
+            {"export_id": "export-new", "phase": "exporting"},
+            {"export_id": "export-new", "phase": "complete", "total_exported": 3},
+        ]
+    )
+    completion = asyncio.get_running_loop().create_future()
+    pump = StatusPump(
+        server.send_request,
+        "export/status",
+        completion,
+        idle_interval=0.01,
+        job_id_key="export_id",
+        job_id="export-new",
+    )
+    pump.start()
+    result = await asyncio.wait_for(completion, timeout=1)
+    assert result["total_exported"] == 3
+    assert server.requests == 3
+    await pump.stop()
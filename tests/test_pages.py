@@ -0,0 +1,135 @@
+"""Tests for the data-fetching helpers behind the contest/candidate/committee pages."""
+
+import asyncio
+import sqlite3
+import pytest
+import pytest_asyncio
+from datasette.app import Datasette
+
+
+@pytest_asyncio.fixture
+async def fec_db(tmp_path):
+    db_path = tmp_path / "fec.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        CREATE TABLE libfec_candidates (
+            candidate_id TEXT,
+            name TEXT,
+            state TEXT,
+            office TEXT,
+            district TEXT,
+            principal_campaign_committee TEXT,
+            cycle INTEGER
+        );
+        CREATE TABLE libfec_filings (
+            filing_id TEXT PRIMARY KEY,
+            filer_id TEXT,
+            filer_name TEXT,
+            cover_record_form TEXT
+        );
+        CREATE TABLE libfec_F3 (
+            filing_id TEXT,
+            coverage_through_date TEXT,
+            col_a_total_receipts REAL,
+            col_a_total_disbursements REAL,
+            col_a_cash_on_hand_close_of_period REAL
+        );
+
+        INSERT INTO libfec_candidates VALUES
+            ('H001', 'Alpha', 'CA', 'H', '12', 'C001', 2026),
+            ('H002', 'Bravo', 'CA', 'H', '12', 'C002', 2026),
+            ('H003', 'Charlie', 'CA', 'H', '12', NULL, 2026),
+            ('H004', 'Delta', 'CA', 'H', '13', 'C004', 2026);
+
+        INSERT INTO libfec_filings VALUES
+            ('1', 'C001', 'Alpha for Congress', 'F3'),
+            ('2', 'C001', 'Alpha for Congress', 'F3'),
+            ('3', 'C004', 'Delta for Congress', 'F3');
+
+        INSERT INTO libfec_F3 VALUES
+            ('1', '2025-06-30', 100, 50, 50),
+            ('2', '2025-09-30', 300, 100, 250),
+            ('3', '2025-09-30', 999, 999, 999);
+    """)
+    conn.close()
+    ds = Datasette(
+        [str(db_path)], config={"permissions": {"datasette_libfec_access": True}}
+    )
+    return ds.get_database("fec")
+
+
+@pytest.mark.asyncio
+async def test_contest_candidates_latest_f3(fec_db):
+    from datasette_libfec.routes_pages import fetch_contest_candidates
+
+    candidates = await fetch_contest_candidates(fec_db, "CA", "H", "12", 2026)
+    assert [c.candidate_id for c in candidates] == ["H001", "H002", "H003"]
+
+    alpha, bravo, charlie = candidates
+    assert alpha.f3_coverage_through_date == "2025-09-30"
+    assert alpha.f3_total_receipts == 300
+    assert alpha.f3_cash_on_hand_end == 250
+    assert bravo.f3_coverage_through_date is None
+    assert charlie.f3_total_receipts is None
+
+
+@pytest.mark.asyncio
+async def test_contest_candidates_without_f3_table(fec_db):
+    from datasette_libfec.routes_pages import fetch_contest_candidates
+
+    await fec_db.execute_write("DROP TABLE libfec_F3")
+    candidates = await fetch_contest_candidates(fec_db, "CA", "H", None, 2026)
+    assert [c.candidate_id for c in candidates] == ["H001", "H002", "H003", "H004"]
+    assert all(c.f3_total_receipts is None for c in candidates)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "path", ["/fec/-/libfec/committee/C001", "/fec/-/libfec/candidate/H001"]
+)
+async def test_page_queries_run_concurrently(fec_db, monkeypatch, path):
+    ds = fec_db.ds
+    await fec_db.execute_write_script("""
+        CREATE TABLE libfec_committees (
+            committee_id TEXT, name TEXT, candidate_id TEXT, cycle INTEGER
+        );
+        INSERT INTO libfec_committees VALUES ('C001', 'Alpha for Congress', 'H001', 2026);
+    """)
+    await ds.invoke_startup()
+
+    rendered = {}
+
+    async def render_template(template, context=None, request=None, view_name=None):
+        rendered.update(context["page_data"])
+        return "page"
+
+    monkeypatch.setattr(ds, "render_template", render_template)
+
+    # Hold every query a moment, counting how many are in flight at once
+    in_flight = 0
+    most_in_flight = 0
+    execute = fec_db.execute
+
+    async def slow_execute(sql, params=None):
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        try:
+            await asyncio.sleep(0.05)
+            return await execute(sql, params)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(fec_db, "execute", slow_execute)
+
+    response = await ds.client.get(f"{path}?cycle=2026")
+    assert response.status_code == 200
+    assert most_in_flight == 3
+    timings = dict(
+        entry.split(";dur=") for entry in response.headers["server-timing"].split(", ")
+    )
+    assert sorted(timings) == ["candidate", "committee", "filings"]
+    assert all(float(ms) >= 50 for ms in timings.values())
+    assert rendered["committee"]["committee_id"] == "C001"
+    assert rendered["candidate"]["candidate_id"] == "H001"
+    assert [f["filing_id"] for f in rendered["filings"]] == ["2", "1"]
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+
+from datasette_libfec.progress_aggregator import ProgressAggregator, merge_warnings
+
+
+def progress(completed, warnings=(), method="export/progress"):
+    return {
+        "method": method,
+        "params": {"completed": completed, "warnings": list(warnings)},
+    }
+
+
+def test_merge_warnings():
+    warnings = []
+    # Cumulative lists: only the new tail is added
+    assert merge_warnings(warnings, ["a"]) == 1
+    assert merge_warnings(warnings, ["a", "b", "c"]) == 2
+    assert merge_warnings(warnings, ["a", "b", "c"]) == 0
+    assert merge_warnings(warnings, []) == 0
+    # A list that doesn't continue ours is new warnings
+    assert merge_warnings(warnings, ["d"]) == 1
+    assert warnings == ["a", "b", "c", "d"]
+
+
+@pytest.mark.asyncio
+async def test_burst_is_applied_once_with_latest_values():
+    applied = []
+    aggregator = ProgressAggregator("export/progress", applied.append)
+
+    warnings = []
+    for i in range(1000):
+        if i % 100 == 0:
+            warnings.append(f"warning {i}")
+        aggregator(progress(i, warnings))
+    aggregator({"method": "export/other", "params": {"completed": -1}})
+    assert applied == []
+
+    await asyncio.sleep(0)
+    assert [params["completed"] for params in applied] == [999]
+    assert aggregator.received == 1000
+    assert aggregator.warnings == [f"warning {i}" for i in range(0, 1000, 100)]
+
+
+@pytest.mark.asyncio
+async def test_applies_are_throttled_and_flush_is_immediate():
+    applied = []
+    aggregator = ProgressAggregator("export/progress", applied.append, interval=0.05)
+
+    aggregator(progress(1))
+    await asyncio.sleep(0)
+    aggregator(progress(2))
+    aggregator(progress(3))
+    await asyncio.sleep(0.01)
+    # Within the interval of the last apply: still pending
+    assert [p["completed"] for p in applied] == [1]
+
+    await asyncio.sleep(0.06)
+    assert [p["completed"] for p in applied] == [1, 3]
+
+    aggregator(progress(4))
+    aggregator.flush()
+    assert [p["completed"] for p in applied] == [1, 3, 4]
+    await asyncio.sleep(0.06)
+    assert aggregator.applied == 3
@@ -0,0 +1,136 @@
+"""Tests for progress streaming over Server-Sent Events."""
+
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from datasette.app import Datasette
+
+from datasette_libfec.progress_events import ProgressBroadcaster, changed_fields
+from datasette_libfec.state import export_queue
+from test_export_queue import BlockingClient
+
+
+def parse_events(body: str) -> list[dict]:
+    return [
+        json.loads(line[len("data: ") :])
+        for line in body.splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+@pytest_asyncio.fixture
+async def ds(tmp_path):
+    (tmp_path / "fec.db").touch()
+    datasette = Datasette(
+        [str(tmp_path / "fec.db")],
+        config={
+            "permissions": {
+                "datasette_libfec_access": True,
+                "datasette_libfec_write": True,
+            }
+        },
+    )
+    await datasette.invoke_startup()
+    return datasette
+
+
+def test_changed_fields():
+    assert changed_fields(None, {"phase": "queued"}) == {"phase": "queued"}
+    assert changed_fields(
+        {"phase": "exporting", "completed": 1, "total": 5},
+        {"phase": "complete", "total_exported": 5},
+    ) == {"phase": "complete", "total_exported": 5, "completed": None, "total": None}
+
+
+@pytest.mark.asyncio
+async def test_follow_coalesces_bursts():
+    broadcaster = ProgressBroadcaster()
+
+    async def load():
+        return {"completed": 0}
+
+    updates = broadcaster.follow("t", load, min_interval=0.1)
+    assert await updates.__anext__() == {"completed": 0}
+    # While the stream is holding off, a burst of notifications arrives
+    for i in range(1, 101):
+        broadcaster.publish("t", {"completed": i})
+    assert await updates.__anext__() == {"completed": 100}
+    await updates.aclose()
+
+
+@pytest.mark.asyncio
+async def test_follow_yields_none_when_idle():
+    broadcaster = ProgressBroadcaster()
+    loads = 0
+
+    async def load():
+        nonlocal loads
+        loads += 1
+        return {"phase": "queued"}
+
+    updates = broadcaster.follow("t", load, min_interval=0, refresh_seconds=0.05)
+    assert await updates.__anext__() == {"phase": "queued"}
+    # Nothing changed on reload, so the caller is told to send a keepalive
+    assert await updates.__anext__() is None
+    assert loads == 2
+    await updates.aclose()
+
+
+@pytest.mark.asyncio
+async def test_export_events_streams_until_complete(ds, monkeypatch):
+    client = BlockingClient()
+    monkeypatch.setattr(export_queue, "client", client)
+    response = await ds.client.post(
+        "/fec/-/api/libfec/export/start",
+        json={"filings": ["C00123456"], "cycle": 2026},
+    )
+    export_id = response.json()["export_id"]
+
+    stream = asyncio.create_task(
+        ds.client.get(f"/fec/-/api/libfec/export/events?export_id={export_id}")
+    )
+    await asyncio.sleep(0.3)
+    client.release(export_id)
+    response = await asyncio.wait_for(stream, timeout=5)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert events[0]["export_id"] == export_id
+    assert events[0]["phase"] in ("queued", "starting", "exporting")
+    # Later events only carry what changed
+    assert "export_id" not in events[-1]
+    assert events[-1]["phase"] == "complete"
+    assert events[-1]["total_exported"] == 10
+
+
+@pytest.mark.asyncio
+async def test_export_events_without_job(ds):
+    response = await ds.client.get("/fec/-/api/libfec/export/events")
+    assert parse_events(response.text) == [
+        {"status": "success", "message": "Export status", "phase": "idle"}
+    ]
+    response = await ds.client.get("/fec/-/api/libfec/export/events?export_id=nope")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_export_status_and_cancel_by_path(ds, monkeypatch):
+    client = BlockingClient()
+    monkeypatch.setattr(export_queue, "client", client)
+    response = await ds.client.post(
+        "/fec/-/api/libfec/export/start",
+        json={"filings": ["C00123456"], "cycle": 2026},
+    )
+    export_id = response.json()["export_id"]
+
+    response = await ds.client.get(f"/fec/-/api/libfec/export/{export_id}/status")
+    assert response.json()["export_id"] == export_id
+    response = await ds.client.get("/fec/-/api/libfec/export/nope/status")
+    assert response.status_code == 404
+
+    response = await ds.client.post(f"/fec/-/api/libfec/export/{export_id}/cancel")
+    assert response.json()["phase"] == "canceled"
+    client.release(export_id)
+    response = await ds.client.post("/fec/-/api/libfec/export/nope/cancel")
+    assert response.status_code == 404
@@ -0,0 +1,201 @@
+"""Tests for the export, RSS and search RPC paths, against fake_libfec.py."""
+
+import asyncio
+import sqlite3
+import pytest
+
+from datasette_libfec.libfec_client import ExportState, LibfecClient, RssWatcherState
+from datasette_libfec.libfec_rpc_client import LibfecRpcClient
+from datasette_libfec.libfec_search_rpc_client import LibfecSearchRpcClient
+from fake_libfec import install
+
+
+@pytest.fixture
+def libfec(tmp_path, monkeypatch):
+    """A LibfecClient running the fake; set FAKE_LIBFEC_* with monkeypatch."""
+    monkeypatch.setenv("DATASETTE_LIBFEC_BIN_PATH", str(install(tmp_path)))
+    return LibfecClient()
+
+
+def count(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+async def export(libfec, output_db, filings=("C00123456",)):
+    state = ExportState()
+    await libfec.export_with_progress(
+        output_db=output_db,
+        filings=list(filings),
+        cycle=2026,
+        cover_only=False,
+        clobber=False,
+        export_state=state,
+    )
+    await libfec.export_pool.close()
+    return state
+
+
+@pytest.mark.asyncio
+async def test_export(libfec, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_LIBFEC_ITEMS", "250")
+    monkeypatch.setenv("FAKE_LIBFEC_WARN_EVERY", "50")
+    output_db = str(tmp_path / "fec.db")
+
+    state = await export(libfec, output_db)
+    assert state.phase == "complete"
+    assert (state.completed, state.total, state.total_exported) == (250, 250, 250)
+    assert len(state.warnings) == 5
+    assert count(output_db, "libfec_filings") == 250
+    assert count(output_db, "libfec_committees") == 1
+
+
+@pytest.mark.asyncio
+async def test_export_crash_reports_stderr(libfec, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_LIBFEC_FAIL", "crash:5")
+    state = await export(libfec, str(tmp_path / "fec.db"))
+    assert state.phase == "error"
+    assert "fatal: fake crash after 5 filings" in state.error_message
+
+
+@pytest.mark.asyncio
+async def test_export_error_and_reject(libfec, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_LIBFEC_FAIL", "error:5")
+    state = await export(libfec, str(tmp_path / "fec.db"))
+    assert (state.phase, state.error_message) == ("error", "fake failure")
+
+    monkeypatch.setenv("FAKE_LIBFEC_FAIL", "reject")
+    state = await export(libfec, str(tmp_path / "fec.db"))
+    assert (state.phase, state.error_message) == ("error", "Fake rejected start")
+
+
+@pytest.mark.asyncio
+async def test_stalled_export_fails(libfec, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_LIBFEC_FAIL", "hang:5")
+    libfec.stall_seconds = 0.3
+    state = await export(libfec, str(tmp_path / "fec.db"))
+    assert state.phase == "error"
+    assert state.error_message == "Export stalled: no progress for 0.3 seconds"
+    assert state.completed == 5
+
+
+@pytest.mark.asyncio
+async def test_rss_sync(libfec, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_LIBFEC_ITEMS", "40")
+    output_db = str(tmp_path / "fec.db")
+    state = RssWatcherState()
+    await libfec.rss_watch_with_progress(output_db, "CA", True, state)
+
+    assert state.phase == "complete"
+    assert (state.exported_count, state.total_count) == (40, 40)
+    with sqlite3.connect(output_db) as conn:
+        assert conn.execute(
+            "SELECT state_filter, status, exported_count FROM libfec_rss_syncs"
+        ).fetchall() == [("CA", "complete", 40)]
+    assert count(output_db, "libfec_rss_filings") == 40
+
+
+@pytest.mark.asyncio
+async def test_rss_sync_ignores_the_previous_syncs_status():
+    client = LibfecRpcClient("libfec")
+    statuses = [
+        # Left over from the previous sync on a reused process
+        {"sync_id": 1, "phase": "complete", "exported_count": 99},
+        {"sync_id": 2, "phase": "complete", "exported_count": 3},
+    ]
+    progress = []
+
+    async def send_request(method, params=None, timeout=None):
+        if method == "sync/start":
+            # The previous sync's last notification is still in the pipe
+            client.handle_notification(
+                "sync/progress",
+                {"phase": "complete", "exported_count": 99},
+                {"method": "sync/progress"},
+            )
+            return {"sync_id": 2, "phase": "fetching"}
+        return statuses.pop(0)
+
+    client.send_request = send_request
+    result = await asyncio.wait_for(
+        client.sync_start(None, None, True, "fec.db", progress.append), timeout=5
+    )
+    assert result["exported_count"] == 3
+    assert progress == []
+
+
+@pytest.mark.asyncio
+async def test_search(libfec, monkeypatch):
+    monkeypatch.setenv("FAKE_LIBFEC_RESULTS", "3")
+    client = LibfecSearchRpcClient(str(libfec.libfec_path), cycle=2024)
+    await client.start_process()
+    try:
+        result = await client.search_query("smith", limit=10)
+        assert result["cycle"] == 2024
+        assert [c["name"] for c in result["candidates"]] == [
+            f"SMITH CANDIDATE {i}" for i in range(3)
+        ]
+        committee = await client.get_committee("C90000001", 2024)
+        assert committee["committee_id"] == "C90000001"
+    finally:
+        await client.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_back_to_back_syncs_on_one_process(libfec, tmp_path):
+    output_db = str(tmp_path / "fec.db")
+    rss_process = libfec.rss_process
+    first, second = RssWatcherState(), RssWatcherState()
+    try:
+        await libfec.rss_watch_with_progress(output_db, "CA", True, first)
+        client = rss_process.client
+        await libfec.rss_watch_with_progress(output_db, "TX", True, second)
+        assert rss_process.client is client
+        assert (rss_process.spawned, rss_process.reused) == (1, 1)
+    finally:
+        await rss_process.close()
+
+    # Each sync reports its own outcome, not the other's
+    for state in (first, second):
+        assert state.phase == "complete"
+        assert (state.exported_count, state.total_count) == (10, 10)
+    with sqlite3.connect(output_db) as conn:
+        assert conn.execute(
+            "SELECT state_filter, status, exported_count FROM libfec_rss_syncs "
+            "ORDER BY sync_id"
+        ).fetchall() == [("CA", "complete", 10), ("TX", "complete", 10)]
+
+
+@pytest.mark.asyncio
+async def test_rss_process_stays_resident_between_syncs(libfec, tmp_path, monkeypatch):
+    output_db = str(tmp_path / "fec.db")
+    rss_process = libfec.rss_process
+    try:
+        for _ in range(3):
+            state = RssWatcherState()
+            await libfec.rss_watch_with_progress(output_db, None, True, state)
+            assert state.phase == "complete"
+        assert (rss_process.spawned, rss_process.reused) == (1, 2)
+        assert count(output_db, "libfec_rss_syncs") == 3
+
+        # A process that died while idle is replaced
+        rss_process.client.process.kill()
+        await libfec.rss_watch_with_progress(output_db, None, True, RssWatcherState())
+        assert rss_process.spawned == 2
+
+        # A failed sync doesn't leave its process resident
+        await rss_process.close()
+        monkeypatch.setenv("FAKE_LIBFEC_FAIL", "error:5")
+        state = RssWatcherState()
+        await libfec.rss_watch_with_progress(output_db, None, True, state)
+        assert state.phase == "error"
+        assert rss_process.client is None
+
+        # Nor does one that has reached its age limit
+        monkeypatch.delenv("FAKE_LIBFEC_FAIL")
+        rss_process.max_age_seconds = 0
+        await libfec.rss_watch_with_progress(output_db, None, True, RssWatcherState())
+        assert rss_process.client is None
+        assert rss_process.spawned == 4
+    finally:
+        await rss_process.close()
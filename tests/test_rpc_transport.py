@@ -0,0 +1,165 @@
+"""Tests for the shared JSON-RPC transport, against a fake server process."""
+
+import asyncio
+import sys
+import pytest
+import pytest_asyncio
+
+from datasette_libfec.rpc_transport import STDERR_LINES, RpcError, RpcProcess
+
+FAKE_SERVER = """
+import json, sys, time
+
+def send(msg):
+    sys.stdout.write(json.dumps(msg) + "\\n")
+    sys.stdout.flush()
+
+def answer(msg):
+    method, params = msg["method"], msg.get("params") or {}
+    if method == "echo":
+        return {"jsonrpc": "2.0", "id": msg["id"], "result": params}
+    if method == "big":
+        return {"jsonrpc": "2.0", "id": msg["id"], "result": "x" * params["size"]}
+    if method == "burst":
+        for i in range(params["count"]):
+            send({"jsonrpc": "2.0", "method": "tick", "params": {"i": i}})
+        return {"jsonrpc": "2.0", "id": msg["id"], "result": params["count"]}
+    if method == "trickle":
+        for i in range(params["count"]):
+            time.sleep(params["interval"])
+            send({"jsonrpc": "2.0", "method": "tick", "params": {"i": i}})
+        return {"jsonrpc": "2.0", "id": msg["id"], "result": params["count"]}
+    if method == "noisy":
+        # Far more than a pipe buffer holds
+        for i in range(params["count"]):
+            sys.stderr.write(f"warning {i} " + "." * 100 + "\\n")
+        sys.stderr.flush()
+        return {"jsonrpc": "2.0", "id": msg["id"], "result": params["count"]}
+    if method == "die":
+        sys.stderr.write("fatal: database is locked\\n")
+        sys.stderr.flush()
+        sys.exit(1)
+    return {"jsonrpc": "2.0", "id": msg["id"],
+            "error": {"code": -32601, "message": "Method not found"}}
+
+send({"jsonrpc": "2.0", "method": "ready", "params": {}})
+held = []
+for line in sys.stdin:
+    msg = json.loads(line)
+    if isinstance(msg, list):
+        send([answer(m) for m in msg])
+    elif msg["method"] == "hold":
+        held.append(msg)
+    elif msg["method"] == "release":
+        # Answer held requests in reverse order
+        for m in reversed(held):
+            send({"jsonrpc": "2.0", "id": m["id"], "result": m["params"]})
+        held = []
+        send(answer(dict(msg, method="echo")))
+    else:
+        send(answer(msg))
+"""
+
+
+class FakeClient(RpcProcess):
+    name = "fake"
+
+    def __init__(self):
+        super().__init__(sys.executable)
+        self.notifications = []
+
+    def command(self):
+        return [sys.executable, "-c", FAKE_SERVER]
+
+    def handle_notification(self, method, params, msg):
+        self.notifications.append((method, params))
+
+
+@pytest_asyncio.fixture
+async def client():
+    client = FakeClient()
+    await client.start_process()
+    yield client
+    await client.terminate()
+
+
+@pytest.mark.asyncio
+async def test_pipelined_responses_matched_by_id(client):
+    held = [
+        asyncio.create_task(client.send_request("hold", {"n": n})) for n in range(3)
+    ]
+    await asyncio.sleep(0.05)
+    assert len(client.pending_requests) == 3
+
+    assert await client.send_request("release", {}) == {}
+    assert await asyncio.gather(*held) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert client.pending_requests == {}
+
+
+@pytest.mark.asyncio
+async def test_errors_and_batches(client):
+    with pytest.raises(RpcError) as e:
+        await client.send_request("missing")
+    assert e.value.code == -32601
+
+    for as_array in (False, True):
+        results = await client.send_batch(
+            [("echo", {"a": 1}), ("missing", None), ("echo", {"b": 2})],
+            as_array=as_array,
+        )
+        assert results[0] == {"a": 1}
+        assert isinstance(results[1], RpcError)
+        assert results[2] == {"b": 2}
+
+
+@pytest.mark.asyncio
+async def test_long_lines_and_notification_bursts(client):
+    # Well past asyncio's default 64 KiB line limit
+    assert len(await client.send_request("big", {"size": 2_000_000})) == 2_000_000
+
+    assert await client.send_request("burst", {"count": 5000}) == 5000
+    ticks = [params["i"] for method, params in client.notifications if method == "tick"]
+    assert ticks == list(range(5000))
+
+
+@pytest.mark.asyncio
+async def test_process_exit_fails_pending_requests(client):
+    with pytest.raises(RuntimeError, match="unexpectedly: fatal: database is locked"):
+        await client.send_request("die")
+    await asyncio.sleep(0.01)
+    assert not client.is_alive()
+
+
+@pytest.mark.asyncio
+async def test_timeout(client):
+    with pytest.raises(TimeoutError):
+        await client.send_request("hold", {}, timeout=0.05)
+    assert client.pending_requests == {}
+
+
+@pytest.mark.asyncio
+async def test_stderr_is_drained_into_ring_buffer(client):
+    assert await client.send_request("noisy", {"count": 5000}) == 5000
+    await asyncio.sleep(0.05)
+    assert len(client.stderr_lines) == STDERR_LINES
+    assert client.stderr_tail(1).startswith("warning 4999 ")
+
+
+@pytest.mark.asyncio
+async def test_wait_for_progress(client):
+    # Takes longer than the stall window, but keeps making progress
+    trickle = {"count": 10, "interval": 0.03}
+    future = asyncio.ensure_future(client.send_request("trickle", trickle))
+    assert await client.wait_for_progress(future, "Export", stall_seconds=0.2) == 10
+
+    future = asyncio.ensure_future(client.send_request("trickle", trickle))
+    with pytest.raises(TimeoutError, match="did not finish within 0.1 seconds"):
+        await client.wait_for_progress(
+            future, "Export", stall_seconds=0.2, deadline_seconds=0.1
+        )
+    await future
+
+    future = asyncio.ensure_future(client.send_request("hold", {}))
+    with pytest.raises(TimeoutError, match="Export stalled: no progress for 0.1"):
+        await client.wait_for_progress(future, "Export", stall_seconds=0.1)
+    future.cancel()
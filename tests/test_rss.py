@@ -0,0 +1,515 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from datasette.app import Datasette
+import pytest
+
+from datasette_libfec import internal_db as internal_db_module
+from datasette_libfec.internal_db import InternalDB, RssConfig, RssSubscription
+from datasette_libfec.rss_feed import FeedCheck, item_pub_dates
+from datasette_libfec.rss_handler import (
+    feed_has_news,
+    feed_unchanged,
+    next_interval,
+    parse_duration,
+    parse_feed_time,
+    rss_sync_handler,
+    scheduled_interval,
+    sync_since,
+)
+from datasette_libfec.state import libfec_client
+from fake_libfec import install
+
+
+@pytest.fixture
+def feed_url():
+    """A stand-in RSS feed that answers conditional requests, tracking hits."""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(dict(self.headers))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Last-Modified", "Mon, 02 Mar 2026 11:45:00 GMT")
+            self.send_header("Content-Type", "application/rss+xml")
+            self.end_headers()
+            self.wfile.write(b"<rss></rss>")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/rss", requests
+    server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_rss_status_shows_stderr_of_failed_sync():
+    ds = Datasette(
+        memory=True, config={"permissions": {"datasette_libfec_access": True}}
+    )
+    await ds.invoke_startup()
+    internal = InternalDB(ds.get_internal_database())
+    await internal.update_rss_progress(
+        phase="error",
+        error_message="libfec process terminated before sync completed",
+        stderr="fatal: database is locked",
+    )
+
+    data = (await ds.client.get("/_memory/-/api/libfec/rss/status")).json()
+    assert data["phase"] == "error"
+    assert data["stderr"] == "fatal: database is locked"
+
+
+FILTERS = {"since_duration": "1 day", "state_filter": None, "cover_only": True}
+NOW = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)
+
+
+def test_sync_since_starts_from_high_water_mark():
+    watermark = {
+        "filters": FILTERS,
+        "last_pub_date": "Mon, 02 Mar 2026 11:30:00 GMT",
+        "feed_last_modified": "Mon, 02 Mar 2026 11:45:00 GMT",
+    }
+    assert sync_since("1 day", watermark, FILTERS, NOW) == "2026-03-02T11:20:00Z"
+    # No filings seen yet: the feed's last-modified time
+    watermark["last_pub_date"] = None
+    assert sync_since("1 day", watermark, FILTERS, NOW) == "2026-03-02T11:35:00Z"
+
+
+def test_sync_since_falls_back_to_since_duration():
+    mark = {"filters": FILTERS, "last_pub_date": "2026-03-02T11:30:00"}
+    assert sync_since("1 day", None, FILTERS, NOW) == "1 day"
+    # Filters changed since the mark was recorded
+    changed = {**FILTERS, "state_filter": "CA"}
+    assert sync_since("1 day", mark, changed, NOW) == "1 day"
+    # Never further back than since_duration
+    old = {**mark, "last_pub_date": "2026-02-20T00:00:00Z"}
+    assert sync_since("1 day", old, FILTERS, NOW) == "1 day"
+    # Unparseable mark or duration
+    assert sync_since("1 day", {**mark, "last_pub_date": "?"}, FILTERS, NOW) == "1 day"
+    assert sync_since("yesterday", mark, FILTERS, NOW) == "yesterday"
+
+
+def test_parse_duration_and_feed_time():
+    assert parse_duration("1 day") == timedelta(days=1)
+    assert parse_duration("2 hours ago") == timedelta(hours=2)
+    assert parse_duration("soon") is None
+    assert parse_feed_time("Mon, 02 Mar 2026 11:30:00 -0500") == datetime(
+        2026, 3, 2, 16, 30, tzinfo=timezone.utc
+    )
+    assert parse_feed_time("2026-03-02T11:30:00Z") == datetime(
+        2026, 3, 2, 11, 30, tzinfo=timezone.utc
+    )
+
+
+async def rss_datasette(tmp_path, monkeypatch, feed_url=None, extra=()):
+    db_path = tmp_path / "fec.db"
+    paths = [db_path] + [tmp_path / f"{name}.db" for name in extra]
+    for path in paths:
+        sqlite3.connect(path).close()
+    ds = Datasette(
+        [str(path) for path in paths],
+        config={
+            "permissions": {
+                "datasette_libfec_access": True,
+                "datasette_libfec_write": True,
+            }
+        },
+    )
+    await ds.invoke_startup()
+    internal = InternalDB(ds.get_internal_database())
+    await internal.update_rss_config(database_name="fec")
+    monkeypatch.setattr(
+        libfec_client.rss_process, "libfec_path", str(install(tmp_path))
+    )
+    monkeypatch.setattr(libfec_client, "rss_feed_url", feed_url)
+    return ds, internal, db_path
+
+
+@pytest.mark.asyncio
+async def test_rss_sync_resumes_from_high_water_mark(tmp_path, monkeypatch):
+    ds, internal, db_path = await rss_datasette(tmp_path, monkeypatch)
+
+    try:
+        await rss_sync_handler(ds, {})
+        await rss_sync_handler(ds, {})
+    finally:
+        await libfec_client.rss_process.close()
+
+    with sqlite3.connect(db_path) as conn:
+        first, second = [
+            row[0]
+            for row in conn.execute(
+                "SELECT since_filter FROM libfec_rss_syncs ORDER BY sync_id"
+            )
+        ]
+    assert first == "1 day"
+    assert re.match(r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ$", second)
+    watermark = await internal.get_rss_watermark("default")
+    assert watermark["last_pub_date"] is not None
+
+
+@pytest.mark.asyncio
+async def test_rss_sync_skipped_when_feed_not_modified(tmp_path, monkeypatch, feed_url):
+    url, requests = feed_url
+    ds, internal, db_path = await rss_datasette(tmp_path, monkeypatch, url)
+    rss_process = libfec_client.rss_process
+    started = rss_process.spawned + rss_process.reused
+    try:
+        for _ in range(3):
+            await rss_sync_handler(ds, {})
+        # Only the first run used libfec
+        assert rss_process.spawned + rss_process.reused == started + 1
+
+        # Changed filters make the next run sync regardless
+        await internal.update_rss_config(state_filter="CA")
+        await rss_sync_handler(ds, {})
+        assert rss_process.spawned + rss_process.reused == started + 2
+    finally:
+        await rss_process.close()
+
+    assert "If-None-Match" not in requests[0]
+    assert requests[1]["If-None-Match"] == '"v1"'
+    assert requests[1]["If-Modified-Since"] == "Mon, 02 Mar 2026 11:45:00 GMT"
+    assert "If-None-Match" not in requests[3]
+    with sqlite3.connect(db_path) as conn:
+        assert [
+            row[0]
+            for row in conn.execute(
+                "SELECT status FROM libfec_rss_syncs ORDER BY sync_id"
+            )
+        ] == ["complete", "not-modified", "not-modified", "complete"]
+    progress = await internal.get_rss_progress()
+    assert progress["phase"] == "idle"
+
+
+def test_adaptive_interval():
+    config = RssConfig(
+        adaptive_interval=True, min_interval_seconds=15, max_interval_seconds=100
+    )
+    assert next_interval(15, False, config) == 30
+    assert next_interval(60, False, config) == 100
+    assert next_interval(100, True, config) == 15
+    assert scheduled_interval(config) == 15
+    assert scheduled_interval(config, 500) == 100
+    assert scheduled_interval(RssConfig(interval_seconds=60), 15) == 60
+
+
+@pytest.mark.asyncio
+async def test_adaptive_interval_follows_feed_activity(tmp_path, monkeypatch, feed_url):
+    url, _ = feed_url
+    ds, internal, db_path = await rss_datasette(tmp_path, monkeypatch, url)
+    await internal.update_rss_config(adaptive_interval=True, max_interval_seconds=600)
+    scheduler = ds._cron_scheduler
+
+    async def tick():
+        # As the scheduler runs it, so the interval changes once it returns
+        await asyncio.create_task(rss_sync_handler(ds, {}))
+        await asyncio.sleep(0.1)
+        task = await scheduler.internal_db.get_task("libfec:rss-sync")
+        status = (await ds.client.get("/fec/-/api/libfec/rss/status")).json()
+        assert status["adaptive_interval"]
+        return json.loads(task.schedule_config)["seconds"], status["interval_seconds"]
+
+    try:
+        # New filings: poll at the minimum interval
+        assert await tick() == (15, 15)
+        # Feed unchanged: back off
+        assert await tick() == (30, 30)
+        assert await tick() == (60, 60)
+    finally:
+        await libfec_client.rss_process.close()
+
+
+@pytest.mark.asyncio
+async def test_adaptive_interval_survives_config_updates(
+    tmp_path, monkeypatch, feed_url
+):
+    url, _ = feed_url
+    ds, internal, db_path = await rss_datasette(tmp_path, monkeypatch, url)
+    await internal.update_rss_config(adaptive_interval=True, max_interval_seconds=60)
+    scheduler = ds._cron_scheduler
+
+    async def noop(name):
+        pass
+
+    # Keep the update from starting a sync of its own
+    monkeypatch.setattr(scheduler, "trigger_task", noop)
+
+    async def scheduled():
+        task = await scheduler.internal_db.get_task("libfec:rss-sync")
+        status = (await ds.client.get("/fec/-/api/libfec/rss/status")).json()
+        return json.loads(task.schedule_config)["seconds"], status["interval_seconds"]
+
+    async def tick():
+        await asyncio.create_task(rss_sync_handler(ds, {}))
+        await asyncio.sleep(0.1)
+
+    try:
+        for _ in range(3):
+            await tick()
+        assert await scheduled() == (60, 60)
+
+        # An unrelated setting registers the task again, at the same interval
+        response = await ds.client.post(
+            "/fec/-/api/libfec/rss/config/update",
+            json={"enabled": True, "interval_seconds": 120},
+        )
+        assert response.status_code == 200
+        assert await scheduled() == (60, 60)
+
+        # A task scheduled at some other interval is put right on the next
+        # run, even though the adaptive interval itself doesn't change
+        await scheduler.update_task("libfec:rss-sync", schedule={"interval": 15})
+        await tick()
+        assert await scheduled() == (60, 60)
+    finally:
+        await libfec_client.rss_process.close()
+
+
+@pytest.mark.asyncio
+async def test_one_feed_request_serves_every_subscription(
+    tmp_path, monkeypatch, feed_url
+):
+    url, requests = feed_url
+    ds, internal, db_path = await rss_datasette(
+        tmp_path, monkeypatch, url, extra=("ca",)
+    )
+    await internal.save_rss_subscription(
+        RssSubscription(name="ca", database_name="ca", state_filter="CA")
+    )
+    try:
+        await rss_sync_handler(ds, {})
+        await rss_sync_handler(ds, {})
+    finally:
+        await libfec_client.rss_process.close()
+
+    assert len(requests) == 2
+    assert requests[1]["If-None-Match"] == '"v1"'
+    for path, state in ((db_path, None), (tmp_path / "ca.db", "CA")):
+        with sqlite3.connect(path) as conn:
+            assert conn.execute(
+                "SELECT status, state_filter FROM libfec_rss_syncs ORDER BY sync_id"
+            ).fetchall() == [("complete", state), ("not-modified", state)]
+
+
+@pytest.mark.asyncio
+async def test_each_subscription_keeps_its_own_sync_status(tmp_path, monkeypatch):
+    ds, internal, _ = await rss_datasette(tmp_path, monkeypatch, extra=("ca",))
+    await internal.save_rss_subscription(
+        RssSubscription(name="ca", database_name="ca", state_filter="CA")
+    )
+    # libfec can't open the subscription's database, so its sync fails
+    (tmp_path / "ca.db").unlink()
+    (tmp_path / "ca.db").mkdir()
+    try:
+        await rss_sync_handler(ds, {})
+    finally:
+        await libfec_client.rss_process.close()
+
+    # The watcher status is the default subscription's, which succeeded
+    status = (await ds.client.get("/fec/-/api/libfec/rss/status")).json()
+    assert status["exported_count"] == 10
+    assert status["error_message"] is None
+    subscriptions = (await ds.client.get("/fec/-/api/libfec/rss/subscriptions")).json()[
+        "subscriptions"
+    ]
+    last_sync = subscriptions[0]["last_sync"]
+    assert "terminated" in last_sync["error_message"]
+    assert "unable to open database file" in last_sync["stderr"]
+    assert last_sync["sync_finished_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_feed_check_is_off_unless_configured(monkeypatch):
+    # Restored afterwards, as startup sets it from the plugin config
+    monkeypatch.setattr(libfec_client, "rss_feed_url", None)
+    await Datasette(memory=True).invoke_startup()
+    assert libfec_client.rss_feed_url is None
+
+    url = "https://efilingapps.fec.gov/rss/generate?preDefinedFilingType=ALL"
+    await Datasette(
+        memory=True, config={"plugins": {"datasette-libfec": {"rss_feed_url": url}}}
+    ).invoke_startup()
+    assert libfec_client.rss_feed_url == url
+
+
+@pytest.mark.asyncio
+async def test_subscriptions_without_news_in_the_feed_skip_libfec(
+    tmp_path, monkeypatch
+):
+    feed = {"etag": '"v1"', "items": []}
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(dict(self.headers))
+            if self.headers.get("If-None-Match") == feed["etag"]:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", feed["etag"])
+            self.end_headers()
+            items = "".join(
+                f"<item><pubDate>{date}</pubDate></item>" for date in feed["items"]
+            )
+            self.wfile.write(f"<rss><channel>{items}</channel></rss>".encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ds, internal, db_path = await rss_datasette(
+        tmp_path,
+        monkeypatch,
+        f"http://127.0.0.1:{server.server_port}/rss",
+        extra=("ca",),
+    )
+    await internal.save_rss_subscription(
+        RssSubscription(name="ca", database_name="ca", state_filter="CA")
+    )
+    rss_process = libfec_client.rss_process
+    started = rss_process.spawned + rss_process.reused
+
+    def libfec_syncs():
+        return rss_process.spawned + rss_process.reused - started
+
+    try:
+        await rss_sync_handler(ds, {})
+        assert libfec_syncs() == 2
+
+        # The feed changed, but only with items both have already synced
+        feed["etag"] = '"v2"'
+        feed["items"] = ["Mon, 02 Mar 2026 11:30:00 GMT"]
+        await rss_sync_handler(ds, {})
+        assert libfec_syncs() == 2
+        # ...and that version of it is now the one the request is conditional on
+        await rss_sync_handler(ds, {})
+        assert requests[-1]["If-None-Match"] == '"v2"'
+
+        feed["etag"] = '"v3"'
+        feed["items"].append(
+            (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+        )
+        await rss_sync_handler(ds, {})
+        assert libfec_syncs() == 4
+    finally:
+        await rss_process.close()
+        server.shutdown()
+
+    assert len(requests) == 4
+    for path in (db_path, tmp_path / "ca.db"):
+        with sqlite3.connect(path) as conn:
+            assert [
+                row[0]
+                for row in conn.execute(
+                    "SELECT status FROM libfec_rss_syncs ORDER BY sync_id"
+                )
+            ] == ["complete", "not-modified", "not-modified", "complete"]
+
+
+def test_feed_has_news():
+    assert item_pub_dates(b"<rss><channel><item><title>x</title></item></rss>") is None
+    dates = item_pub_dates(
+        b"<rss><channel><item><pubDate>Mon, 02 Mar 2026 11:30:00 GMT</pubDate>"
+        b"</item><item></item></channel></rss>"
+    )
+    assert dates == ["Mon, 02 Mar 2026 11:30:00 GMT", None]
+
+    watermark = {"last_pub_date": "Mon, 02 Mar 2026 11:30:00 GMT"}
+    check = FeedCheck(False, pub_dates=dates[:1])
+    assert not feed_has_news(check, watermark)
+    assert feed_has_news(check, {"last_pub_date": "2026-03-02T11:00:00Z"})
+    # Undated items, unparsed feeds and missing marks could all be news
+    assert feed_has_news(FeedCheck(False, pub_dates=dates), watermark)
+    assert feed_has_news(FeedCheck(False), watermark)
+    assert feed_has_news(check, None)
+
+
+def test_feed_unchanged():
+    check = FeedCheck(False, '"v2"', "Mon, 02 Mar 2026 12:00:00 GMT")
+    assert not feed_unchanged(check, {"etag": '"v1"'})
+    assert feed_unchanged(check, {"etag": '"v2"'})
+    assert feed_unchanged(
+        FeedCheck(True, None, "Mon, 02 Mar 2026 12:00:00 GMT"),
+        {"http_last_modified": "Mon, 02 Mar 2026 12:00:00 GMT"},
+    )
+    assert not feed_unchanged(
+        check, {"http_last_modified": "Mon, 02 Mar 2026 11:00:00 GMT"}
+    )
+    assert not feed_unchanged(None, {"etag": '"v2"'})
+    assert not feed_unchanged(check, None)
+
+
+@pytest.mark.asyncio
+async def test_rss_subscription_routes(tmp_path, monkeypatch):
+    ds, internal, _ = await rss_datasette(tmp_path, monkeypatch, extra=("ca",))
+    base = "/fec/-/api/libfec/rss/subscriptions"
+
+    response = await ds.client.post(
+        f"{base}/save", json={"name": "ca", "database_name": "ca", "state_filter": "CA"}
+    )
+    assert response.status_code == 200
+    response = await ds.client.post(f"{base}/save", json={"name": "national"})
+    assert response.json()["database_name"] == "fec"
+    for body in ({"name": "default"}, {"name": "x", "database_name": "missing"}):
+        assert (await ds.client.post(f"{base}/save", json=body)).status_code == 400
+
+    subscriptions = (await ds.client.get(base)).json()["subscriptions"]
+    assert [(s["name"], s["database_name"]) for s in subscriptions] == [
+        ("ca", "ca"),
+        ("national", "fec"),
+    ]
+
+    assert (await ds.client.post(f"{base}/ca/delete")).status_code == 200
+    assert (await ds.client.post(f"{base}/ca/delete")).status_code == 404
+    assert [s.name for s in await internal.list_rss_subscriptions()] == ["national"]
+
+
+@pytest.mark.asyncio
+async def test_rss_status_is_not_held_up_by_writes():
+    ds = Datasette(
+        memory=True, config={"permissions": {"datasette_libfec_access": True}}
+    )
+    await ds.invoke_startup()
+    internal_db = ds.get_internal_database()
+    internal = InternalDB(internal_db)
+    await internal.update_rss_progress(phase="syncing", exported_count=3)
+
+    # Occupy the internal database's write thread
+    release = threading.Event()
+    blocked = asyncio.ensure_future(
+        internal_db.execute_write_fn(lambda conn: release.wait(5))
+    )
+    try:
+        response = await asyncio.wait_for(
+            ds.client.get("/_memory/-/api/libfec/rss/status"), 2
+        )
+        assert response.json()["exported_count"] == 3
+        # A cache miss reads without the write thread too
+        internal_db_module._rss_caches.pop(internal_db)
+        progress = await asyncio.wait_for(internal.get_rss_progress(), 2)
+        assert (progress["phase"], progress["exported_count"]) == ("syncing", 3)
+    finally:
+        release.set()
+        await blocked
+
+    # Updates are seen straight away
+    await internal.update_rss_progress(exported_count=4)
+    assert (await internal.get_rss_progress())["exported_count"] == 4
+    await internal.update_rss_config(interval_seconds=120)
+    assert (await internal.get_rss_config()).interval_seconds == 120
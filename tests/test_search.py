@@ -0,0 +1,90 @@
+"""Tests for the search endpoint's principal committee lookups."""
+
+import asyncio
+import sqlite3
+import pytest
+from datasette.app import Datasette
+
+from datasette_libfec.routes_search import fetch_committees
+
+
+class FakeSearchClient:
+    def __init__(self, known):
+        self.known = known
+        self.requested = []
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def get_committee(self, committee_id, cycle):
+        self.requested.append(committee_id)
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if committee_id not in self.known:
+            raise RuntimeError("not found")
+        return {"committee_id": committee_id, "name": self.known[committee_id]}
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "fec.db"
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE libfec_committees (
+            committee_id TEXT, name TEXT, committee_type TEXT,
+            designation TEXT, party_affiliation TEXT, candidate_id TEXT,
+            cycle INTEGER
+        );
+        INSERT INTO libfec_committees VALUES
+            ('C001', 'Local One', 'H', 'P', 'DEM', 'H001', 2026),
+            ('C001', 'Local One', 'H', 'P', 'DEM', 'H001', 2026),
+            ('C002', 'Old Cycle', 'H', 'P', 'REP', 'H002', 2024);
+    """)
+    conn.close()
+    return Datasette([str(path)]).databases["fec"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_committees_local_first_then_rpc(db):
+    client = FakeSearchClient({"C002": "Remote Two", "C003": "Remote Three"})
+
+    committees = await fetch_committees(
+        db, client, ["C003", "C001", "C002", "C404"], 2026
+    )
+
+    assert [c["committee_id"] for c in committees] == ["C003", "C001", "C002"]
+    assert committees[1] == {
+        "committee_id": "C001",
+        "name": "Local One",
+        "committee_type": "H",
+        "designation": "P",
+        "party_affiliation": "DEM",
+        "connected_org_name": None,
+        "candidate_id": "H001",
+    }
+    # Only committees missing locally (for this cycle) go to the search process
+    assert sorted(client.requested) == ["C002", "C003", "C404"]
+
+
+@pytest.mark.asyncio
+async def test_fetch_committees_without_local_table():
+    client = FakeSearchClient({"C001": "Remote One"})
+    db = Datasette(memory=True).databases["_memory"]
+
+    committees = await fetch_committees(db, client, ["C001"], 2026)
+
+    assert committees == [{"committee_id": "C001", "name": "Remote One"}]
+
+
+@pytest.mark.asyncio
+async def test_fetch_committees_keeps_to_max_in_flight():
+    client = FakeSearchClient({f"C{i:03}": f"Remote {i}" for i in range(10)})
+    db = Datasette(memory=True).databases["_memory"]
+
+    committees = await fetch_committees(
+        db, client, list(client.known), 2026, max_in_flight=3
+    )
+
+    assert len(committees) == 10
+    assert client.most_in_flight == 3
@@ -0,0 +1,182 @@
+"""Tests for the search result cache and request coalescing."""
+
+import asyncio
+import pytest
+from datasette.app import Datasette
+
+from datasette_libfec import routes_search
+from datasette_libfec.search_cache import SearchCache, normalize_query
+from datasette_libfec.state import search_cache
+
+
+def test_normalize_query():
+    assert normalize_query("  Nancy   PELOSI ") == "nancy pelosi"
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = SearchCache(max_entries=2)
+    cache.set("a", {"n": 1})
+    cache.set("b", {"n": 2})
+    assert cache.get("a") == {"n": 1}  # a is now the most recently used
+    cache.set("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.evictions == 1
+
+    cache = SearchCache(max_bytes=40)
+    cache.set("a", {"text": "x" * 10})
+    cache.set("b", {"text": "y" * 10})
+    assert cache.get("a") is None
+    assert cache.bytes <= 40
+    # Values bigger than the whole cache are never stored
+    cache.set("huge", {"text": "z" * 100})
+    assert cache.get("huge") is None
+
+
+def test_entries_expire():
+    cache = SearchCache(ttl_seconds=0)
+    cache.set("a", {"n": 1})
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert cache.bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call():
+    cache = SearchCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"result": calls}
+
+    results = await asyncio.gather(
+        *[cache.get_or_compute("k", compute) for _ in range(5)]
+    )
+    assert results == [{"result": 1}] * 5
+    assert calls == 1
+    assert (cache.misses, cache.coalesced) == (1, 4)
+
+    assert await cache.get_or_compute("k", compute) == {"result": 1}
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_but_not_cached():
+    cache = SearchCache()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        cache.get_or_compute("k", fail),
+        cache.get_or_compute("k", fail),
+        return_exceptions=True,
+    )
+    assert [str(r) for r in results] == ["boom", "boom"]
+
+    async def succeed():
+        return {"ok": True}
+
+    assert await cache.get_or_compute("k", succeed) == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_uses_cache(monkeypatch):
+    calls = []
+
+    async def fake_run_search(db, cycle, query, limit):
+        calls.append((cycle, query, limit))
+        await asyncio.sleep(0.02)
+        return {
+            "status": "success",
+            "cycle": cycle,
+            "query": query,
+            "candidate_count": 0,
+            "committee_count": 0,
+            "candidates": [],
+            "committees": [],
+        }
+
+    monkeypatch.setattr(routes_search, "run_search", fake_run_search)
+    search_cache.clear()
+    before = search_cache.stats()
+
+    ds = Datasette(
+        memory=True, config={"permissions": {"datasette_libfec_access": True}}
+    )
+    responses = await asyncio.gather(
+        ds.client.post("/_memory/-/api/libfec/search", json={"query": "Smith"}),
+        ds.client.post("/_memory/-/api/libfec/search", json={"query": "smith "}),
+    )
+    assert [r.json()["query"] for r in responses] == ["Smith", "smith "]
+    assert len(calls) == 1
+
+    response = await ds.client.post(
+        "/_memory/-/api/libfec/search", json={"query": "SMITH"}
+    )
+    assert response.status_code == 200
+    assert len(calls) == 1
+
+    # Results aren't shared with other databases
+    ds.add_memory_database("other")
+    response = await ds.client.post(
+        "/other/-/api/libfec/search", json={"query": "Smith"}
+    )
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+    stats = (await ds.client.get("/_memory/-/api/libfec/search/stats")).json()
+    assert stats["cache"]["misses"] - before["misses"] == 2
+    assert stats["cache"]["coalesced"] - before["coalesced"] == 1
+    assert stats["cache"]["hits"] - before["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_does_not_cancel_the_others():
+    cache = SearchCache()
+    started = asyncio.Event()
+
+    async def compute():
+        started.set()
+        await asyncio.sleep(0.02)
+        return {"ok": True}
+
+    first = asyncio.create_task(cache.get_or_compute("k", compute))
+    await started.wait()
+    second = asyncio.create_task(cache.get_or_compute("k", compute))
+    await asyncio.sleep(0)
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == {"ok": True}
+    assert cache.coalesced == 1
+    assert cache.get("k") == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_computation_is_cancelled_once_every_caller_has_gone():
+    cache = SearchCache()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def compute():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    caller = asyncio.create_task(cache.get_or_compute("k", compute))
+    await started.wait()
+    caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await caller
+    await asyncio.wait_for(cancelled.wait(), 1)
+    await asyncio.sleep(0)
+    assert not cache._in_flight
+    assert not cache._waiting
@@ -0,0 +1,149 @@
+"""Tests for the local FTS5 search index over candidates and committees."""
+
+import sqlite3
+import pytest
+from datasette.app import Datasette
+
+from datasette_libfec import routes_search
+from datasette_libfec.search_index import fts_query
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "fec.db"
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE libfec_candidates (
+            cycle INTEGER, candidate_id TEXT, name, party_affiliation,
+            election_year INTEGER, state, office, district,
+            principal_campaign_committee,
+            UNIQUE(cycle, candidate_id)
+        );
+        CREATE TABLE libfec_committees (
+            cycle INTEGER, committee_id TEXT, name, committee_type,
+            designation, party_affiliation, candidate_id,
+            UNIQUE(cycle, committee_id)
+        );
+        INSERT INTO libfec_candidates VALUES
+            (2026, 'H8CA05035', 'PELOSI, NANCY', 'DEM', 2026, 'CA', 'H', '11', 'C00213512'),
+            (2026, 'H0NY14139', 'OCASIO-CORTEZ, ALEXANDRIA', 'DEM', 2026, 'NY', 'H', '14', 'C00639591');
+        INSERT INTO libfec_committees VALUES
+            (2026, 'C00213512', 'NANCY PELOSI FOR CONGRESS', 'H', 'P', 'DEM', 'H8CA05035'),
+            (2024, 'C00213512', 'NANCY PELOSI FOR CONGRESS', 'H', 'P', 'DEM', 'H8CA05035'),
+            (2026, 'C00401224', 'ACTBLUE', 'V', 'U', NULL, NULL),
+            (2024, 'C00639591', 'ALEXANDRIA OCASIO-CORTEZ FOR CONGRESS', 'H', 'P', 'DEM', 'H0NY14139');
+    """)
+    conn.close()
+    return path
+
+
+def make_datasette(path):
+    return Datasette(
+        [str(path)], config={"permissions": {"datasette_libfec_access": True}}
+    )
+
+
+async def search(ds, **body):
+    response = await ds.client.post("/fec/-/api/libfec/search", json=body)
+    return response.status_code, response.json()
+
+
+def test_fts_query():
+    assert fts_query("Pelosi, nan") == '"pelosi"* "nan"*'
+    assert fts_query('"C004*') == '"c004"*'
+    assert fts_query(" -- ") is None
+
+
+@pytest.mark.asyncio
+async def test_local_search_prefix_matches(db_path):
+    ds = make_datasette(db_path)
+
+    status, data = await search(ds, query="pel nan", cycle=2026, mode="local")
+    assert status == 200
+    assert data["source"] == "local"
+    assert [c["candidate_id"] for c in data["candidates"]] == ["H8CA05035"]
+    assert [c["committee_id"] for c in data["committees"]] == ["C00213512"]
+
+    # Committee IDs are indexed too; one result per committee across cycles
+    status, data = await search(ds, query="C0021", mode="local")
+    assert data["cycle"] is None
+    assert [c["committee_id"] for c in data["committees"]] == ["C00213512"]
+
+    # A matched candidate brings its principal committee along
+    status, data = await search(ds, query="ocasio", mode="local")
+    assert [c["committee_id"] for c in data["committees"]] == ["C00639591"]
+    status, data = await search(ds, query="ocasio", cycle=2026, mode="local")
+    assert data["committee_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_index_follows_imports(db_path):
+    ds = make_datasette(db_path)
+    status, data = await search(ds, query="actblue", mode="local")
+    assert data["committee_count"] == 1
+
+    # libfec writing to the database directly, the way it imports
+    conn = sqlite3.connect(str(db_path))
+    conn.execute(
+        "INSERT OR REPLACE INTO libfec_committees (cycle, committee_id, name) "
+        "VALUES (2026, 'C00401224', 'ACTBLUE TECHNICAL SERVICES')"
+    )
+    conn.execute(
+        "INSERT INTO libfec_committees (cycle, committee_id, name) "
+        "VALUES (2026, 'C00000935', 'DCCC')"
+    )
+    conn.commit()
+    conn.close()
+
+    status, data = await search(ds, query="actblue tech", mode="local")
+    assert [c["name"] for c in data["committees"]] == ["ACTBLUE TECHNICAL SERVICES"]
+    status, data = await search(ds, query="dccc", mode="local")
+    assert data["committee_count"] == 1
+
+    # A recreated table loses its triggers; the index is rebuilt for it
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        DROP TABLE libfec_committees;
+        CREATE TABLE libfec_committees (cycle INTEGER, committee_id TEXT, name);
+        INSERT INTO libfec_committees VALUES (2026, 'C00999999', 'NEW COMMITTEE');
+    """)
+    conn.close()
+    status, data = await search(ds, query="actblue", mode="local")
+    assert data["committee_count"] == 0
+    status, data = await search(ds, query="new comm", mode="local")
+    assert [c["committee_id"] for c in data["committees"]] == ["C00999999"]
+
+
+@pytest.mark.asyncio
+async def test_local_search_without_tables():
+    ds = Datasette(
+        memory=True, config={"permissions": {"datasette_libfec_access": True}}
+    )
+    response = await ds.client.post(
+        "/_memory/-/api/libfec/search", json={"query": "pelosi", "mode": "local"}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_libfec_mode_falls_back_to_local_index(db_path, monkeypatch):
+    async def failing_run_search(db, cycle, query, limit):
+        raise routes_search.SearchStartError("libfec not found")
+
+    monkeypatch.setattr(routes_search, "run_search", failing_run_search)
+    ds = make_datasette(db_path)
+
+    status, data = await search(ds, query="fallback pelosi")
+    assert status == 200
+    assert data["source"] == "local"
+    assert data["cycle"] == 2026
+
+    # Without a local index the original error is returned
+    ds = Datasette(
+        memory=True, config={"permissions": {"datasette_libfec_access": True}}
+    )
+    response = await ds.client.post(
+        "/_memory/-/api/libfec/search", json={"query": "fallback pelosi"}
+    )
+    assert response.status_code == 500
+    assert "libfec not found" in response.json()["message"]
@@ -0,0 +1,279 @@
+"""Tests for the per-cycle pools of search processes."""
+
+import asyncio
+import pytest
+
+from datasette_libfec.search_pool import SearchPool, SearchPools, SearchUnavailable
+
+
+class FakeSearchClient:
+    """Stands in for LibfecSearchRpcClient without spawning anything."""
+
+    started = 0
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        self.alive = False
+        self.listen_task = None
+
+    async def start_process(self):
+        await asyncio.sleep(0.01)
+        FakeSearchClient.started += 1
+        self.alive = True
+        self.listen_task = asyncio.get_running_loop().create_future()
+
+    def is_alive(self):
+        return self.alive
+
+    def crash(self):
+        self.alive = False
+        self.listen_task.set_result(None)
+
+    async def shutdown(self):
+        self.alive = False
+        if not self.listen_task.done():
+            self.listen_task.set_result(None)
+
+
+@pytest.fixture(autouse=True)
+def reset_started():
+    FakeSearchClient.started = 0
+
+
+@pytest.mark.asyncio
+async def test_least_loaded_dispatch_and_growth():
+    pool = SearchPool(2026, FakeSearchClient, size=2, max_in_flight=4)
+
+    first = await pool.acquire()
+    assert pool.in_flight[first] == 1
+    # The only process is busy, so a second one starts in the background
+    again = await pool.acquire()
+    assert again is first
+    await asyncio.sleep(0.05)
+    assert len(pool.clients) == 2
+
+    second = await pool.acquire()
+    assert second is not first
+    assert sorted(pool.in_flight.values()) == [1, 2]
+
+    # Never more than size processes
+    for _ in range(4):
+        await pool.acquire()
+    await asyncio.sleep(0.05)
+    assert FakeSearchClient.started == 2
+    assert sorted(pool.in_flight.values()) == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_burst_of_requests_starts_at_most_size_processes():
+    pool = SearchPool(2026, FakeSearchClient, size=2, max_in_flight=8)
+    await pool.acquire()
+    # Every one of these finds the only process busy in the same tick
+    await asyncio.gather(*[pool.acquire() for _ in range(5)])
+    await asyncio.sleep(0.05)
+    assert FakeSearchClient.started <= pool.size
+    assert len(pool.clients) == 2
+    assert not pool._tasks
+
+
+@pytest.mark.asyncio
+async def test_waits_when_every_process_is_at_its_limit():
+    pool = SearchPool(2026, FakeSearchClient, size=1, max_in_flight=2)
+    client = await pool.acquire()
+    await pool.acquire()
+
+    waiting = asyncio.create_task(pool.acquire())
+    await asyncio.sleep(0.02)
+    assert not waiting.done()
+
+    pool.release(client)
+    assert await asyncio.wait_for(waiting, timeout=1) is client
+    assert pool.in_flight[client] == 2
+
+
+@pytest.mark.asyncio
+async def test_dead_process_is_replaced():
+    pool = SearchPool(2026, FakeSearchClient, size=1, max_in_flight=4)
+    async with pool.client() as client:
+        pass
+    client.alive = False
+
+    async with pool.client() as replacement:
+        assert replacement is not client
+    assert pool.clients == [replacement]
+    assert FakeSearchClient.started == 2
+
+
+@pytest.mark.asyncio
+async def test_crashed_process_is_restarted_in_background():
+    pool = SearchPool(2026, FakeSearchClient, size=1, max_in_flight=4)
+    async with pool.client() as client:
+        pass
+
+    client.crash()
+    await asyncio.sleep(0)
+    assert client not in pool.clients
+    assert len(pool._tasks) == 1
+    await asyncio.sleep(0.05)
+    assert len(pool.clients) == 1 and pool.clients[0] is not client
+    assert pool.restarts == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_starts_back_off():
+    attempts = 0
+
+    class BrokenClient(FakeSearchClient):
+        async def start_process(self):
+            nonlocal attempts
+            attempts += 1
+            raise RuntimeError("no libfec")
+
+    pool = SearchPool(2026, BrokenClient, size=1)
+    # The first failure is retried straight away, then starts back off
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="no libfec"):
+            await pool.acquire()
+    with pytest.raises(SearchUnavailable):
+        await pool.acquire()
+    assert attempts == 2
+    assert pool.backing_off()
+
+
+@pytest.mark.asyncio
+async def test_requests_waiting_on_a_start_are_woken():
+    pool = SearchPool(2026, FakeSearchClient, size=1, max_in_flight=2)
+    # The second request queues behind the first one's start
+    first, second = await asyncio.wait_for(
+        asyncio.gather(pool.acquire(), pool.acquire()), timeout=1
+    )
+    assert first is second
+    assert pool.in_flight[first] == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_waiting_on_a_failed_start_are_woken():
+    class BrokenClient(FakeSearchClient):
+        async def start_process(self):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("no libfec")
+
+    pool = SearchPool(2026, BrokenClient, size=2)
+    results = await asyncio.wait_for(
+        asyncio.gather(*[pool.acquire() for _ in range(3)], return_exceptions=True),
+        timeout=1,
+    )
+    # Two requests started (and failed) processes; the third was queued
+    # behind them and fails fast now the cycle is backing off
+    assert [type(r) for r in results] == [
+        RuntimeError,
+        RuntimeError,
+        SearchUnavailable,
+    ]
+    assert not pool._waiters
+
+
+@pytest.mark.asyncio
+async def test_idle_processes_and_cycles_are_reaped():
+    pools = SearchPools(
+        "libfec", client_factory=FakeSearchClient, idle_seconds=0.05, max_cycles=2
+    )
+    async with pools.for_cycle(2026).client() as client:
+        pass
+    await asyncio.sleep(0.06)
+    await pools.supervise()
+    assert not client.alive
+    assert pools.pools == {}
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_cycle_is_closed():
+    pools = SearchPools("libfec", client_factory=FakeSearchClient, max_cycles=2)
+    clients = {}
+    for cycle in (2022, 2024, 2022, 2026):
+        async with pools.for_cycle(cycle).client() as client:
+            clients[cycle] = client
+    await asyncio.sleep(0.01)
+
+    assert list(pools.pools) == [2022, 2026]
+    assert not clients[2024].alive
+    # The close task was held until it finished
+    assert not pools._closing
+    assert clients[2022].alive and clients[2026].alive
+    await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_prewarmed_cycles_stay_resident():
+    pools = SearchPools(
+        "libfec", client_factory=FakeSearchClient, idle_seconds=0.01, max_cycles=1
+    )
+    await pools.prewarm([2024, 2026])
+    assert FakeSearchClient.started == 2
+    assert {c: s["state"] for c, s in pools.readiness().items()} == {
+        "2024": "ready",
+        "2026": "ready",
+    }
+
+    # Neither idleness nor another cycle evicts them
+    async with pools.for_cycle(2022).client():
+        pass
+    await asyncio.sleep(0.02)
+    await pools.supervise()
+    assert list(pools.pools) == [2024, 2026]
+    assert all(len(p.clients) == 1 for p in pools.pools.values())
+    await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_prewarm_task_is_kept_and_failures_logged(monkeypatch, caplog):
+    pools = SearchPools("libfec", client_factory=FakeSearchClient)
+
+    async def broken_prewarm(cycles):
+        raise RuntimeError("prewarm broke")
+
+    monkeypatch.setattr(pools, "_prewarm", broken_prewarm)
+    task = pools.prewarm([2026])
+    assert pools._prewarm_task is task
+    with pytest.raises(RuntimeError):
+        await task
+    await asyncio.sleep(0)
+    assert pools._prewarm_task is None
+    assert "Prewarming search processes failed" in caplog.text
+    await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_search_status_endpoint(monkeypatch):
+    from datasette.app import Datasette
+    from datasette_libfec.state import search_pools
+
+    started = asyncio.Event()
+
+    class SlowClient(FakeSearchClient):
+        async def start_process(self):
+            await started.wait()
+            await super().start_process()
+
+    monkeypatch.setattr(search_pools, "client_factory", SlowClient)
+    ds = Datasette(
+        memory=True,
+        config={
+            "permissions": {"datasette_libfec_access": True},
+            "plugins": {"datasette-libfec": {"search_prewarm_cycles": [2026]}},
+        },
+    )
+    try:
+        # Startup doesn't wait for the process to be ready
+        await ds.invoke_startup()
+        data = (await ds.client.get("/_memory/-/api/libfec/search/status")).json()
+        assert data["ready"] is False
+        assert data["cycles"]["2026"]["state"] == "starting"
+
+        started.set()
+        await asyncio.sleep(0.05)
+        data = (await ds.client.get("/_memory/-/api/libfec/search/status")).json()
+        assert data["ready"] is True
+        assert data["cycles"]["2026"]["processes"] == 1
+    finally:
+        await search_pools.close()